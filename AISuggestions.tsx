@@ -1,6 +1,5 @@
-import React, { useState } from 'react';
-import { useQuery } from '@tanstack/react-query';
-import { api } from '../lib/api';
+import React, { useEffect, useState } from 'react';
+import { api, SuggestionStats } from '../lib/api';
 
 interface AISuggestionsProps {
   fromDate?: string;
@@ -10,14 +9,27 @@ interface AISuggestionsProps {
 export function AISuggestions({ fromDate, toDate }: AISuggestionsProps) {
   const [expanded, setExpanded] = useState(false);
 
-  const { data: suggestions, isLoading, error } = useQuery({
-    queryKey: ['suggestions', fromDate, toDate],
-    queryFn: () => api.getSuggestions(fromDate, toDate),
-    staleTime: 60000, // 1 minute
-    enabled: !!fromDate && !!toDate,
-  });
+  const [stats, setStats] = useState<SuggestionStats | null>(null);
+  const [suggestion, setSuggestion] = useState('');
+  const [error, setError] = useState(false);
 
-  if (isLoading) {
+  // Stats arrive first and the tip text fills in as the model streams it
+  useEffect(() => {
+    if (!fromDate || !toDate) return;
+    setStats(null);
+    setSuggestion('');
+    setError(false);
+    return api.streamSuggestions(fromDate, toDate, {
+      onStats: setStats,
+      onToken: (text) => setSuggestion((prev) => prev + text),
+      onDone: () => {},
+      onError: () => setError(true),
+    });
+  }, [fromDate, toDate]);
+
+  const suggestions = stats && { ...stats, suggestion };
+
+  if (!stats && suggestion === '' && !error && fromDate && toDate) {
     return (
       <div className="mb-6 bg-gradient-to-r from-purple-50 to-indigo-50 border-2 border-purple-300 rounded-xl p-4 animate-pulse">
         <div className="flex items-center gap-3">
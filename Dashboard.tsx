@@ -1,6 +1,6 @@
 import { useState, useEffect } from 'react';
 import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query';
-import { api, EntryCreate, EntryType, TimeframeType } from '../lib/api';
+import { api, localTimeZone, EntryCreate, EntryType, TimeframeType } from '../lib/api';
 import { PeriodChips, Period } from '../components/PeriodChips';
 import { KpiCard } from '../components/KpiCard';
 import { SummaryCard } from '../components/SummaryCard';
@@ -15,74 +15,6 @@ import { AISuggestions } from '../components/AISuggestions';
 import { EntryViewer } from '../components/EntryViewer';
 import { useTheme } from '../lib/themeContext';
 
-function getPeriodDates(period: Period): { from: string; to: string } {
-  const now = new Date();
-  
-  const startOfDay = (date: Date): Date => {
-    const d = new Date(date);
-    d.setHours(0, 0, 0, 0);
-    return d;
-  };
-  
-  const endOfDay = (date: Date): Date => {
-    const d = new Date(date);
-    d.setHours(23, 59, 59, 999);
-    return d;
-  };
-
-  switch (period) {
-    case 'today':
-      return {
-        from: startOfDay(now).toISOString(),
-        to: endOfDay(now).toISOString(),
-      };
-    case 'yesterday':
-      const yesterday = new Date(now);
-      yesterday.setDate(yesterday.getDate() - 1);
-      return {
-        from: startOfDay(yesterday).toISOString(),
-        to: endOfDay(yesterday).toISOString(),
-      };
-    case 'week':
-      const weekStart = new Date(now);
-      weekStart.setDate(weekStart.getDate() - weekStart.getDay());
-      weekStart.setHours(0, 0, 0, 0);
-      return {
-        from: weekStart.toISOString(),
-        to: endOfDay(now).toISOString(),
-      };
-    case 'last7':
-      const last7 = new Date(now);
-      last7.setDate(last7.getDate() - 6);
-      last7.setHours(0, 0, 0, 0);
-      return {
-        from: last7.toISOString(),
-        to: endOfDay(now).toISOString(),
-      };
-    case 'month':
-      const monthStart = new Date(now.getFullYear(), now.getMonth(), 1);
-      monthStart.setHours(0, 0, 0, 0);
-      return {
-        from: monthStart.toISOString(),
-        to: endOfDay(now).toISOString(),
-      };
-    case 'lastMonth':
-      const lastMonthStart = new Date(now.getFullYear(), now.getMonth() - 1, 1);
-      lastMonthStart.setHours(0, 0, 0, 0);
-      const lastMonthEnd = new Date(now.getFullYear(), now.getMonth(), 0);
-      lastMonthEnd.setHours(23, 59, 59, 999);
-      return {
-        from: lastMonthStart.toISOString(),
-        to: lastMonthEnd.toISOString(),
-      };
-    default:
-      return {
-        from: startOfDay(now).toISOString(),
-        to: now.toISOString(),
-      };
-  }
-}
-
 export function Dashboard() {
   const [period, setPeriod] = useState<Period>('today');
   const [amount, setAmount] = useState('0');
@@ -120,7 +52,6 @@ export function Dashboard() {
   });
 
   const queryClient = useQueryClient();
-  const dates = getPeriodDates(period);
 
   // Check if date has changed and auto-reset if needed
   useEffect(() => {
@@ -156,14 +87,31 @@ export function Dashboard() {
     return mapping[p] || 'TODAY';
   };
 
+  // The server resolves the period in local days; the date in the key rolls it over at midnight
   const { data: rollup } = useQuery({
-    queryKey: ['rollup', dates.from, dates.to, period],
-    queryFn: () => api.getRollup(dates.from, dates.to, getTimeframe(period)),
+    queryKey: ['rollup', period, localTimeZone(), new Date().toDateString()],
+    queryFn: () => api.getRollup(undefined, undefined, getTimeframe(period), localTimeZone()),
   });
 
+  const { data: goalsProgress = [] } = useQuery({
+    queryKey: ['goals-progress', localTimeZone(), new Date().toDateString()],
+    queryFn: () => api.getGoalsProgress(localTimeZone()),
+  });
+
+  // The entries list and suggestions cover the range the server resolved for
+  // the KPI cards, so every widget agrees on where the week starts. The
+  // period is half-open; entry filters include their end.
+  const range = rollup?.period
+    ? {
+        from: rollup.period.start,
+        to: new Date(new Date(rollup.period.end).getTime() - 1).toISOString(),
+      }
+    : undefined;
+
   const { data: entries = [] } = useQuery({
-    queryKey: ['entries', dates.from, dates.to],
-    queryFn: () => api.getEntries(dates.from, dates.to),
+    queryKey: ['entries', range?.from, range?.to],
+    queryFn: () => api.getEntries(range!.from, range!.to),
+    enabled: !!range,
   });
 
   const createMutation = useMutation({
@@ -171,11 +119,12 @@ export function Dashboard() {
     onSuccess: () => {
       queryClient.invalidateQueries({ queryKey: ['entries'] });
       queryClient.invalidateQueries({ queryKey: ['rollup'] });
+      queryClient.invalidateQueries({ queryKey: ['goals-progress'] });
       setAmount('0');
       setToast({ message: 'Entry added successfully!', type: 'success' });
     },
-    onError: () => {
-      setToast({ message: 'Failed to add entry', type: 'error' });
+    onError: (error: Error) => {
+      setToast({ message: error.message || 'Failed to add entry', type: 'error' });
     },
   });
 
@@ -184,6 +133,7 @@ export function Dashboard() {
     onSuccess: () => {
       queryClient.invalidateQueries({ queryKey: ['entries'] });
       queryClient.invalidateQueries({ queryKey: ['rollup'] });
+      queryClient.invalidateQueries({ queryKey: ['goals-progress'] });
       setToast({ message: 'Entry deleted successfully!', type: 'success' });
     },
     onError: () => {
@@ -198,6 +148,7 @@ export function Dashboard() {
     onSuccess: () => {
       queryClient.invalidateQueries({ queryKey: ['entries'] });
       queryClient.invalidateQueries({ queryKey: ['rollup'] });
+      queryClient.invalidateQueries({ queryKey: ['goals-progress'] });
       setSelectedIds([]);
       setToast({ message: `${selectedIds.length} entries deleted successfully!`, type: 'success' });
     },
@@ -211,6 +162,7 @@ export function Dashboard() {
     onSuccess: () => {
       queryClient.invalidateQueries({ queryKey: ['settings'] });
       queryClient.invalidateQueries({ queryKey: ['rollup'] });
+      queryClient.invalidateQueries({ queryKey: ['goals-progress'] });
       setToast({ message: 'Settings updated!', type: 'success' });
     },
   });
@@ -228,6 +180,7 @@ export function Dashboard() {
     onSuccess: () => {
       queryClient.invalidateQueries({ queryKey: ['entries'] });
       queryClient.invalidateQueries({ queryKey: ['rollup'] });
+      queryClient.invalidateQueries({ queryKey: ['goals-progress'] });
       setResetConfirm(false);
       setToast({ message: "Today's data has been reset!", type: 'success' });
     },
@@ -241,6 +194,7 @@ export function Dashboard() {
     onSuccess: () => {
       queryClient.invalidateQueries({ queryKey: ['entries'] });
       queryClient.invalidateQueries({ queryKey: ['rollup'] });
+      queryClient.invalidateQueries({ queryKey: ['goals-progress'] });
       setResetAllConfirm(false);
       setToast({ message: 'All data has been reset!', type: 'success' });
     },
@@ -255,6 +209,7 @@ export function Dashboard() {
     onSuccess: () => {
       queryClient.invalidateQueries({ queryKey: ['entries'] });
       queryClient.invalidateQueries({ queryKey: ['rollup'] });
+      queryClient.invalidateQueries({ queryKey: ['goals-progress'] });
       setEditingEntry(null);
       setToast({ message: 'Entry updated successfully!', type: 'success' });
     },
@@ -434,8 +389,7 @@ export function Dashboard() {
       {rollup && showGoalBanner && (
         <ProfitGoalsBar
           timeframe={getTimeframeFromPeriod(period)}
-          currentProfit={rollup.profit}
-          goalProgress={rollup.goal_progress}
+          goal={goalsProgress.find((g) => g.timeframe === getTimeframeFromPeriod(period))}
           onGoalReached={handleGoalReached}
           onToggle={handleToggleGoalBanner}
         />
@@ -570,7 +524,7 @@ export function Dashboard() {
         </div>
 
         <div>
-          <AISuggestions fromDate={getPeriodDates(period).from} toDate={getPeriodDates(period).to} />
+          <AISuggestions fromDate={range?.from} toDate={range?.to} />
         </div>
 
         {selectedIds.length > 0 && (
@@ -1,10 +1,10 @@
 import { useState, useEffect, useRef } from 'react';
-import { api, TimeframeType } from '../lib/api';
+import { useQueryClient } from '@tanstack/react-query';
+import { api, GoalProgress, TimeframeType } from '../lib/api';
 
 interface ProfitGoalsBarProps {
   timeframe: TimeframeType;
-  currentProfit: number;
-  goalProgress?: number;
+  goal?: GoalProgress;
   onGoalReached?: (timeframe: TimeframeType) => void;
   onToggle?: () => void;
 }
@@ -18,7 +18,10 @@ const TIMEFRAME_LABELS: Record<TimeframeType, string> = {
   LAST_MONTH: "Last Month's",
 };
 
-export function ProfitGoalsBar({ timeframe, currentProfit, goalProgress = 0, onGoalReached, onToggle }: ProfitGoalsBarProps) {
+export function ProfitGoalsBar({ timeframe, goal, onGoalReached, onToggle }: ProfitGoalsBarProps) {
+  const queryClient = useQueryClient();
+  const currentProfit = goal?.profit ?? 0;
+  const goalProgress = goal?.percent ?? 0;
   const [goalAmount, setGoalAmount] = useState('');
   const [isEditing, setIsEditing] = useState(false);
   const [isSaving, setIsSaving] = useState(false);
@@ -30,14 +33,11 @@ export function ProfitGoalsBar({ timeframe, currentProfit, goalProgress = 0, onG
   const previousProgressRef = useRef(0);
 
   useEffect(() => {
-    // Load current goal on mount and when timeframe changes
-    api.getGoal(timeframe).then(goal => {
-      if (goal) {
-        setGoalAmount(goal.target_profit.toString());
-      } else {
-        setGoalAmount('');
-      }
-    });
+    // Goals come from the dashboard's single /goals/progress query
+    setGoalAmount(goal ? goal.target_profit.toString() : '');
+  }, [goal?.target_profit]);
+
+  useEffect(() => {
     // Reset goal reached flag when timeframe changes
     goalReachedRef.current = false;
   }, [timeframe]);
@@ -78,6 +78,7 @@ export function ProfitGoalsBar({ timeframe, currentProfit, goalProgress = 0, onG
       }
       await api.createGoal(timeframe, parseFloat(tempGoal));
       setGoalAmount(tempGoal);
+      queryClient.invalidateQueries({ queryKey: ['goals-progress'] });
       setIsEditing(false);
     } catch (e) {
       const errorMsg = e instanceof Error ? e.message : 'Failed to save goal';
@@ -238,6 +239,12 @@ export function ProfitGoalsBar({ timeframe, currentProfit, goalProgress = 0, onG
             style={{ width: `${displayProgress}%` }}
           />
         </div>
+        {goal && !isGoalReached && (
+          <div className="text-xs md:text-sm text-gray-600" style={{ fontFamily: "'Poppins', sans-serif" }}>
+            ${goal.remaining.toFixed(2)} to go • on pace for ${goal.projected_profit.toFixed(2)}
+            {goal.on_track ? ' ✅' : ''}
+          </div>
+        )}
       </div>
     </div>
   );
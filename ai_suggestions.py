@@ -1,89 +1,172 @@
+import asyncio
+import hashlib
+import json
+import logging
 import os
-from openai import OpenAI
-from backend.models import Entry, EntryType
+import httpx
+from openai import AsyncOpenAI
+from backend.models import Entry, EntryType, SuggestionCache
+from backend.services.insights_service import get_insights
+from sqlalchemy import case, func
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import AsyncIterator, Optional
 
-client = OpenAI(
+logger = logging.getLogger(__name__)
+
+client = AsyncOpenAI(
     api_key=os.environ.get("AI_INTEGRATIONS_OPENAI_API_KEY"),
-    base_url=os.environ.get("AI_INTEGRATIONS_OPENAI_BASE_URL")
+    base_url=os.environ.get("AI_INTEGRATIONS_OPENAI_BASE_URL"),
+    timeout=httpx.Timeout(20.0, connect=5.0),
+    max_retries=1
 )
 
-def get_ai_suggestions(
+MODEL = "gpt-4o-mini"
+SYSTEM_PROMPT = "You are an expert delivery driver coach. Provide practical, data-driven suggestions to help drivers maximize earnings."
+# /suggestions answers with the statistical fallback if the model takes longer
+COMPLETION_TIMEOUT_SECONDS = 3.0
+# The stream falls back if the first token, or any later one, takes longer
+FIRST_TOKEN_TIMEOUT_SECONDS = 2.0
+TOKEN_IDLE_TIMEOUT_SECONDS = 10.0
+# Completions for an unchanged stats context are reused for this long
+CACHE_TTL = timedelta(hours=24)
+CACHE_MAX_ENTRIES = 500
+# A hit only writes its use back once the stored one is this old, so most
+# cache reads don't take SQLite's write lock
+CACHE_TOUCH_INTERVAL = timedelta(minutes=5)
+
+def context_fingerprint(context: str) -> str:
+    return hashlib.sha256(f"{MODEL}\n{context}".encode()).hexdigest()
+
+def get_cached_suggestion(db: Session, fingerprint: str) -> Optional[str]:
+    now = datetime.utcnow()
+    cached = db.get(SuggestionCache, fingerprint)
+    if cached is None or cached.expires_at <= now:
+        return None
+    # hits counts these touches, not every read
+    if cached.last_used_at <= now - CACHE_TOUCH_INTERVAL:
+        cached.hits += 1
+        cached.last_used_at = now
+        db.commit()
+    return cached.suggestion
+
+def store_suggestion(db: Session, fingerprint: str, suggestion: str):
+    """Cache a completion, then evict expired and least recently used entries"""
+    now = datetime.utcnow()
+    db.merge(SuggestionCache(
+        fingerprint=fingerprint,
+        suggestion=suggestion,
+        hits=0,
+        created_at=now,
+        expires_at=now + CACHE_TTL,
+        last_used_at=now
+    ))
+    db.query(SuggestionCache).filter(SuggestionCache.expires_at <= now).delete()
+    db.flush()
+    
+    stale = db.query(SuggestionCache.fingerprint).order_by(
+        SuggestionCache.last_used_at.desc()
+    ).offset(CACHE_MAX_ENTRIES).subquery()
+    db.query(SuggestionCache).filter(
+        SuggestionCache.fingerprint.in_(stale.select())
+    ).delete(synchronize_session=False)
+    db.commit()
+
+def build_suggestion_stats(
     db: Session,
     from_date: Optional[datetime] = None,
     to_date: Optional[datetime] = None
-) -> dict:
-    """Generate AI suggestions for earning optimization based on recent data"""
+) -> Optional[dict]:
+    """Compute the stats behind a suggestion and the prompt context; None without data"""
     
-    # Fetch recent entries
-    query = db.query(Entry)
+    window = []
     if from_date:
-        query = query.filter(Entry.timestamp >= from_date)
+        window.append(Entry.timestamp >= from_date)
     if to_date:
-        query = query.filter(Entry.timestamp <= to_date)
-    
-    entries = query.all()
-    
-    if not entries:
-        return {
-            "suggestion": "Start logging your deliveries to get personalized earning optimization tips!",
-            "minimum_order": None,
-            "peak_time": None,
-            "reasoning": "No data available yet"
-        }
-    
-    # Calculate metrics
-    total_revenue = 0
-    total_expenses = 0
-    order_amounts = []
-    order_times = []
-    by_hour = {}
-    
-    for entry in entries:
-        amount = float(entry.amount)
-        if entry.type == EntryType.ORDER:
-            total_revenue += amount
-            order_amounts.append(amount)
-            hour = entry.timestamp.hour
-            order_times.append(hour)
-            
-            if hour not in by_hour:
-                by_hour[hour] = {"count": 0, "total": 0}
-            by_hour[hour]["count"] += 1
-            by_hour[hour]["total"] += amount
-        elif entry.type == EntryType.EXPENSE:
-            total_expenses += abs(amount)
+        window.append(Entry.timestamp <= to_date)
+    
+    # Totals in one pass over the window, grouped per hour in a second, so
+    # the cost tracks the number of hours rather than the number of entries
+    is_order = Entry.type == EntryType.ORDER
+    totals = db.query(
+        func.count(Entry.id),
+        func.count(case((is_order, Entry.id))),
+        func.sum(case((is_order, Entry.amount))),
+        func.min(case((is_order, Entry.amount))),
+        func.max(case((is_order, Entry.amount))),
+        # Expenses are stored negative; negating keeps the Cents type, abs() would not
+        func.sum(case((Entry.type == EntryType.EXPENSE, -Entry.amount)))
+    ).filter(*window).one()
+    entry_count, order_count, total_revenue, min_order, max_order, total_expenses = totals
+    
+    if not entry_count:
+        return None
+    
+    total_revenue = float(total_revenue or 0)
+    total_expenses = float(total_expenses or 0)
     
     # Calculate statistics
-    avg_order = sum(order_amounts) / len(order_amounts) if order_amounts else 0
-    min_order = min(order_amounts) if order_amounts else 0
-    max_order = max(order_amounts) if order_amounts else 0
+    avg_order = total_revenue / order_count if order_count else 0
+    min_order = float(min_order or 0)
+    max_order = float(max_order or 0)
     
     # Find peak time
+    hour = func.strftime('%H', Entry.timestamp)
+    by_hour = db.query(hour, func.count(Entry.id), func.sum(Entry.amount)).filter(
+        is_order, *window
+    ).group_by(hour).order_by(hour).all()
+    
+    avg_by_hour = {int(hour_of_day): float(total) / count for hour_of_day, count, total in by_hour}
     peak_hour = None
     peak_earnings = 0
-    for hour, data in by_hour.items():
-        avg_per_order = data["total"] / data["count"]
+    for hour_of_day, avg_per_order in avg_by_hour.items():
         if avg_per_order > peak_earnings:
             peak_earnings = avg_per_order
-            peak_hour = hour
+            peak_hour = hour_of_day
+    
+    # Prefer the heatmap's $/hour peak and acceptance threshold; the per-order
+    # average and 70% rule only apply when no order logged its duration
+    insights = get_insights(db, from_date, to_date)
+    if insights["peak_hour"] is not None:
+        peak_hour = insights["peak_hour"]
+        peak_earnings = avg_by_hour[peak_hour]
     
     # Find minimum viable order based on data
-    min_viable_order = avg_order * 0.7  # 70% of average
+    min_viable_order = insights["acceptance_threshold"]
+    if min_viable_order is None:
+        min_viable_order = avg_order * 0.7  # 70% of average
+    
+    insight_lines = ""
+    if insights["target_hourly_rate"] is not None:
+        insight_lines += f"- Typical hourly rate: ${insights['target_hourly_rate']:.2f}/hr\n"
+    if insights["order_value_percentiles"]:
+        p = insights["order_value_percentiles"]
+        insight_lines += f"- Order value percentiles: p25 ${p['p25']:.2f}, median ${p['p50']:.2f}, p75 ${p['p75']:.2f}\n"
+    if insights["best_slots"]:
+        slots = ", ".join(
+            f"{slot['weekday']} {slot['hour']}:00 on {slot['app']} (${slot['dollars_per_hour']:.2f}/hr)"
+            for slot in insights["best_slots"][:3]
+        )
+        insight_lines += f"- Best weekday/hour/app slots: {slots}\n"
+    thresholds = [
+        f"{app} ${data['acceptance_threshold']:.2f}"
+        for app, data in insights["by_app"].items()
+        if data["acceptance_threshold"] is not None
+    ]
+    if thresholds:
+        insight_lines += f"- Minimum order to accept by app: {', '.join(thresholds)}\n"
     
     # Prepare context for AI
     context = f"""
 Based on delivery driver data:
-- Total orders: {len(order_amounts)}
+- Total orders: {order_count}
 - Average order value: ${avg_order:.2f}
 - Minimum order seen: ${min_order:.2f}
 - Maximum order seen: ${max_order:.2f}
 - Total revenue: ${total_revenue:.2f}
 - Total expenses: ${total_expenses:.2f}
 - Peak earning hour: {peak_hour}:00 (avg ${peak_earnings:.2f}/order)
-
+{insight_lines}
 Provide 2-3 specific, actionable tips to help this driver earn more. Focus on:
 1. Minimum order amounts to accept to optimize income
 2. Best times to work for maximum earnings
@@ -92,46 +175,165 @@ Provide 2-3 specific, actionable tips to help this driver earn more. Focus on:
 Keep response concise, practical, and directly applicable.
 """
     
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are an expert delivery driver coach. Provide practical, data-driven suggestions to help drivers maximize earnings."
-                },
-                {
-                    "role": "user",
-                    "content": context
-                }
-            ],
-            temperature=0.7,
-            max_tokens=300
-        )
-        
-        suggestion_text = response.choices[0].message.content
-        
+    return {
+        "entry_count": entry_count,
+        "order_count": order_count,
+        "avg_order": avg_order,
+        "peak_hour": peak_hour,
+        "min_viable_order": min_viable_order,
+        "context": context
+    }
+
+def _response(stats: dict, suggestion: str, cache_status: str) -> dict:
+    peak_hour = stats["peak_hour"]
+    if cache_status == "fallback":
+        reasoning = f"Statistical analysis of {stats['entry_count']} entries"
+    else:
+        reasoning = f"Based on {stats['entry_count']} entries across {stats['order_count']} orders"
+    
+    return {
+        "suggestion": suggestion,
+        "minimum_order": round(stats["min_viable_order"], 2),
         # Convert peak hour to readable format
-        peak_time = None
-        if peak_hour is not None:
-            peak_time = f"{peak_hour}:00 - {peak_hour+1}:00"
-        
-        return {
-            "suggestion": suggestion_text,
-            "minimum_order": round(min_viable_order, 2),
-            "peak_time": peak_time,
-            "average_order": round(avg_order, 2),
-            "total_orders": len(order_amounts),
-            "reasoning": f"Based on {len(entries)} entries across {len(order_amounts)} orders"
-        }
+        "peak_time": f"{peak_hour}:00 - {peak_hour+1}:00" if peak_hour is not None else None,
+        "average_order": round(stats["avg_order"], 2),
+        "total_orders": stats["order_count"],
+        "reasoning": reasoning,
+        "cache_status": cache_status
+    }
+
+def fallback_suggestion(stats: dict) -> str:
+    return f"Keep working during peak hours ({stats['peak_hour']}:00) and aim for orders above ${stats['min_viable_order']:.2f}"
+
+NO_DATA_RESPONSE = {
+    "suggestion": "Start logging your deliveries to get personalized earning optimization tips!",
+    "minimum_order": None,
+    "peak_time": None,
+    "reasoning": "No data available yet",
+    "cache_status": "bypass"
+}
+
+async def get_ai_suggestions(
+    db: Session,
+    from_date: Optional[datetime] = None,
+    to_date: Optional[datetime] = None
+) -> dict:
+    """Generate AI suggestions for earning optimization based on recent data"""
+    # Queries run in a worker thread so they don't hold up the event loop
+    stats = await asyncio.to_thread(build_suggestion_stats, db, from_date, to_date)
+    if stats is None:
+        return dict(NO_DATA_RESPONSE)
+    
+    fingerprint = context_fingerprint(stats["context"])
+    cached = await asyncio.to_thread(get_cached_suggestion, db, fingerprint)
+    if cached is not None:
+        return _response(stats, cached, "hit")
+    
+    # The completion keeps running past the timeout so its answer is cached
+    # for the next request, even though this one gets the fallback
+    completion = asyncio.ensure_future(_complete_and_cache(stats["context"], fingerprint, db.get_bind()))
+    completion.add_done_callback(_log_failure)
+    try:
+        suggestion = await asyncio.wait_for(asyncio.shield(completion), COMPLETION_TIMEOUT_SECONDS)
+    except Exception:
+        # Fallback if AI call fails or is slow
+        return _response(stats, fallback_suggestion(stats), "fallback")
+    return _response(stats, suggestion, "miss")
+
+async def stream_ai_suggestions(
+    db: Session,
+    from_date: Optional[datetime] = None,
+    to_date: Optional[datetime] = None
+) -> AsyncIterator[str]:
+    """Server-sent events: stats first, then suggestion tokens as they arrive, then done"""
+    stats = await asyncio.to_thread(build_suggestion_stats, db, from_date, to_date)
+    summary = _response(stats, "", "miss") if stats else dict(NO_DATA_RESPONSE)
+    suggestion, cache_status = summary.pop("suggestion"), summary.pop("cache_status")
+    yield _sse("stats", summary)
+    if stats is None:
+        yield _sse("token", {"text": suggestion})
+        yield _sse("done", {"cache_status": cache_status})
+        return
     
+    fingerprint = context_fingerprint(stats["context"])
+    cached = await asyncio.to_thread(get_cached_suggestion, db, fingerprint)
+    if cached is not None:
+        yield _sse("token", {"text": cached})
+        yield _sse("done", {"cache_status": "hit"})
+        return
+    
+    parts = []
+    stream = None
+    try:
+        stream = await asyncio.wait_for(
+            client.chat.completions.create(**_completion_args(stats["context"]), stream=True),
+            FIRST_TOKEN_TIMEOUT_SECONDS
+        )
+        chunks = stream.__aiter__()
+        timeout = FIRST_TOKEN_TIMEOUT_SECONDS
+        while True:
+            try:
+                chunk = await asyncio.wait_for(chunks.__anext__(), timeout)
+            except StopAsyncIteration:
+                break
+            text = chunk.choices[0].delta.content if chunk.choices else None
+            if text:
+                parts.append(text)
+                timeout = TOKEN_IDLE_TIMEOUT_SECONDS
+                yield _sse("token", {"text": text})
     except Exception as e:
-        # Fallback if AI call fails
-        return {
-            "suggestion": f"Keep working during peak hours ({peak_hour}:00) and aim for orders above ${min_viable_order:.2f}",
-            "minimum_order": round(min_viable_order, 2),
-            "peak_time": f"{peak_hour}:00 - {peak_hour+1}:00" if peak_hour else None,
-            "average_order": round(avg_order, 2),
-            "total_orders": len(order_amounts),
-            "reasoning": f"Statistical analysis of {len(entries)} entries"
-        }
+        logger.warning("Suggestion stream failed after %d tokens: %r", len(parts), e)
+        if not parts:
+            yield _sse("token", {"text": fallback_suggestion(stats)})
+        yield _sse("done", {"cache_status": "fallback"})
+        return
+    finally:
+        # Also runs when the client disconnects and the generator is closed,
+        # so the upstream completion is not left running
+        if stream is not None:
+            await stream.close()
+    
+    await asyncio.to_thread(store_suggestion, db, fingerprint, "".join(parts))
+    yield _sse("done", {"cache_status": "miss"})
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def _completion_args(context: str) -> dict:
+    return {
+        "model": MODEL,
+        "messages": [
+            {
+                "role": "system",
+                "content": SYSTEM_PROMPT
+            },
+            {
+                "role": "user",
+                "content": context
+            }
+        ],
+        "temperature": 0.7,
+        "max_tokens": 300
+    }
+
+async def _complete(context: str) -> str:
+    response = await client.chat.completions.create(**_completion_args(context))
+    return response.choices[0].message.content
+
+async def _complete_and_cache(context: str, fingerprint: str, bind) -> str:
+    suggestion = await _complete(context)
+    await asyncio.to_thread(_store_in_own_session, bind, fingerprint, suggestion)
+    return suggestion
+
+def _store_in_own_session(bind, fingerprint: str, suggestion: str):
+    # Own session on the request's engine: the request's session may be
+    # closed by the time the completion finishes
+    db = Session(bind=bind)
+    try:
+        store_suggestion(db, fingerprint, suggestion)
+    finally:
+        db.close()
+
+def _log_failure(task: asyncio.Task):
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning("Suggestion completion failed: %r", task.exception())
@@ -34,6 +34,21 @@ export interface EntryCreate {
   receipt_url?: string;
 }
 
+export interface SuggestionStats {
+  minimum_order: number | null;
+  peak_time: string | null;
+  average_order?: number;
+  total_orders?: number;
+  reasoning: string;
+}
+
+export interface SuggestionStreamHandlers {
+  onStats: (stats: SuggestionStats) => void;
+  onToken: (text: string) => void;
+  onDone: (result: { cache_status: string }) => void;
+  onError: () => void;
+}
+
 export const getCategoryEmoji = (category: ExpenseCategory): string => {
   switch (category) {
     case 'GAS': return '⛽';
@@ -75,8 +90,124 @@ export interface Rollup {
   by_app: Record<string, number>;
   goal?: Goal | null;
   goal_progress?: number | null;
+  period?: {
+    timeframe: TimeframeType;
+    tz: string;
+    start: string;
+    end: string;
+  } | null;
+}
+
+export interface GoalProgress {
+  goal_id: number;
+  timeframe: TimeframeType;
+  target_profit: number;
+  profit: number;
+  percent: number | null;
+  remaining: number;
+  projected_profit: number;
+  on_track: boolean;
+  period_start: string;
+  period_end: string;
+}
+
+export interface MetricDelta {
+  absolute: number;
+  percent: number | null;
+}
+
+export type RollupDeltas = Record<
+  'revenue' | 'expenses' | 'profit' | 'miles' | 'hours' | 'dollars_per_mile' |
+  'dollars_per_hour' | 'average_order_value' | 'per_hour_first_to_last',
+  MetricDelta
+> & {
+  by_type: Record<string, MetricDelta>;
+  by_app: Record<string, MetricDelta>;
+};
+
+export interface RollupComparison {
+  against: 'previous' | 'same_last_year';
+  current: Rollup;
+  comparison: Rollup;
+  comparison_to_date: Rollup;
+  deltas: RollupDeltas;
+  pacing_deltas: RollupDeltas;
+}
+
+export interface RollingPoint {
+  day: string;
+  day_profit: number;
+  profit: number;
+  average_profit: number;
+  hours: number;
+  miles: number;
+  orders: number;
+  dollars_per_hour: number | null;
+  dollars_per_mile: number | null;
 }
 
+export interface RollingSeries {
+  window_days: number;
+  from_day: string;
+  to_day: string;
+  series: RollingPoint[];
+}
+
+export type CubeDimension = 'app' | 'type' | 'category' | 'hour' | 'weekday';
+export type CubeMeasure = 'amount' | 'miles' | 'minutes' | 'count' | 'dollars_per_mile' | 'dollars_per_hour';
+
+export interface RollupCube {
+  dims: CubeDimension[];
+  measures: CubeMeasure[];
+  cells: Array<Record<string, string | number | null>>;
+  totals: Partial<Record<CubeMeasure, number | null>>;
+}
+
+export interface QuantileSummary {
+  count: number;
+  quantiles: Record<string, number | null>;
+}
+
+export interface Distribution {
+  from_day: string | null;
+  to_day: string | null;
+  relative_accuracy: number;
+  metrics: Record<'order_value' | 'dollars_per_hour', QuantileSummary & { by_app: Record<string, QuantileSummary> }>;
+}
+
+export interface DuplicateReport {
+  window_minutes: number;
+  by_order_id: Array<{ app: string; order_key: string; entry_ids: number[]; double_counted: number }>;
+  by_amount_and_time: Array<{ app: string; amount: number; entry_ids: number[]; minutes_apart: number }>;
+  double_counted: number;
+}
+
+export interface Shift {
+  start: string;
+  end: string;
+  orders: number;
+  revenue: number;
+  miles: number;
+  active_hours: number;
+  dollars_per_hour: number | null;
+  dollars_per_mile: number | null;
+}
+
+export interface ShiftsResponse {
+  gap_minutes: number;
+  shifts: Shift[];
+  totals: {
+    shifts: number;
+    orders: number;
+    revenue: number;
+    active_hours: number;
+    dollars_per_hour: number | null;
+  };
+}
+
+// The browser's IANA zone, so the server can resolve periods in local days
+export const localTimeZone = (): string => Intl.DateTimeFormat().resolvedOptions().timeZone;
+
 export const api = {
   async getHealth() {
     const res = await fetch(`${API_BASE}/api/health`);
@@ -103,10 +234,20 @@ export const api = {
       headers: { 'Content-Type': 'application/json' },
       body: JSON.stringify(entry),
     });
+    if (res.status === 409) throw new Error((await res.json()).detail);
     if (!res.ok) throw new Error('Failed to create entry');
     return res.json();
   },
 
+  async getDuplicateEntries(windowMinutes?: number): Promise<DuplicateReport> {
+    const params = new URLSearchParams();
+    if (windowMinutes !== undefined) params.append('window_minutes', String(windowMinutes));
+
+    const res = await fetch(`${API_BASE}/api/entries/duplicates?${params}`);
+    if (!res.ok) throw new Error('Failed to fetch duplicate entries');
+    return res.json();
+  },
+
   async getEntries(from?: string, to?: string, limit = 100, cursor?: number): Promise<Entry[]> {
     const params = new URLSearchParams();
     if (from) params.append('from_date', from);
@@ -142,17 +283,47 @@ export const api = {
     if (!res.ok) throw new Error('Failed to delete all entries');
   },
 
-  async getRollup(from?: string, to?: string, timeframe?: string): Promise<Rollup> {
+  async getRollup(from?: string, to?: string, timeframe?: string, tz?: string): Promise<Rollup> {
     const params = new URLSearchParams();
     if (from) params.append('from_date', from);
     if (to) params.append('to_date', to);
     if (timeframe) params.append('timeframe', timeframe);
+    if (tz) params.append('tz', tz);
     
     const res = await fetch(`${API_BASE}/api/rollup?${params}`);
     if (!res.ok) throw new Error('Failed to fetch rollup');
     return res.json();
   },
 
+  async compareRollup(timeframe: TimeframeType, against: 'previous' | 'same_last_year' = 'previous', tz?: string): Promise<RollupComparison> {
+    const params = new URLSearchParams({ timeframe, against });
+    if (tz) params.append('tz', tz);
+
+    const res = await fetch(`${API_BASE}/api/rollup/compare?${params}`);
+    if (!res.ok) throw new Error('Failed to fetch rollup comparison');
+    return res.json();
+  },
+
+  async getRollingRollup(windowDays: number, from?: string, to?: string): Promise<RollingSeries> {
+    const params = new URLSearchParams({ window: `${windowDays}d` });
+    if (from) params.append('from_date', from);
+    if (to) params.append('to_date', to);
+
+    const res = await fetch(`${API_BASE}/api/rollup/rolling?${params}`);
+    if (!res.ok) throw new Error('Failed to fetch rolling rollup');
+    return res.json();
+  },
+
+  async getRollupCube(dims: CubeDimension[], measures: CubeMeasure[], timeframe?: string, tz?: string): Promise<RollupCube> {
+    const params = new URLSearchParams({ dims: dims.join(','), measures: measures.join(',') });
+    if (timeframe) params.append('timeframe', timeframe);
+    if (tz) params.append('tz', tz);
+
+    const res = await fetch(`${API_BASE}/api/rollup/cube?${params}`);
+    if (!res.ok) throw new Error('Failed to fetch rollup cube');
+    return res.json();
+  },
+
   async createGoal(timeframe: TimeframeType, target_profit: number): Promise<Goal> {
     const res = await fetch(`${API_BASE}/api/goals`, {
       method: 'POST',
@@ -163,6 +334,35 @@ export const api = {
     return res.json();
   },
 
+  async getDistribution(timeframe: TimeframeType, tz?: string, quantiles?: number[]): Promise<Distribution> {
+    const params = new URLSearchParams({ timeframe });
+    if (tz) params.append('tz', tz);
+    if (quantiles) params.append('quantiles', quantiles.join(','));
+
+    const res = await fetch(`${API_BASE}/api/stats/distribution?${params}`);
+    if (!res.ok) throw new Error('Failed to fetch distribution');
+    return res.json();
+  },
+
+  async getShifts(timeframe: TimeframeType, tz?: string, gapMinutes?: number): Promise<ShiftsResponse> {
+    const params = new URLSearchParams({ timeframe });
+    if (tz) params.append('tz', tz);
+    if (gapMinutes) params.append('gap_minutes', String(gapMinutes));
+
+    const res = await fetch(`${API_BASE}/api/shifts?${params}`);
+    if (!res.ok) throw new Error('Failed to fetch shifts');
+    return res.json();
+  },
+
+  async getGoalsProgress(tz?: string): Promise<GoalProgress[]> {
+    const params = new URLSearchParams();
+    if (tz) params.append('tz', tz);
+
+    const res = await fetch(`${API_BASE}/api/goals/progress?${params}`);
+    if (!res.ok) throw new Error('Failed to fetch goal progress');
+    return res.json();
+  },
+
   async getGoal(timeframe: TimeframeType): Promise<Goal | null> {
     try {
       const res = await fetch(`${API_BASE}/api/goals/${timeframe}`);
@@ -200,6 +400,26 @@ export const api = {
     return res.json();
   },
 
+  // Returns a function that closes the stream; closing cancels the model call server-side
+  streamSuggestions(from: string | undefined, to: string | undefined, handlers: SuggestionStreamHandlers) {
+    const params = new URLSearchParams();
+    if (from) params.append('from_date', from);
+    if (to) params.append('to_date', to);
+
+    const source = new EventSource(`${API_BASE}/api/suggestions/stream?${params}`);
+    source.addEventListener('stats', (e) => handlers.onStats(JSON.parse((e as MessageEvent).data)));
+    source.addEventListener('token', (e) => handlers.onToken(JSON.parse((e as MessageEvent).data).text));
+    source.addEventListener('done', (e) => {
+      source.close();
+      handlers.onDone(JSON.parse((e as MessageEvent).data));
+    });
+    source.onerror = () => {
+      source.close();
+      handlers.onError();
+    };
+    return () => source.close();
+  },
+
   async getOAuthStatus(): Promise<Record<string, { connected: boolean; token_expires_at: string | null }>> {
     const res = await fetch(`${API_BASE}/api/oauth/status`);
     if (!res.ok) throw new Error('Failed to fetch OAuth status');
@@ -1,21 +1,32 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from backend.routers import health, settings, entries, rollup, goals, suggestions, oauth
-from backend.db import engine, Base
+from backend.routers import health, settings, entries, rollup, goals, suggestions, oauth, sync, jobs, webhooks, insights, shifts, stats
+from backend.db import engine, Base, SessionLocal
+from backend.services.migrations import run_migrations
 from backend.services.background_jobs import start_background_jobs, stop_background_jobs
+from backend.services.webhook_ingest import webhook_queue
+from backend.services.reference_data import reference_cache
 
 Base.metadata.create_all(bind=engine)
+run_migrations(engine)
 
 app = FastAPI(title="Delivery Driver Earnings API")
 
 # Start background jobs on startup
 @app.on_event("startup")
 async def startup_event():
+    db = SessionLocal()
+    try:
+        reference_cache.load(db)
+    finally:
+        db.close()
     start_background_jobs()
+    webhook_queue.start()
 
 @app.on_event("shutdown")
 async def shutdown_event():
-    stop_background_jobs()
+    await stop_background_jobs()
+    await webhook_queue.stop()
 
 app.add_middleware(
     CORSMiddleware,
@@ -32,6 +43,12 @@ app.include_router(rollup.router, prefix="/api", tags=["rollup"])
 app.include_router(goals.router, prefix="/api", tags=["goals"])
 app.include_router(suggestions.router, prefix="/api", tags=["suggestions"])
 app.include_router(oauth.router, prefix="/api", tags=["oauth"])
+app.include_router(sync.router, prefix="/api", tags=["sync"])
+app.include_router(jobs.router, prefix="/api", tags=["jobs"])
+app.include_router(webhooks.router, prefix="/api", tags=["webhooks"])
+app.include_router(insights.router, prefix="/api", tags=["insights"])
+app.include_router(shifts.router, prefix="/api", tags=["shifts"])
+app.include_router(stats.router, prefix="/api", tags=["stats"])
 
 @app.get("/")
 async def root():
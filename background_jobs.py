@@ -1,41 +1,209 @@
 import asyncio
-from datetime import datetime
-from apscheduler.schedulers.background import BackgroundScheduler
+import logging
+import random
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Optional
 from backend.db import SessionLocal
 from backend.services.sync_service import sync_all_platforms
+from backend.services.leader import LeaderElector
+from backend.services.credential_manager import credential_manager
 
-scheduler = BackgroundScheduler()
+logger = logging.getLogger(__name__)
 
-def sync_job():
+
+class Job:
+    """A recurring coroutine job and its run metrics"""
+    
+    def __init__(self, id: str, name: str, func: Callable[[], Awaitable[None]], interval: timedelta, jitter: timedelta):
+        self.id = id
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.jitter = jitter
+        self.running = False
+        self.next_run_at: Optional[datetime] = None
+        self.last_started_at: Optional[datetime] = None
+        self.last_finished_at: Optional[datetime] = None
+        self.last_duration_seconds: Optional[float] = None
+        self.last_success_at: Optional[datetime] = None
+        self.last_failure_at: Optional[datetime] = None
+        self.last_error: Optional[str] = None
+        # Seconds between when the last scheduled run was due and when it started
+        self.last_lag_seconds: Optional[float] = None
+        self.run_count = 0
+        self.failure_count = 0
+        self.skipped_count = 0
+    
+    def schedule_next(self, after: datetime):
+        jitter = random.uniform(0, self.jitter.total_seconds())
+        self.next_run_at = after + self.interval + timedelta(seconds=jitter)
+    
+    def status(self) -> dict:
+        now = datetime.utcnow()
+        return {
+            "id": self.id,
+            "name": self.name,
+            "interval_seconds": self.interval.total_seconds(),
+            "running": self.running,
+            "next_run_at": self.next_run_at.isoformat() if self.next_run_at else None,
+            "last_started_at": self.last_started_at.isoformat() if self.last_started_at else None,
+            "last_finished_at": self.last_finished_at.isoformat() if self.last_finished_at else None,
+            "last_duration_seconds": self.last_duration_seconds,
+            "last_success_at": self.last_success_at.isoformat() if self.last_success_at else None,
+            "last_failure_at": self.last_failure_at.isoformat() if self.last_failure_at else None,
+            "last_error": self.last_error,
+            "last_lag_seconds": self.last_lag_seconds,
+            "seconds_since_success": (now - self.last_success_at).total_seconds() if self.last_success_at else None,
+            "run_count": self.run_count,
+            "failure_count": self.failure_count,
+            "skipped_count": self.skipped_count
+        }
+
+
+class JobScheduler:
+    """Interval scheduler running jobs as tasks on the app's event loop.
+    
+    A job never overlaps with itself: a run that comes due while the
+    previous one is still going is skipped and counted.
+    """
+    
+    def __init__(self):
+        self.jobs: Dict[str, Job] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._runs: set = set()
+    
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+    
+    def add_job(self, func: Callable[[], Awaitable[None]], interval: timedelta, id: str, name: str, jitter: timedelta = timedelta(0)):
+        if id in self._tasks:
+            self._tasks.pop(id).cancel()
+        job = Job(id, name, func, interval, jitter)
+        self.jobs[id] = job
+        if self.running:
+            self._start_job(job)
+        return job
+    
+    def start(self):
+        for job in self.jobs.values():
+            if job.id not in self._tasks:
+                self._start_job(job)
+    
+    async def shutdown(self):
+        tasks = list(self._tasks.values()) + list(self._runs)
+        self._tasks.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    
+    def trigger(self, job_id: str) -> bool:
+        """Start a job now in the background; False if it is already running"""
+        job = self.jobs[job_id]
+        if job.running:
+            return False
+        # Claimed before the task starts so a second trigger is rejected
+        job.running = True
+        task = asyncio.create_task(self._run(job))
+        self._runs.add(task)
+        task.add_done_callback(self._runs.discard)
+        return True
+    
+    def _start_job(self, job: Job):
+        job.schedule_next(datetime.utcnow())
+        self._tasks[job.id] = asyncio.create_task(self._loop(job))
+    
+    async def _loop(self, job: Job):
+        while True:
+            delay = (job.next_run_at - datetime.utcnow()).total_seconds()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            
+            due_at = job.next_run_at
+            job.schedule_next(due_at)
+            if job.next_run_at < datetime.utcnow():
+                # Fell behind by more than an interval; don't fire a burst of catch-up runs
+                job.schedule_next(datetime.utcnow())
+            
+            if job.running:
+                job.skipped_count += 1
+                logger.warning("Skipping %s: previous run still in progress", job.id)
+                continue
+            
+            job.last_lag_seconds = (datetime.utcnow() - due_at).total_seconds()
+            await self._run(job)
+    
+    async def _run(self, job: Job):
+        job.running = True
+        started = datetime.utcnow()
+        job.last_started_at = started
+        logger.info("Starting job %s", job.id)
+        try:
+            await job.func()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            job.failure_count += 1
+            job.last_failure_at = datetime.utcnow()
+            job.last_error = str(e)
+            logger.exception("Job %s failed", job.id)
+        else:
+            job.last_success_at = datetime.utcnow()
+            job.last_error = None
+            logger.info("Job %s completed", job.id)
+        finally:
+            job.running = False
+            job.run_count += 1
+            job.last_finished_at = datetime.utcnow()
+            job.last_duration_seconds = (job.last_finished_at - started).total_seconds()
+
+
+scheduler = JobScheduler()
+
+async def sync_job():
     """Background job to sync orders from all platforms"""
     db = SessionLocal()
     try:
-        print(f"[{datetime.utcnow()}] Starting order sync...")
-        asyncio.run(sync_all_platforms(db))
-        print(f"[{datetime.utcnow()}] Order sync completed")
-    except Exception as e:
-        print(f"Error in sync job: {e}")
+        await sync_all_platforms(db)
     finally:
         db.close()
 
+# Only the worker holding the lease runs scheduled jobs
+elector = LeaderElector("background_jobs", on_elected=scheduler.start, on_demoted=scheduler.shutdown)
+_elector_task: Optional[asyncio.Task] = None
+
 def start_background_jobs():
-    """Start all background jobs"""
-    # Sync every 1 hour
+    """Register background jobs and start competing for leadership"""
+    global _elector_task
+    
+    # Sync every 1 hour, spread by up to 5 minutes
     scheduler.add_job(
         sync_job,
-        'interval',
-        minutes=60,
+        timedelta(minutes=60),
         id='sync_orders',
         name='Sync Orders from Platforms',
-        replace_existing=True
+        jitter=timedelta(minutes=5)
+    )
+    # Keep platform tokens ahead of expiry so syncs never start with a stale one
+    scheduler.add_job(
+        credential_manager.refresh_expiring,
+        timedelta(minutes=5),
+        id='refresh_tokens',
+        name='Refresh Platform Tokens',
+        jitter=timedelta(seconds=30)
     )
     
-    if not scheduler.running:
-        scheduler.start()
-        print("Background jobs started")
+    if _elector_task is None:
+        _elector_task = asyncio.create_task(elector.run())
+        logger.info("Background jobs waiting for leadership as %s", elector.worker_id)
 
-def stop_background_jobs():
-    """Stop all background jobs"""
-    if scheduler.running:
-        scheduler.shutdown()
-        print("Background jobs stopped")
+async def stop_background_jobs():
+    """Stop all background jobs and hand over leadership"""
+    global _elector_task
+    
+    if _elector_task is not None:
+        _elector_task.cancel()
+        await asyncio.gather(_elector_task, return_exceptions=True)
+        _elector_task = None
+    await scheduler.shutdown()
+    logger.info("Background jobs stopped")
@@ -0,0 +1,101 @@
+import argparse
+import asyncio
+import os
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from backend.db import Base
+from backend.models import ApiCredential, PlatformIntegration, Entry
+from backend.mock_platforms import MockPlatformConfig, create_uber_app, create_shipt_app, mock_transport
+from backend.services import resilience
+from backend.services.credential_manager import credential_manager
+from backend.services.sync_service import sync_all_platforms
+
+# Sync throughput benchmark against the local mock platform servers.
+# Runs a full backfill into a throwaway SQLite file and reports
+# orders/sec, SQL statements per order and peak memory. Peak memory is
+# the process's max RSS; --trace-memory reports the Python heap peak from
+# tracemalloc instead, which is exact but slows the run down ~3x.
+
+APP_FACTORIES = {
+    PlatformIntegration.UBER: create_uber_app,
+    PlatformIntegration.SHIPT: create_shipt_app,
+}
+
+def run_benchmark(orders: int, platforms, latency: float, error_rate: float, days: int, trace_memory: bool = False) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{tmp}/bench.db", connect_args={"check_same_thread": False})
+        Base.metadata.create_all(bind=engine)
+        BenchSession = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        credential_manager.session_factory = BenchSession
+        
+        db = BenchSession()
+        transports = {}
+        for platform in platforms:
+            db.add(ApiCredential(platform=platform, access_token="bench", is_active=1))
+            config = MockPlatformConfig(order_count=orders, days=days, latency_seconds=latency, error_rate=error_rate)
+            transports[platform] = mock_transport(APP_FACTORIES[platform](config))
+            # Measure the sync path, not the client-side politeness limit
+            resilience.configure_rate_limit(platform, rate=1e6, burst=1000)
+        db.commit()
+        
+        statements = [0]
+        def count_statement(*args):
+            statements[0] += 1
+        event.listen(engine, "before_cursor_execute", count_statement)
+        
+        if trace_memory:
+            tracemalloc.start()
+        started = time.perf_counter()
+        runs = asyncio.run(sync_all_platforms(db, full_resync=True, transports=transports))
+        elapsed = time.perf_counter() - started
+        if trace_memory:
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        else:
+            # ru_maxrss is in KB on Linux
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        event.remove(engine, "before_cursor_execute", count_statement)
+        
+        synced = db.query(Entry).count()
+        failed = [run for run in runs if run.status != "completed"]
+        db.close()
+        engine.dispose()
+    
+    return {
+        "orders": synced,
+        "seconds": round(elapsed, 3),
+        "orders_per_second": round(synced / elapsed, 1) if elapsed else None,
+        "statements": statements[0],
+        "statements_per_order": round(statements[0] / synced, 3) if synced else None,
+        "peak_memory_mb": round(peak / 1024 / 1024, 2),
+        "failed_runs": len(failed)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark platform order sync against mock servers")
+    parser.add_argument("--orders", type=int, default=5000, help="orders per platform")
+    parser.add_argument("--platform", choices=["uber", "shipt", "all"], default="all")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every mock request")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of mock requests that fail with 503")
+    parser.add_argument("--days", type=int, default=30, help="days the mock orders are spread over")
+    parser.add_argument("--trace-memory", action="store_true", help="report the tracemalloc heap peak instead of max RSS")
+    args = parser.parse_args()
+    
+    if args.platform == "all":
+        platforms = list(APP_FACTORIES)
+    else:
+        platforms = [PlatformIntegration[args.platform.upper()]]
+    
+    result = run_benchmark(args.orders, platforms, args.latency, args.error_rate, args.days, args.trace_memory)
+    for key, value in result.items():
+        print(f"{key:>22}: {value}")
+
+if __name__ == "__main__":
+    main()
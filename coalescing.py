@@ -0,0 +1,126 @@
+import asyncio
+import inspect
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict
+from sqlalchemy import event
+from sqlalchemy.orm import Session, sessionmaker
+from backend.models import Entry, Goal, Settings
+
+# Identical read requests that arrive while one is already being computed
+# await that computation instead of starting their own. Nothing is kept
+# once it finishes, so this only ever shares work between overlapping
+# requests; keys carry a data version so a request made after a write
+# never joins a computation that started before it.
+
+# Tables the coalesced endpoints read; writes to anything else (leases,
+# sync runs, the suggestion cache) leave the version alone
+DATA_TABLES = (Entry.__table__, Settings.__table__, Goal.__table__)
+_DIRTY = "coalescing_dirty"
+
+_data_version = 0
+
+
+def data_version() -> int:
+    return _data_version
+
+
+def bump_data_version():
+    global _data_version
+    _data_version += 1
+
+
+@event.listens_for(Session, "after_flush")
+def _track_flush(session: Session, flush_context):
+    changed = list(session.new) + list(session.dirty) + list(session.deleted)
+    if any(getattr(obj, "__table__", None) in DATA_TABLES for obj in changed):
+        session.info[_DIRTY] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_bulk(orm_execute_state):
+    # Bulk insert/update/delete statements bypass the flush
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None and mapper.local_table in DATA_TABLES:
+            orm_execute_state.session.info[_DIRTY] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _publish(session: Session):
+    if session.info.pop(_DIRTY, False):
+        bump_data_version()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard(session: Session):
+    session.info.pop(_DIRTY, None)
+
+
+class SingleFlight:
+    """At most one in-flight computation per key, shared by every caller"""
+
+    def __init__(self):
+        self._inflight: Dict[tuple, asyncio.Future] = {}
+        self.executed = Counter()
+        self.coalesced = Counter()
+
+    async def run(self, key: tuple, compute: Callable[[], Awaitable[Any]]) -> Any:
+        endpoint = key[0]
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced[endpoint] += 1
+        else:
+            self.executed[endpoint] += 1
+            future = asyncio.ensure_future(compute())
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # A caller that goes away must not cancel the work for the others
+        return await asyncio.shield(future)
+
+    def metrics(self) -> dict:
+        endpoints = sorted(set(self.executed) | set(self.coalesced))
+        return {
+            "data_version": data_version(),
+            "in_flight": len(self._inflight),
+            "endpoints": {
+                endpoint: {
+                    "executed": self.executed[endpoint],
+                    "coalesced": self.coalesced[endpoint]
+                }
+                for endpoint in endpoints
+            }
+        }
+
+
+single_flight = SingleFlight()
+
+
+async def coalesced(endpoint: str, db: Session, func: Callable, *args) -> Any:
+    """Run func(session, *args) once for all identical concurrent requests.
+
+    The computation gets its own session on the request's engine, since it
+    may outlive the request that started it. Plain functions run in a
+    worker thread so overlapping requests can actually overlap.
+    """
+    key = (endpoint, data_version(), args)
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=db.get_bind())
+
+    if inspect.iscoroutinefunction(func):
+        async def compute():
+            session = factory()
+            try:
+                return await func(session, *args)
+            finally:
+                session.close()
+    else:
+        def call():
+            session = factory()
+            try:
+                return func(session, *args)
+            finally:
+                session.close()
+
+        async def compute():
+            return await asyncio.to_thread(call)
+
+    return await single_flight.run(key, compute)
@@ -0,0 +1,154 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Dict, NamedTuple, Optional
+import httpx
+from backend.db import SessionLocal
+from backend.models import ApiCredential, PlatformIntegration
+from backend.services.resilience import request_with_retries
+from backend.services.reference_data import reference_cache
+
+logger = logging.getLogger(__name__)
+
+# OAuth credentials from environment
+UBER_CLIENT_ID = os.getenv("UBER_CLIENT_ID", "demo_uber_client")
+UBER_CLIENT_SECRET = os.getenv("UBER_CLIENT_SECRET", "demo_uber_secret")
+UBER_REDIRECT_URI = os.getenv("UBER_REDIRECT_URI", "http://localhost:5000/api/oauth/uber/callback")
+
+SHIPT_CLIENT_ID = os.getenv("SHIPT_CLIENT_ID", "demo_shipt_client")
+SHIPT_CLIENT_SECRET = os.getenv("SHIPT_CLIENT_SECRET", "demo_shipt_secret")
+SHIPT_REDIRECT_URI = os.getenv("SHIPT_REDIRECT_URI", "http://localhost:5000/api/oauth/shipt/callback")
+
+TOKEN_ENDPOINTS = {
+    PlatformIntegration.UBER: ("https://login.uber.com/oauth/v2/token", UBER_CLIENT_ID, UBER_CLIENT_SECRET),
+    PlatformIntegration.SHIPT: ("https://api.shipt.com/oauth/token", SHIPT_CLIENT_ID, SHIPT_CLIENT_SECRET),
+}
+
+# Tokens are refreshed once they are this close to expiring
+REFRESH_MARGIN = timedelta(minutes=10)
+
+
+class TokenUnavailableError(Exception):
+    """No usable access token for a platform"""
+
+
+class CachedToken(NamedTuple):
+    access_token: str
+    refresh_token: Optional[str]
+    expires_at: Optional[datetime]
+
+
+class CredentialManager:
+    """In-memory cache of platform access tokens, refreshed ahead of expiry.
+    
+    Refreshes are single-flight per platform: concurrent callers await the
+    same refresh instead of each spending the refresh token.
+    """
+    
+    def __init__(self, session_factory=SessionLocal, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.session_factory = session_factory
+        self.transport = transport
+        self._tokens: Dict[PlatformIntegration, CachedToken] = {}
+        self._refreshing: Dict[PlatformIntegration, asyncio.Task] = {}
+    
+    @staticmethod
+    def is_fresh(token: CachedToken) -> bool:
+        return token.expires_at is None or token.expires_at - REFRESH_MARGIN > datetime.utcnow()
+    
+    async def get_token(self, platform: PlatformIntegration) -> str:
+        """Return an access token that is valid for at least REFRESH_MARGIN"""
+        token = self._tokens.get(platform)
+        if token is None or not self.is_fresh(token):
+            # Another worker may already have refreshed and stored it
+            token = await asyncio.to_thread(self._load, platform)
+        if token is None:
+            raise TokenUnavailableError(f"{platform.value} is not connected")
+        
+        self._tokens[platform] = token
+        if not self.is_fresh(token):
+            token = await self.refresh(platform)
+        return token.access_token
+    
+    async def refresh(self, platform: PlatformIntegration) -> CachedToken:
+        task = self._refreshing.get(platform)
+        if task is None:
+            task = asyncio.create_task(self._refresh(platform))
+            self._refreshing[platform] = task
+            task.add_done_callback(lambda _: self._refreshing.pop(platform, None))
+        # Shielded so one cancelled caller doesn't abort the refresh for the others
+        return await asyncio.shield(task)
+    
+    async def refresh_expiring(self):
+        """Refresh every connected platform's token that is close to expiry"""
+        for platform in PlatformIntegration:
+            try:
+                token = self._tokens.get(platform) or await asyncio.to_thread(self._load, platform)
+                if token is None:
+                    continue
+                self._tokens[platform] = token
+                if not self.is_fresh(token):
+                    await self.refresh(platform)
+            except Exception as e:
+                logger.error("Failed to refresh %s token: %s", platform.value, e)
+    
+    def invalidate(self, platform: Optional[PlatformIntegration] = None):
+        """Drop cached tokens after credentials change or are rejected"""
+        if platform is None:
+            self._tokens.clear()
+        else:
+            self._tokens.pop(platform, None)
+    
+    async def _refresh(self, platform: PlatformIntegration) -> CachedToken:
+        token = self._tokens.get(platform)
+        if token is None or not token.refresh_token:
+            raise TokenUnavailableError(f"No refresh token for {platform.value}")
+        
+        url, client_id, client_secret = TOKEN_ENDPOINTS[platform]
+        async with httpx.AsyncClient(transport=self.transport) as client:
+            response = await request_with_retries(client, "POST", url, platform, data={
+                "grant_type": "refresh_token",
+                "refresh_token": token.refresh_token,
+                "client_id": client_id,
+                "client_secret": client_secret
+            })
+        
+        token_data = response.json()
+        refreshed = CachedToken(
+            access_token=token_data["access_token"],
+            # Some providers rotate the refresh token, others keep the old one valid
+            refresh_token=token_data.get("refresh_token") or token.refresh_token,
+            expires_at=datetime.utcnow() + timedelta(seconds=token_data.get("expires_in", 3600))
+        )
+        await asyncio.to_thread(self._save, platform, refreshed)
+        self._tokens[platform] = refreshed
+        logger.info("Refreshed %s access token", platform.value)
+        return refreshed
+    
+    def _load(self, platform: PlatformIntegration) -> Optional[CachedToken]:
+        db = self.session_factory()
+        try:
+            cred = db.query(ApiCredential).filter(
+                ApiCredential.platform == platform,
+                ApiCredential.is_active == 1
+            ).first()
+            if not cred:
+                return None
+            return CachedToken(cred.access_token, cred.refresh_token, cred.token_expires_at)
+        finally:
+            db.close()
+    
+    def _save(self, platform: PlatformIntegration, token: CachedToken):
+        db = self.session_factory()
+        try:
+            cred = db.query(ApiCredential).filter(ApiCredential.platform == platform).first()
+            if cred:
+                cred.access_token = token.access_token
+                cred.refresh_token = token.refresh_token
+                cred.token_expires_at = token.expires_at
+                reference_cache.commit(db)
+        finally:
+            db.close()
+
+
+credential_manager = CredentialManager()
@@ -0,0 +1,164 @@
+import threading
+from collections import OrderedDict
+from sqlalchemy import Integer, cast, func, select
+from sqlalchemy.orm import Session
+from backend.models import Entry
+from backend.services.coalescing import data_version
+from backend.services.insights_service import WEEKDAYS
+from backend.services.period import Period
+from backend.services.reference_data import entries_version
+from datetime import datetime
+from decimal import Decimal
+from typing import Optional, Tuple
+
+# Dimensions and measures a cube can be asked for; hour and weekday are UTC,
+# like the insights heatmap
+DIMENSIONS = {
+    "app": Entry.app,
+    "type": Entry.type,
+    "category": Entry.category,
+    "hour": cast(func.strftime('%H', Entry.timestamp), Integer),
+    # SQLite's %w counts from Sunday; shift so Monday is 0
+    "weekday": (cast(func.strftime('%w', Entry.timestamp), Integer) + 6) % 7
+}
+MEASURES = {
+    "amount": func.sum(Entry.amount),
+    "miles": func.sum(Entry.distance_miles),
+    "minutes": func.sum(Entry.duration_minutes),
+    "count": func.count(Entry.id)
+}
+# Rates derived from the sums above, per cell
+DERIVED_MEASURES = {
+    "dollars_per_mile": ("amount", "miles"),
+    "dollars_per_hour": ("amount", "minutes")
+}
+DEFAULT_MEASURES = ("amount", "count")
+
+
+def parse_names(names: Optional[str], allowed, default: Tuple[str, ...] = ()) -> Tuple[str, ...]:
+    """Split a comma-separated list, dropping repeats and keeping the order"""
+    if not names:
+        return default
+    parsed = tuple(dict.fromkeys(n.strip() for n in names.split(",") if n.strip()))
+    unknown = [n for n in parsed if n not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown {', '.join(unknown)}; expected any of {', '.join(allowed)}")
+    return parsed
+
+
+def _label(dim: str, value):
+    if value is None:
+        return None
+    if dim == "weekday":
+        return WEEKDAYS[value]
+    return getattr(value, "value", value)
+
+
+def _measure(name: str, sums: dict):
+    if name in DERIVED_MEASURES:
+        numerator, denominator = DERIVED_MEASURES[name]
+        amount, per = sums[numerator], sums[denominator]
+        if name == "dollars_per_hour":
+            per = per / 60.0
+        return float(round(amount / Decimal(str(per)), 2)) if per else None
+    value = sums[name]
+    if isinstance(value, Decimal):
+        return float(value)
+    if name == "miles":
+        return round(value, 2)
+    return value
+
+
+def calculate_cube(
+    db: Session,
+    dims: Tuple[str, ...],
+    measures: Tuple[str, ...] = DEFAULT_MEASURES,
+    from_date: Optional[datetime] = None,
+    to_date: Optional[datetime] = None,
+    period: Optional[Period] = None
+) -> dict:
+    """Aggregate entries by any combination of DIMENSIONS in one GROUP BY.
+
+    Derived rates are computed per cell from the summed measures they need,
+    so $/mile is earnings over miles for that cell rather than an average of
+    per-entry rates.
+    """
+    needed = set(m for m in measures if m in MEASURES)
+    for m in measures:
+        needed.update(DERIVED_MEASURES.get(m, ()))
+    sum_names = [m for m in MEASURES if m in needed]
+
+    group = [DIMENSIONS[d] for d in dims]
+    query = select(*group, *(MEASURES[m] for m in sum_names))
+    if period:
+        query = query.where(Entry.timestamp >= period.start, Entry.timestamp < period.end)
+    if from_date:
+        query = query.where(Entry.timestamp >= from_date)
+    if to_date:
+        query = query.where(Entry.timestamp <= to_date)
+    if group:
+        query = query.group_by(*group).order_by(*group)
+
+    def zero(m):
+        return Decimal("0") if m == "amount" else 0
+
+    totals = {m: zero(m) for m in sum_names}
+    cells = []
+    for row in db.execute(query).all():
+        keys, values = row[:len(dims)], row[len(dims):]
+        sums = {m: zero(m) if v is None else v for m, v in zip(sum_names, values)}
+        for m in sum_names:
+            totals[m] += sums[m]
+        cell = {d: _label(d, k) for d, k in zip(dims, keys)}
+        cell.update({m: _measure(m, sums) for m in measures})
+        cells.append(cell)
+
+    return {
+        "dims": list(dims),
+        "measures": list(measures),
+        "cells": cells,
+        "totals": {m: _measure(m, totals) for m in measures}
+    }
+
+
+class CubeCache:
+    """Least-recently-used cube results, keyed by the data versions.
+
+    A commit to entries on this worker moves the local data version on at
+    once; one on another worker moves entries_version, seen on its next
+    poll. Stale results are never looked up again and just age out as new
+    ones arrive.
+    """
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self._results: OrderedDict = OrderedDict()
+        # Cubes are computed in worker threads
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, db: Session, *args) -> dict:
+        key = (db.get_bind(), data_version(), entries_version.get(db), args)
+        with self._lock:
+            if key in self._results:
+                self._results.move_to_end(key)
+                self.hits += 1
+                return self._results[key]
+            self.misses += 1
+        result = calculate_cube(db, *args)
+        with self._lock:
+            self._results[key] = result
+            while len(self._results) > self.max_entries:
+                self._results.popitem(last=False)
+        return result
+
+    def metrics(self) -> dict:
+        return {"entries": len(self._results), "hits": self.hits, "misses": self.misses}
+
+
+cube_cache = CubeCache()
+
+
+def get_cube(db: Session, *args) -> dict:
+    return cube_cache.get(db, *args)
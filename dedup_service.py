@@ -0,0 +1,137 @@
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from sqlalchemy import and_, exists, func, or_, select
+from sqlalchemy.orm import Session, aliased
+from backend.models import AppType, Entry, EntryType, SyncedOrder, normalize_order_id
+from backend.services.period import as_naive_utc
+
+# The same order can arrive twice: typed in by hand and pulled in by the
+# platform sync. Two orders are the same when they share an app and a
+# normalized order id, or, when one of them has no order id, the same app
+# and amount within DUPLICATE_WINDOW of each other. Both lookups run on an
+# index, (app, order_key) and (app, amount_cents, timestamp).
+
+DUPLICATE_WINDOW = timedelta(minutes=10)
+
+
+def _not_synced():
+    """Entries no synced order points at, i.e. the ones entered by hand"""
+    return ~exists().where(SyncedOrder.entry_id == Entry.id)
+
+
+def find_by_order_id(db: Session, app: AppType, order_id: Optional[str]) -> Optional[Entry]:
+    """The entry already recorded for this app's order id, if any"""
+    order_key = normalize_order_id(order_id)
+    if not order_key:
+        return None
+    return db.query(Entry).filter(Entry.app == app, Entry.order_key == order_key).first()
+
+
+def match_manual_entries(
+    db: Session,
+    orders: List[dict],
+    window: timedelta = DUPLICATE_WINDOW
+) -> Dict[int, int]:
+    """Map positions in orders (Entry column values about to be synced) to the
+    hand-entered entries they duplicate, in one query for the whole page"""
+    if not orders:
+        return {}
+    stamps = [as_naive_utc(o["timestamp"]) for o in orders]
+    keys = {normalize_order_id(o.get("order_id")) for o in orders} - {None}
+    candidates = db.execute(
+        select(Entry.id, Entry.app, Entry.order_key, Entry.amount, Entry.timestamp).where(
+            Entry.app.in_({o["app"] for o in orders}),
+            Entry.type == EntryType.ORDER,
+            _not_synced(),
+            or_(
+                Entry.order_key.in_(keys),
+                and_(
+                    Entry.order_key.is_(None),
+                    Entry.amount.in_({o["amount"] for o in orders}),
+                    Entry.timestamp.between(
+                        min(stamps) - window,
+                        max(stamps) + window
+                    )
+                )
+            )
+        )
+    ).all()
+
+    by_key = {(c.app, c.order_key): c.id for c in candidates if c.order_key}
+    unkeyed = [c for c in candidates if not c.order_key]
+    matches = {}
+    used = set()
+    for position, order in enumerate(orders):
+        entry_id = by_key.get((order["app"], normalize_order_id(order.get("order_id"))))
+        if entry_id is None:
+            close = [
+                c for c in unkeyed
+                if c.id not in used and c.app == order["app"] and c.amount == order["amount"]
+                and abs(c.timestamp - stamps[position]) <= window
+            ]
+            if close:
+                entry_id = min(close, key=lambda c: abs(c.timestamp - stamps[position])).id
+        if entry_id is not None and entry_id not in used:
+            matches[position] = entry_id
+            used.add(entry_id)
+    return matches
+
+
+def duplicate_report(db: Session, window: timedelta = DUPLICATE_WINDOW) -> dict:
+    """Every group of entries sharing an order id, and every unkeyed pair of
+    orders with the same app and amount within window of each other"""
+    by_order_id = []
+    for app, order_key, ids, amount in db.execute(
+        select(Entry.app, Entry.order_key, func.group_concat(Entry.id), func.sum(Entry.amount))
+        .where(Entry.order_key.is_not(None))
+        .group_by(Entry.app, Entry.order_key)
+        .having(func.count(Entry.id) > 1)
+        .order_by(Entry.app, Entry.order_key)
+    ):
+        entry_ids = sorted(int(i) for i in ids.split(","))
+        by_order_id.append({
+            "app": app.value,
+            "order_key": order_key,
+            "entry_ids": entry_ids,
+            # What the copies beyond the first add to the totals
+            "double_counted": float(amount / len(entry_ids) * (len(entry_ids) - 1))
+        })
+
+    # Self-join on the (app, amount_cents, timestamp) index: each order
+    # looks only at later orders in its own app, amount and window
+    later = aliased(Entry)
+    by_amount_and_time = []
+    repeated = {}
+    for first_id, second_id, app, amount, first_at, second_at in db.execute(
+        select(Entry.id, later.id, Entry.app, Entry.amount, Entry.timestamp, later.timestamp)
+        .join(later, and_(
+            later.app == Entry.app,
+            later.amount == Entry.amount,
+            later.timestamp >= Entry.timestamp,
+            later.timestamp <= func.datetime(Entry.timestamp, f"+{int(window.total_seconds())} seconds"),
+            later.id != Entry.id
+        ))
+        .where(
+            Entry.type == EntryType.ORDER,
+            later.type == EntryType.ORDER,
+            or_(Entry.order_key.is_(None), later.order_key.is_(None)),
+            # Equal timestamps would otherwise pair up both ways
+            or_(later.timestamp > Entry.timestamp, later.id > Entry.id)
+        )
+        .order_by(Entry.timestamp, Entry.id)
+    ):
+        by_amount_and_time.append({
+            "app": app.value,
+            "amount": float(amount),
+            "entry_ids": [first_id, second_id],
+            "minutes_apart": round((second_at - first_at).total_seconds() / 60, 1)
+        })
+        repeated[second_id] = amount
+
+    return {
+        "window_minutes": int(window.total_seconds() // 60),
+        "by_order_id": by_order_id,
+        "by_amount_and_time": by_amount_and_time,
+        # Each later copy counted once, however many pairs it is in
+        "double_counted": round(sum(g["double_counted"] for g in by_order_id) + float(sum(repeated.values())), 2)
+    }
@@ -0,0 +1,350 @@
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+from sqlalchemy import and_, delete, event, func, insert, inspect, or_, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from backend.models import AppType, DistributionSketch, Entry, EntryType
+from backend.services.period import Period
+from backend.services.quantile_sketch import QuantileSketch, RELATIVE_ACCURACY
+
+# Order value and $/hour distributions are kept as quantile sketches per
+# (UTC day, app), plus one per (month, app) merged from its days. As a
+# transaction commits, its new orders are added to the sketches of their
+# day and month, and the days it updated or deleted orders on are rebuilt
+# from their rows. A distribution over any range is then a merge of a few
+# dozen small rows rather than a sort of every order in it. Rebuilding
+# every day (ALL_DAYS) is left to migrations and explicit repairs.
+
+METRICS = ("order_value", "dollars_per_hour")
+DEFAULT_QUANTILES = (0.1, 0.5, 0.9)
+DAY = "day"
+MONTH = "month"
+ALL_DAYS = "all"
+_PENDING = "distribution_pending"
+# Entry columns the sketches are built from; changes to others leave them be
+_SKETCHED = ("timestamp", "type", "app", "amount", "duration_minutes")
+
+
+def _next_month(day: date) -> date:
+    return (day.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+def _midnight(day: date) -> datetime:
+    return datetime.combine(day, datetime.min.time())
+
+
+def _metric_values(amount, minutes) -> Dict[str, float]:
+    values = {"order_value": float(amount)}
+    if minutes:
+        values["dollars_per_hour"] = float(amount) / (minutes / 60.0)
+    return values
+
+
+class _Pending:
+    """Sketch changes made in a session's transaction, applied as it commits"""
+
+    def __init__(self):
+        # Values of new orders by (day, app, metric)
+        self.added: Dict[tuple, QuantileSketch] = defaultdict(QuantileSketch)
+        # Days with updated or deleted orders, rebuilt from their rows
+        self.days: Set[date] = set()
+        # Entries changed by bulk updates; the days they moved to are read at commit
+        self.ids: Set[int] = set()
+        # Every entry was deleted, so everything before that is moot
+        self.cleared = False
+        # A bulk insert whose rows couldn't be seen
+        self.all_days = False
+
+    def add(self, timestamp: datetime, app, amount, minutes):
+        for metric, value in _metric_values(amount, minutes).items():
+            self.added[(timestamp.date(), app, metric)].add(value)
+
+    def clear(self):
+        self.__init__()
+        self.cleared = True
+
+
+def _pending(session: Session) -> _Pending:
+    return session.info.setdefault(_PENDING, _Pending())
+
+
+@event.listens_for(Session, "before_flush")
+def _track_changes(session: Session, flush_context, instances):
+    changed = [
+        obj for obj in session.dirty
+        if isinstance(obj, Entry) and any(inspect(obj).attrs[name].history.has_changes() for name in _SKETCHED)
+    ]
+    deleted = [obj for obj in session.deleted if isinstance(obj, Entry)]
+    if not (changed or deleted):
+        return
+    days = _pending(session).days
+    days.update(obj.timestamp.date() for obj in changed)
+    # The days they are stored under now, which an expired object no longer
+    # remembers; an entry moved to another day leaves its old day changed too
+    ids = [inspect(obj).identity[0] for obj in changed + deleted]
+    with session.no_autoflush:
+        days.update(
+            timestamp.date()
+            for timestamp in session.execute(select(Entry.timestamp).where(Entry.id.in_(ids))).scalars()
+        )
+
+
+@event.listens_for(Session, "after_flush")
+def _track_new(session: Session, flush_context):
+    for obj in session.new:
+        if isinstance(obj, Entry) and obj.type == EntryType.ORDER:
+            _pending(session).add(obj.timestamp or datetime.utcnow(), obj.app, obj.amount, obj.duration_minutes)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_bulk(orm_execute_state):
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is None or mapper.local_table is not Entry.__table__:
+        return
+
+    session = orm_execute_state.session
+    pending = _pending(session)
+    params = orm_execute_state.parameters
+    rows = params if isinstance(params, list) else [params] if params else []
+
+    if orm_execute_state.is_insert:
+        if not rows:
+            # insert().values() or from a select: no rows to add from
+            pending.all_days = True
+        for row in rows:
+            if row.get("type") == EntryType.ORDER:
+                pending.add(row.get("timestamp") or datetime.utcnow(), row["app"], row["amount"], row.get("duration_minutes"))
+        return
+
+    where = orm_execute_state.statement.whereclause
+    if orm_execute_state.is_delete and where is None:
+        pending.clear()
+        return
+
+    # The rows about to change, read before they do
+    matched = select(Entry.id, Entry.timestamp)
+    if rows and all("id" in row for row in rows):
+        matched = matched.where(Entry.id.in_([row["id"] for row in rows]))
+    elif where is not None:
+        matched = matched.where(where)
+    for entry_id, timestamp in session.execute(matched):
+        pending.days.add(timestamp.date())
+        if orm_execute_state.is_update:
+            pending.ids.add(entry_id)
+
+
+@event.listens_for(Session, "before_commit")
+def _apply_on_commit(session: Session):
+    # Pending entries only reach after_flush once flushed; commit would
+    # flush them next anyway
+    session.flush()
+    pending = session.info.pop(_PENDING, None)
+    if pending is not None:
+        _apply_pending(session, pending)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard(session: Session):
+    session.info.pop(_PENDING, None)
+
+
+def _apply_pending(db: Session, pending: _Pending):
+    """Write a transaction's sketch changes: clear, add new orders, rebuild touched days"""
+    if pending.cleared:
+        db.execute(delete(DistributionSketch))
+    if pending.all_days:
+        refresh_sketches(db, ALL_DAYS)
+        return
+
+    rebuild = set(pending.days)
+    if pending.ids:
+        rebuild.update(
+            timestamp.date()
+            for timestamp in db.execute(select(Entry.timestamp).where(Entry.id.in_(pending.ids))).scalars()
+        )
+
+    # Rebuilt days are read back from their rows, new orders included
+    added = {key: sketch for key, sketch in pending.added.items() if key[0] not in rebuild}
+    rebuilt_months = {day.replace(day=1) for day in rebuild}
+    month_added = defaultdict(QuantileSketch)
+    for (day, app, metric), sketch in added.items():
+        if day.replace(day=1) not in rebuilt_months:
+            month_added[(day.replace(day=1), app, metric)].merge(sketch)
+
+    _fold(db, DAY, added)
+    if rebuild:
+        refresh_sketches(db, rebuild)
+    _fold(db, MONTH, month_added)
+
+
+def _rows(grain: str, sketches: Dict[tuple, QuantileSketch]) -> List[dict]:
+    return [
+        {"grain": grain, "day": day, "app": app, "metric": metric, "count": sketch.count, "data": sketch.to_bytes()}
+        for (day, app, metric), sketch in sketches.items()
+    ]
+
+
+def _fold(db: Session, grain: str, sketches: Dict[tuple, QuantileSketch]):
+    """Merge sketches into the stored rows of grain, creating the missing ones"""
+    if not sketches:
+        return
+    merged = defaultdict(QuantileSketch)
+    for key, sketch in sketches.items():
+        merged[key].merge(sketch)
+    for day, app, metric, data in db.execute(
+        select(DistributionSketch.day, DistributionSketch.app, DistributionSketch.metric, DistributionSketch.data).where(
+            DistributionSketch.grain == grain,
+            DistributionSketch.day.in_({day for day, _, _ in merged}),
+            DistributionSketch.app.in_({app for _, app, _ in merged})
+        )
+    ):
+        if (day, app, metric) in merged:
+            merged[(day, app, metric)].merge(QuantileSketch.from_bytes(data))
+
+    upsert = sqlite_insert(DistributionSketch)
+    db.execute(
+        upsert.on_conflict_do_update(
+            index_elements=["grain", "day", "app", "metric"],
+            set_={"count": upsert.excluded["count"], "data": upsert.excluded["data"]}
+        ),
+        _rows(grain, merged)
+    )
+
+
+def refresh_sketches(db: Session, days):
+    """Rebuild the day sketches for days (or ALL_DAYS) and the months they fall in"""
+    orders = select(Entry.timestamp, Entry.app, Entry.amount, Entry.duration_minutes).where(Entry.type == EntryType.ORDER)
+    clear_days = delete(DistributionSketch).where(DistributionSketch.grain == DAY)
+    if days != ALL_DAYS:
+        days = sorted(days)
+        # The range keeps to the timestamp index; the list picks the days in it
+        orders = orders.where(
+            Entry.timestamp >= _midnight(days[0]),
+            Entry.timestamp < _midnight(days[-1] + timedelta(days=1)),
+            func.date(Entry.timestamp).in_([day.isoformat() for day in days])
+        )
+        clear_days = clear_days.where(DistributionSketch.day.in_(days))
+
+    day_sketches = defaultdict(QuantileSketch)
+    for timestamp, app, amount, minutes in db.execute(orders):
+        for metric, value in _metric_values(amount, minutes).items():
+            day_sketches[(timestamp.date(), app, metric)].add(value)
+
+    db.execute(clear_days)
+    if day_sketches:
+        db.execute(insert(DistributionSketch), _rows(DAY, day_sketches))
+
+    # Months are merged from their day rows, which are now current
+    if days == ALL_DAYS:
+        db.execute(delete(DistributionSketch).where(DistributionSketch.grain == MONTH))
+        months = {day.replace(day=1) for day, _, _ in day_sketches}
+    else:
+        months = sorted({day.replace(day=1) for day in days})
+        db.execute(delete(DistributionSketch).where(
+            DistributionSketch.grain == MONTH, DistributionSketch.day.in_(months)
+        ))
+    if not months:
+        return
+
+    month_sketches = defaultdict(QuantileSketch)
+    for day, app, metric, data in db.execute(
+        select(DistributionSketch.day, DistributionSketch.app, DistributionSketch.metric, DistributionSketch.data).where(
+            DistributionSketch.grain == DAY,
+            or_(*(and_(DistributionSketch.day >= m, DistributionSketch.day < _next_month(m)) for m in months))
+        )
+    ):
+        month_sketches[(day.replace(day=1), app, metric)].merge(QuantileSketch.from_bytes(data))
+    if month_sketches:
+        db.execute(insert(DistributionSketch), _rows(MONTH, month_sketches))
+
+
+def _sketch_filter(lo: Optional[date], hi: Optional[date]):
+    """Rows covering [lo, hi): whole months where they fit, days at the edges"""
+    first_month = None if lo is None else lo if lo.day == 1 else _next_month(lo)
+    end_month = None if hi is None else hi.replace(day=1)
+
+    if first_month is not None and end_month is not None and first_month >= end_month:
+        return and_(DistributionSketch.grain == DAY, DistributionSketch.day >= lo, DistributionSketch.day < hi)
+
+    parts = [and_(
+        DistributionSketch.grain == MONTH,
+        *([DistributionSketch.day >= first_month] if first_month else []),
+        *([DistributionSketch.day < end_month] if end_month else [])
+    )]
+    if lo is not None and lo < first_month:
+        parts.append(and_(DistributionSketch.grain == DAY, DistributionSketch.day >= lo, DistributionSketch.day < first_month))
+    if hi is not None and end_month < hi:
+        parts.append(and_(DistributionSketch.grain == DAY, DistributionSketch.day >= end_month, DistributionSketch.day < hi))
+    return or_(*parts)
+
+
+def _nearest_midnight(moment: datetime) -> date:
+    return (moment + timedelta(hours=12)).date()
+
+
+def _day_bounds(
+    from_date: Optional[datetime],
+    to_date: Optional[datetime],
+    period: Optional[Period]
+) -> Tuple[Optional[date], Optional[date]]:
+    """UTC days [lo, hi) to merge.
+    
+    Sketches are per UTC day, so a period in another zone snaps to the
+    nearest UTC midnights: its quantiles are over UTC days, up to half a
+    day off its local edges.
+    """
+    if period:
+        return _nearest_midnight(period.start), _nearest_midnight(period.end)
+    lo = from_date.date() if from_date else None
+    hi = to_date.date() + timedelta(days=1) if to_date else None
+    return lo, hi
+
+
+def _summary(sketch: QuantileSketch, quantiles) -> dict:
+    return {
+        "count": sketch.count,
+        "quantiles": {
+            f"p{q * 100:g}": round(value, 2) if (value := sketch.quantile(q)) is not None else None
+            for q in quantiles
+        }
+    }
+
+
+def get_distribution(
+    db: Session,
+    from_date: Optional[datetime] = None,
+    to_date: Optional[datetime] = None,
+    period: Optional[Period] = None,
+    quantiles=DEFAULT_QUANTILES
+) -> dict:
+    """Order value and $/hour quantiles, overall and per app, merged from sketches"""
+    lo, hi = _day_bounds(from_date, to_date, period)
+
+    by_app = {metric: defaultdict(QuantileSketch) for metric in METRICS}
+    for app, metric, data in db.execute(
+        select(DistributionSketch.app, DistributionSketch.metric, DistributionSketch.data).where(_sketch_filter(lo, hi))
+    ):
+        by_app[metric][app].merge(QuantileSketch.from_bytes(data))
+
+    metrics = {}
+    for metric in METRICS:
+        overall = QuantileSketch()
+        for sketch in by_app[metric].values():
+            overall.merge(sketch)
+        metrics[metric] = {
+            **_summary(overall, quantiles),
+            "by_app": {
+                app.value: _summary(by_app[metric][app], quantiles)
+                for app in AppType if app in by_app[metric]
+            }
+        }
+
+    return {
+        "from_day": lo,
+        "to_day": hi,
+        "relative_accuracy": RELATIVE_ACCURACY,
+        "metrics": metrics
+    }
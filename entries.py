@@ -1,25 +1,43 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from backend.db import get_db
 from backend.models import Entry, EntryType
 from backend.schemas import EntryCreate, EntryUpdate, EntryResponse
+from backend.services.coalescing import coalesced
+from backend.services.dedup_service import find_by_order_id, duplicate_report, DUPLICATE_WINDOW
+from backend.services.period import as_naive_utc
+from backend.services.reference_data import entries_version
 from typing import List, Optional
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from decimal import Decimal
 
 router = APIRouter()
 
 @router.post("/entries", response_model=EntryResponse)
 async def create_entry(entry: EntryCreate, db: Session = Depends(get_db)):
+    """Record an entry; an order whose id is already recorded is refused with
+    409. Same-pay orders close in time are still recorded, since drivers
+    stack orders, and show up in GET /entries/duplicates instead."""
     amount = entry.amount
+    timestamp = as_naive_utc(entry.timestamp) if entry.timestamp else datetime.utcnow()
     
     if entry.type in [EntryType.EXPENSE, EntryType.CANCELLATION]:
         amount = -abs(amount)
     else:
         amount = abs(amount)
     
+    if entry.type == EntryType.ORDER:
+        # The same order id in the same app is the same order, typically one
+        # the platform sync already brought in
+        existing = find_by_order_id(db, entry.app, entry.order_id)
+        if existing:
+            raise HTTPException(
+                status_code=409,
+                detail=f"Order {entry.order_id} is already recorded as entry {existing.id}"
+            )
+    
     db_entry = Entry(
-        timestamp=entry.timestamp or datetime.utcnow(),
+        timestamp=timestamp,
         type=entry.type,
         app=entry.app,
         order_id=entry.order_id,
@@ -31,10 +49,30 @@ async def create_entry(entry: EntryCreate, db: Session = Depends(get_db)):
         receipt_url=entry.receipt_url
     )
     db.add(db_entry)
+    entries_version.bump(db)
     db.commit()
     db.refresh(db_entry)
     return db_entry
 
+def list_entries(
+    db: Session,
+    from_dt: Optional[datetime],
+    to_dt: Optional[datetime],
+    limit: int,
+    cursor: Optional[int]
+) -> List[Entry]:
+    query = db.query(Entry)
+    
+    if from_dt:
+        query = query.filter(Entry.timestamp >= from_dt)
+    if to_dt:
+        query = query.filter(Entry.timestamp <= to_dt)
+    if cursor:
+        query = query.filter(Entry.id < cursor)
+    
+    query = query.order_by(Entry.timestamp.desc(), Entry.id.desc())
+    return query.limit(limit).all()
+
 @router.get("/entries", response_model=List[EntryResponse])
 async def get_entries(
     from_date: Optional[str] = None,
@@ -43,22 +81,26 @@ async def get_entries(
     cursor: Optional[int] = None,
     db: Session = Depends(get_db)
 ):
-    query = db.query(Entry)
+    from_dt = None
+    to_dt = None
     
     if from_date:
         from_dt = datetime.fromisoformat(from_date.replace('Z', '+00:00')).astimezone(timezone.utc).replace(tzinfo=None)
-        query = query.filter(Entry.timestamp >= from_dt)
     if to_date:
         to_dt = datetime.fromisoformat(to_date.replace('Z', '+00:00')).astimezone(timezone.utc).replace(tzinfo=None)
-        query = query.filter(Entry.timestamp <= to_dt)
-    if cursor:
-        query = query.filter(Entry.id < cursor)
-    
-    query = query.order_by(Entry.timestamp.desc(), Entry.id.desc())
-    entries = query.limit(limit).all()
     
+    entries = await coalesced("entries", db, list_entries, from_dt, to_dt, limit, cursor)
     return entries
 
+@router.get("/entries/duplicates")
+async def get_duplicate_entries(
+    window_minutes: int = Query(int(DUPLICATE_WINDOW.total_seconds() // 60), ge=0),
+    db: Session = Depends(get_db)
+):
+    """Entries recorded more than once: the same order id, or the same app
+    and amount within window_minutes when an order id is missing"""
+    return duplicate_report(db, timedelta(minutes=window_minutes))
+
 @router.put("/entries/{entry_id}", response_model=EntryResponse)
 async def update_entry(entry_id: int, entry_update: EntryUpdate, db: Session = Depends(get_db)):
     db_entry = db.query(Entry).filter(Entry.id == entry_id).first()
@@ -89,6 +131,7 @@ async def update_entry(entry_id: int, entry_update: EntryUpdate, db: Session = D
         setattr(db_entry, key, value)
     
     db_entry.updated_at = datetime.utcnow()
+    entries_version.bump(db)
     db.commit()
     db.refresh(db_entry)
     return db_entry
@@ -100,11 +143,13 @@ async def delete_entry(entry_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Entry not found")
     
     db.delete(db_entry)
+    entries_version.bump(db)
     db.commit()
     return {"message": "Entry deleted successfully"}
 
 @router.delete("/entries")
 async def delete_all_entries(db: Session = Depends(get_db)):
     db.query(Entry).delete()
+    entries_version.bump(db)
     db.commit()
     return {"message": "All entries deleted successfully"}
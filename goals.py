@@ -2,10 +2,21 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from backend.db import get_db
 from backend.models import Goal, TimeframeType
-from backend.schemas import GoalCreate, GoalUpdate, GoalResponse
+from backend.schemas import GoalCreate, GoalUpdate, GoalResponse, GoalProgressResponse
+from backend.services.rollup_service import calculate_goal_progress
+from backend.services.reference_data import reference_cache
+from typing import List
 
 router = APIRouter()
 
+# Declared before /goals/{timeframe} so "progress" is not taken for a timeframe
+@router.get("/goals/progress", response_model=List[GoalProgressResponse])
+def get_goals_progress(tz: str = "UTC", db: Session = Depends(get_db)):
+    try:
+        return calculate_goal_progress(db, tz)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.get("/goals/{timeframe}", response_model=GoalResponse)
 def get_goal(timeframe: str, db: Session = Depends(get_db)):
     try:
@@ -13,7 +24,7 @@ def get_goal(timeframe: str, db: Session = Depends(get_db)):
     except KeyError:
         raise HTTPException(status_code=400, detail="Invalid timeframe")
     
-    goal = db.query(Goal).filter(Goal.timeframe == tf).first()
+    goal = reference_cache.get(db).goals.get(tf)
     if not goal:
         raise HTTPException(status_code=404, detail="Goal not found")
     return goal
@@ -23,13 +34,13 @@ def create_goal(goal: GoalCreate, db: Session = Depends(get_db)):
     existing = db.query(Goal).filter(Goal.timeframe == goal.timeframe).first()
     if existing:
         existing.target_profit = goal.target_profit
-        db.commit()
+        reference_cache.commit(db)
         db.refresh(existing)
         return existing
     
     db_goal = Goal(**goal.dict())
     db.add(db_goal)
-    db.commit()
+    reference_cache.commit(db)
     db.refresh(db_goal)
     return db_goal
 
@@ -45,7 +56,7 @@ def update_goal(timeframe: str, goal: GoalUpdate, db: Session = Depends(get_db))
         raise HTTPException(status_code=404, detail="Goal not found")
     
     db_goal.target_profit = goal.target_profit
-    db.commit()
+    reference_cache.commit(db)
     db.refresh(db_goal)
     return db_goal
 
@@ -61,5 +72,5 @@ def delete_goal(timeframe: str, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Goal not found")
     
     db.delete(db_goal)
-    db.commit()
+    reference_cache.commit(db)
     return {"message": "Goal deleted"}
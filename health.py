@@ -1,7 +1,14 @@
 from fastapi import APIRouter
+from backend.services.coalescing import single_flight
+from backend.services.cube_service import cube_cache
 
 router = APIRouter()
 
 @router.get("/health")
 async def health_check():
     return {"status": "ok"}
+
+@router.get("/health/coalescing")
+async def coalescing_metrics():
+    """Executed vs coalesced counts for the single-flight read endpoints"""
+    return {**single_flight.metrics(), "cube_cache": cube_cache.metrics()}
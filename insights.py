@@ -0,0 +1,25 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+from backend.db import get_db
+from backend.services.insights_service import get_insights
+from typing import Optional
+from datetime import datetime, timezone
+
+router = APIRouter()
+
+@router.get("/insights/heatmap")
+async def get_heatmap(
+    from_date: Optional[str] = None,
+    to_date: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """Weekday x hour x app earnings heatmap, order value percentiles and per-app acceptance thresholds"""
+    from_dt = None
+    to_dt = None
+    
+    if from_date:
+        from_dt = datetime.fromisoformat(from_date.replace('Z', '+00:00')).astimezone(timezone.utc).replace(tzinfo=None)
+    if to_date:
+        to_dt = datetime.fromisoformat(to_date.replace('Z', '+00:00')).astimezone(timezone.utc).replace(tzinfo=None)
+    
+    return get_insights(db, from_dt, to_dt)
@@ -0,0 +1,150 @@
+import numpy as np
+from sqlalchemy import Float, Integer, cast, func
+from sqlalchemy.orm import Session
+from backend.models import Entry, EntryType, AppType
+from datetime import datetime
+from typing import Optional
+
+WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+APPS = [a.value for a in AppType]
+APP_INDEX = {a: i for i, a in enumerate(AppType)}
+PERCENTILES = [10, 25, 50, 75, 90]
+# Cells and apps with fewer orders than this are too noisy to recommend
+MIN_SAMPLES = 3
+BEST_SLOTS = 5
+
+def load_order_arrays(
+    db: Session,
+    from_date: Optional[datetime] = None,
+    to_date: Optional[datetime] = None
+) -> dict:
+    """Pull orders in the window as flat NumPy columns"""
+    query = db.query(
+        cast(func.strftime('%w', Entry.timestamp), Integer),
+        cast(func.strftime('%H', Entry.timestamp), Integer),
+        Entry.app,
+        # Stored as integer cents
+        cast(Entry.amount, Float) / 100.0,
+        Entry.distance_miles,
+        Entry.duration_minutes
+    ).filter(Entry.type == EntryType.ORDER)
+    if from_date:
+        query = query.filter(Entry.timestamp >= from_date)
+    if to_date:
+        query = query.filter(Entry.timestamp <= to_date)
+
+    rows = query.all()
+    weekday, hour, app, amount, miles, minutes = zip(*rows) if rows else ([],) * 6
+
+    return {
+        # SQLite's %w counts from Sunday; shift so Monday is 0
+        "weekday": (np.array(weekday, dtype=np.int64) + 6) % 7,
+        "hour": np.array(hour, dtype=np.int64),
+        "app": np.fromiter((APP_INDEX[a] for a in app), dtype=np.int64, count=len(app)),
+        "amount": np.array(amount, dtype=np.float64),
+        "miles": np.array([m or 0.0 for m in miles], dtype=np.float64),
+        "minutes": np.array([m or 0 for m in minutes], dtype=np.float64)
+    }
+
+def _ratio(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    out = np.full(numerator.shape, np.nan)
+    np.divide(numerator, denominator, out=out, where=denominator > 0)
+    return out
+
+def _nullable(values: np.ndarray):
+    """Round to cents and turn NaN into None for JSON"""
+    rounded = np.round(values, 2).astype(object)
+    rounded[np.isnan(values)] = None
+    return rounded.tolist()
+
+def _percentiles(amount: np.ndarray) -> Optional[dict]:
+    if amount.size == 0:
+        return None
+    values = np.percentile(amount, PERCENTILES)
+    return {f"p{p}": round(float(v), 2) for p, v in zip(PERCENTILES, values)}
+
+def compute_insights(orders: dict) -> dict:
+    """Heatmap and thresholds from load_order_arrays output; pure NumPy, no I/O"""
+    n_apps = len(APPS)
+    shape = (7, 24, n_apps)
+    cells = (orders["weekday"] * 24 + orders["hour"]) * n_apps + orders["app"]
+
+    def cube(weights=None):
+        return np.bincount(cells, weights=weights, minlength=7 * 24 * n_apps).reshape(shape).astype(np.float64)
+
+    # Rates only count orders that logged the time or distance they divide by
+    timed = orders["minutes"] > 0
+    counts = cube()
+    hours = cube(orders["minutes"]) / 60.0
+    miles = cube(orders["miles"])
+    timed_earnings = cube(np.where(timed, orders["amount"], 0.0))
+    dollars_per_hour = _ratio(timed_earnings, hours)
+    dollars_per_mile = _ratio(cube(np.where(orders["miles"] > 0, orders["amount"], 0.0)), miles)
+
+    # Hour of day paying the most per hour worked, across weekdays and apps
+    hourly = _ratio(timed_earnings.sum(axis=(0, 2)), hours.sum(axis=(0, 2)))
+    peak_hour = int(np.nanargmax(hourly)) if not np.all(np.isnan(hourly)) else None
+
+    # The driver's typical hourly rate
+    order_rates = orders["amount"][timed] / (orders["minutes"][timed] / 60.0)
+    target_rate = float(np.median(order_rates)) if order_rates.size else None
+
+    # Minimum offer worth accepting: what an order of typical length for the
+    # app must pay to match the target rate
+    by_app = {}
+    for index, app in enumerate(APPS):
+        in_app = orders["app"] == index
+        app_amount = orders["amount"][in_app]
+        if app_amount.size == 0:
+            continue
+        app_minutes = orders["minutes"][in_app & timed]
+        threshold = None
+        if target_rate is not None and app_minutes.size >= MIN_SAMPLES:
+            threshold = round(target_rate * float(np.median(app_minutes)) / 60.0, 2)
+        app_hours = app_minutes.sum() / 60.0
+        by_app[app] = {
+            "orders": int(app_amount.size),
+            "order_value_percentiles": _percentiles(app_amount),
+            "dollars_per_hour": round(float(orders["amount"][in_app & timed].sum() / app_hours), 2) if app_hours > 0 else None,
+            "acceptance_threshold": threshold
+        }
+
+    acceptance_threshold = None
+    if target_rate is not None and np.count_nonzero(timed) >= MIN_SAMPLES:
+        acceptance_threshold = round(target_rate * float(np.median(orders["minutes"][timed])) / 60.0, 2)
+
+    ranked = np.where(counts >= MIN_SAMPLES, np.nan_to_num(dollars_per_hour, nan=-np.inf), -np.inf).ravel()
+    best_slots = []
+    for flat in np.argsort(ranked)[::-1][:BEST_SLOTS]:
+        if not np.isfinite(ranked[flat]):
+            break
+        weekday, hour, app = np.unravel_index(flat, shape)
+        best_slots.append({
+            "weekday": WEEKDAYS[weekday],
+            "hour": int(hour),
+            "app": APPS[app],
+            "orders": int(counts[weekday, hour, app]),
+            "dollars_per_hour": round(float(ranked[flat]), 2)
+        })
+
+    return {
+        "weekdays": WEEKDAYS,
+        "apps": APPS,
+        "total_orders": int(orders["amount"].size),
+        "orders": counts.astype(np.int64).tolist(),
+        "dollars_per_hour": _nullable(dollars_per_hour),
+        "dollars_per_mile": _nullable(dollars_per_mile),
+        "order_value_percentiles": _percentiles(orders["amount"]),
+        "target_hourly_rate": round(target_rate, 2) if target_rate is not None else None,
+        "acceptance_threshold": acceptance_threshold,
+        "peak_hour": peak_hour,
+        "best_slots": best_slots,
+        "by_app": by_app
+    }
+
+def get_insights(
+    db: Session,
+    from_date: Optional[datetime] = None,
+    to_date: Optional[datetime] = None
+) -> dict:
+    return compute_insights(load_order_arrays(db, from_date, to_date))
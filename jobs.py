@@ -0,0 +1,32 @@
+import asyncio
+from fastapi import APIRouter, HTTPException
+from backend.services.background_jobs import scheduler, elector
+
+router = APIRouter()
+
+@router.get("/jobs")
+async def list_jobs():
+    """Get schedule and run metrics for all background jobs on this worker"""
+    return {
+        "worker_id": elector.worker_id,
+        "is_leader": elector.is_leader,
+        "jobs": [job.status() for job in scheduler.jobs.values()]
+    }
+
+@router.post("/jobs/{job_id}/run", status_code=202)
+async def run_job(job_id: str):
+    """Trigger a background job now; only the leader runs jobs"""
+    if job_id not in scheduler.jobs:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    if not elector.is_leader:
+        leader_id = await asyncio.to_thread(elector.current_holder)
+        raise HTTPException(
+            status_code=409,
+            detail={"message": "Jobs only run on the leader worker", "leader_id": leader_id}
+        )
+    
+    if not scheduler.trigger(job_id):
+        raise HTTPException(status_code=409, detail="Job is already running")
+    
+    return scheduler.jobs[job_id].status()
@@ -0,0 +1,121 @@
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Optional
+from sqlalchemy import update, delete, or_, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from backend.db import SessionLocal
+from backend.models import JobLease
+
+logger = logging.getLogger(__name__)
+
+# A leader that stops heartbeating is replaced once its lease expires
+LEASE_TTL = timedelta(seconds=15)
+HEARTBEAT_INTERVAL = timedelta(seconds=5)
+
+
+def make_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class LeaderElector:
+    """Lease-based leader election through a row in job_leases.
+    
+    Every worker heartbeats the same lease; whoever holds an unexpired
+    lease is leader and the others keep retrying until it expires.
+    """
+    
+    def __init__(
+        self,
+        name: str,
+        on_elected: Callable[[], None],
+        on_demoted: Callable[[], Awaitable[None]],
+        session_factory=SessionLocal,
+        ttl: timedelta = LEASE_TTL,
+        heartbeat_interval: timedelta = HEARTBEAT_INTERVAL
+    ):
+        self.name = name
+        self.worker_id = make_worker_id()
+        self.on_elected = on_elected
+        self.on_demoted = on_demoted
+        self.session_factory = session_factory
+        self.ttl = ttl
+        self.heartbeat_interval = heartbeat_interval
+        self.is_leader = False
+    
+    def try_acquire(self) -> bool:
+        """Take or renew the lease; True if this worker holds it afterwards"""
+        now = datetime.utcnow()
+        values = {"holder": self.worker_id, "expires_at": now + self.ttl, "heartbeat_at": now}
+        db = self.session_factory()
+        try:
+            renewed = db.execute(
+                update(JobLease)
+                .where(JobLease.name == self.name)
+                .where(or_(JobLease.holder == self.worker_id, JobLease.expires_at < now))
+                .values(**values)
+            )
+            acquired = renewed.rowcount == 1
+            if not acquired:
+                created = db.execute(
+                    sqlite_insert(JobLease)
+                    .values(name=self.name, **values)
+                    .on_conflict_do_nothing(index_elements=["name"])
+                )
+                acquired = created.rowcount == 1
+            db.commit()
+            return acquired
+        finally:
+            db.close()
+    
+    def current_holder(self) -> Optional[str]:
+        """Worker id holding an unexpired lease, or None if it is up for grabs"""
+        db = self.session_factory()
+        try:
+            return db.execute(
+                select(JobLease.holder)
+                .where(JobLease.name == self.name, JobLease.expires_at >= datetime.utcnow())
+            ).scalar_one_or_none()
+        finally:
+            db.close()
+    
+    def release(self):
+        """Drop the lease so another worker can take over immediately"""
+        db = self.session_factory()
+        try:
+            db.execute(delete(JobLease).where(
+                JobLease.name == self.name,
+                JobLease.holder == self.worker_id
+            ))
+            db.commit()
+        finally:
+            db.close()
+    
+    async def run(self):
+        try:
+            while True:
+                try:
+                    leader = await asyncio.to_thread(self.try_acquire)
+                except Exception:
+                    # Can't prove we still hold the lease, so stop acting as leader
+                    logger.exception("Lease heartbeat failed for %s", self.name)
+                    leader = False
+                
+                if leader and not self.is_leader:
+                    logger.info("Worker %s elected leader for %s", self.worker_id, self.name)
+                    self.is_leader = True
+                    self.on_elected()
+                elif not leader and self.is_leader:
+                    logger.warning("Worker %s lost leadership for %s", self.worker_id, self.name)
+                    self.is_leader = False
+                    await self.on_demoted()
+                
+                await asyncio.sleep(self.heartbeat_interval.total_seconds())
+        finally:
+            if self.is_leader:
+                self.is_leader = False
+                await self.on_demoted()
+                await asyncio.to_thread(self.release)
@@ -0,0 +1,84 @@
+from sqlalchemy import text, inspect
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from backend.models import DistributionSketch, Entry, SyncedOrder, SyncState, normalize_order_id
+from backend.services.payload_store import migrate_raw_payloads
+from backend.services.distribution_service import ALL_DAYS, refresh_sketches
+import logging
+
+logger = logging.getLogger(__name__)
+
+# In-place upgrades for databases created before a schema change.
+# create_all() only creates missing tables, so changes to existing tables
+# are applied here. Every step must be idempotent.
+
+def _dedupe_synced_orders(conn):
+    """Drop duplicate synced order rows so the unique index can be built"""
+    conn.execute(text(
+        "DELETE FROM synced_orders WHERE id NOT IN ("
+        "SELECT MIN(id) FROM synced_orders GROUP BY platform, platform_order_id)"
+    ))
+    for index in SyncedOrder.__table__.indexes:
+        index.create(bind=conn, checkfirst=True)
+
+def _add_missing_columns(conn, table):
+    """Add nullable columns declared on the model but absent from the table"""
+    existing = {c["name"] for c in inspect(conn).get_columns(table.name)}
+    for column in table.columns:
+        if column.name not in existing:
+            column_type = column.type.compile(dialect=conn.dialect)
+            conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+
+def _sync_state_resume_window(conn):
+    _add_missing_columns(conn, SyncState.__table__)
+
+def _compress_raw_payloads(conn):
+    """Move inline raw_data into the compressed payload store"""
+    _add_missing_columns(conn, SyncedOrder.__table__)
+    db = Session(bind=conn)
+    report = migrate_raw_payloads(db)
+    if report["moved"]:
+        # Freed pages are only returned to the OS by a manual VACUUM
+        logger.info("Moved %d raw payloads to order_payloads: %s", report["moved"], report)
+
+def _amount_to_cents(conn):
+    """Replace entries.amount (NUMERIC, stored as REAL) with integer amount_cents"""
+    existing = {c["name"] for c in inspect(conn).get_columns("entries")}
+    if "amount_cents" in existing:
+        return
+    conn.execute(text("ALTER TABLE entries ADD COLUMN amount_cents INTEGER NOT NULL DEFAULT 0"))
+    conn.execute(text("UPDATE entries SET amount_cents = CAST(ROUND(amount * 100) AS INTEGER)"))
+    conn.execute(text("ALTER TABLE entries DROP COLUMN amount"))
+
+def _build_distribution_sketches(conn):
+    """Sketch the orders written before sketches were kept"""
+    db = Session(bind=conn)
+    if db.query(DistributionSketch.id).first() is None:
+        refresh_sketches(db, ALL_DAYS)
+
+def _entry_order_keys(conn):
+    """Add and fill entries.order_key, then build the duplicate lookup indexes"""
+    existing = {c["name"] for c in inspect(conn).get_columns("entries")}
+    if "order_key" not in existing:
+        conn.execute(text("ALTER TABLE entries ADD COLUMN order_key VARCHAR"))
+        rows = conn.execute(text("SELECT id, order_id FROM entries WHERE order_id IS NOT NULL")).all()
+        keys = [{"id": entry_id, "order_key": normalize_order_id(order_id)} for entry_id, order_id in rows]
+        if keys:
+            conn.execute(text("UPDATE entries SET order_key = :order_key WHERE id = :id"), keys)
+    for index in Entry.__table__.indexes:
+        index.create(bind=conn, checkfirst=True)
+
+MIGRATIONS = [
+    _dedupe_synced_orders,
+    _sync_state_resume_window,
+    _compress_raw_payloads,
+    _amount_to_cents,
+    _entry_order_keys,
+    _build_distribution_sketches,
+]
+
+def run_migrations(engine: Engine):
+    """Apply all schema upgrades to an existing database"""
+    with engine.begin() as conn:
+        for migration in MIGRATIONS:
+            migration(conn)
@@ -0,0 +1,142 @@
+import asyncio
+import random
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+import httpx
+
+# Local stand-ins for the Uber and Shipt order APIs, for tests and the
+# sync benchmark. Each app is plain ASGI, so it plugs straight into the
+# sync services with httpx.ASGITransport and never touches the network.
+
+
+class MockPlatformConfig:
+    def __init__(
+        self,
+        order_count: int = 250,
+        days: int = 7,
+        latency_seconds: float = 0.0,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        retry_after: Optional[str] = "0",
+        seed: int = 42
+    ):
+        self.order_count = order_count
+        self.days = days
+        self.latency_seconds = latency_seconds
+        # Share of requests answered with error_status instead of data
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.retry_after = retry_after
+        self.seed = seed
+
+
+class MockPlatform:
+    """Deterministic order dataset plus request counters for one platform"""
+    
+    def __init__(self, config: MockPlatformConfig):
+        self.config = config
+        self.random = random.Random(config.seed)
+        self.requests = 0
+        self.errors = 0
+        now = datetime.utcnow()
+        span = timedelta(days=config.days).total_seconds()
+        self.completed_at: List[datetime] = sorted(
+            now - timedelta(seconds=self.random.uniform(0, span)) for _ in range(config.order_count)
+        )
+    
+    def add_orders(self, count: int, completed_at: Optional[datetime] = None):
+        """Append newly completed orders, e.g. to test incremental syncs"""
+        for _ in range(count):
+            self.completed_at.append(completed_at or datetime.utcnow())
+        self.completed_at.sort()
+    
+    def in_window(self, start: datetime, end: datetime) -> range:
+        """Indexes of orders completed within [start, end]"""
+        return range(bisect_left(self.completed_at, start), bisect_right(self.completed_at, end))
+    
+    async def before_request(self) -> Optional[JSONResponse]:
+        self.requests += 1
+        if self.config.latency_seconds:
+            await asyncio.sleep(self.config.latency_seconds)
+        if self.config.error_rate and self.random.random() < self.config.error_rate:
+            self.errors += 1
+            headers = {"Retry-After": self.config.retry_after} if self.config.retry_after is not None else {}
+            return JSONResponse(status_code=self.config.error_status, content={"error": "injected"}, headers=headers)
+        return None
+
+
+def _utc(seconds: int) -> datetime:
+    """Epoch seconds to naive UTC, the form completed_at is kept in"""
+    return datetime.fromtimestamp(seconds, timezone.utc).replace(tzinfo=None)
+
+
+def create_uber_app(config: Optional[MockPlatformConfig] = None) -> FastAPI:
+    platform = MockPlatform(config or MockPlatformConfig())
+    app = FastAPI()
+    app.state.platform = platform
+    
+    @app.get("/v1/marketplace/orders")
+    async def list_orders(start_time: int, end_time: int, limit: int = 100, page_token: Optional[str] = None):
+        error = await platform.before_request()
+        if error:
+            return error
+        
+        matches = platform.in_window(_utc(start_time), _utc(end_time))
+        offset = int(page_token or 0)
+        page = matches[offset:offset + limit]
+        orders = []
+        for i in page:
+            # Seeded per order so every fetch returns the same payload
+            rnd = random.Random(platform.config.seed * 100003 + i)
+            orders.append({
+                "order_id": f"uber-{i}",
+                "status": "completed",
+                "fare": {"total_amount": round(rnd.uniform(4, 40), 2), "currency_code": "USD"},
+                "trip_distance": round(rnd.uniform(0.5, 12), 1),
+                "trip_duration": rnd.randint(300, 3600),
+                "completed_at": int(platform.completed_at[i].replace(tzinfo=timezone.utc).timestamp())
+            })
+        more = offset + limit < len(matches)
+        # JSONResponse skips FastAPI's per-field encoder, which would dominate the benchmark
+        return JSONResponse({"orders": orders, "next_page_token": str(offset + limit) if more else None})
+    
+    return app
+
+
+def create_shipt_app(config: Optional[MockPlatformConfig] = None) -> FastAPI:
+    platform = MockPlatform(config or MockPlatformConfig())
+    app = FastAPI()
+    app.state.platform = platform
+    
+    @app.get("/api/v1/orders")
+    async def list_orders(request: Request, start_date: str, end_date: str, page_size: int = 100, page: int = 1):
+        error = await platform.before_request()
+        if error:
+            return error
+        
+        matches = platform.in_window(datetime.fromisoformat(start_date), datetime.fromisoformat(end_date))
+        offset = (page - 1) * page_size
+        results = []
+        for i in matches[offset:offset + page_size]:
+            rnd = random.Random(platform.config.seed * 100019 + i)
+            results.append({
+                "order_id": f"shipt-{i}",
+                "status": "completed",
+                "payout": round(rnd.uniform(8, 60), 2),
+                "estimated_mileage": round(rnd.uniform(1, 20), 1),
+                "estimated_time": rnd.randint(20, 120),
+                "completed_at": platform.completed_at[i].isoformat()
+            })
+        next_link = None
+        if offset + page_size < len(matches):
+            next_link = str(request.url.include_query_params(page=page + 1))
+        return JSONResponse({"results": results, "next": next_link})
+    
+    return app
+
+
+def mock_transport(app: FastAPI) -> httpx.ASGITransport:
+    return httpx.ASGITransport(app=app)
@@ -1,9 +1,32 @@
-from sqlalchemy import Column, Integer, String, Float, Numeric, DateTime, Text, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, Float, Numeric, Date, DateTime, Text, Index, LargeBinary, Enum as SQLEnum
+from sqlalchemy.orm import validates
+from sqlalchemy.types import TypeDecorator
 from datetime import datetime
-from decimal import Decimal
+from typing import Optional
+from decimal import Decimal, ROUND_HALF_UP
 import enum
+import re
 from backend.db import Base
 
+class Cents(TypeDecorator):
+    """Money stored as integer cents and handled as Decimal dollars.
+    
+    SUM/MIN/MAX over a Cents column stay exact integer arithmetic in SQL
+    and come back as Decimal, so callers never see the cents.
+    """
+    impl = Integer
+    cache_ok = True
+    
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return int((Decimal(str(value)) * 100).quantize(Decimal("1"), rounding=ROUND_HALF_UP))
+    
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return Decimal(int(value)).scaleb(-2)
+
 class EntryType(str, enum.Enum):
     ORDER = "ORDER"
     BONUS = "BONUS"
@@ -29,15 +52,32 @@ class ExpenseCategory(str, enum.Enum):
     LEISURE = "LEISURE"
     OTHER = "OTHER"
 
+def normalize_order_id(order_id: Optional[str]) -> Optional[str]:
+    """Order ids as typed and as synced ("#ue-3401 " vs "UE3401") compare equal"""
+    if not order_id:
+        return None
+    return re.sub(r"[^0-9A-Z]", "", str(order_id).upper()) or None
+
+def _order_key_default(context):
+    # Covers Core inserts (the sync's executemany), which skip validates()
+    return normalize_order_id(context.get_current_parameters().get("order_id"))
+
 class Entry(Base):
     __tablename__ = "entries"
+    __table_args__ = (
+        # Duplicate lookups: the same order id, or the same pay close in time
+        Index("ix_entries_app_order_key", "app", "order_key"),
+        Index("ix_entries_app_amount_timestamp", "app", "amount_cents", "timestamp"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     timestamp = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
     type = Column(SQLEnum(EntryType), nullable=False)
     app = Column(SQLEnum(AppType), nullable=False)
     order_id = Column(String, nullable=True)
-    amount = Column(Numeric(10, 2), nullable=False)
+    # normalize_order_id(order_id)
+    order_key = Column(String, nullable=True, default=_order_key_default)
+    amount = Column("amount_cents", Cents, nullable=False)
     distance_miles = Column(Float, default=0.0)
     duration_minutes = Column(Integer, default=0)
     category = Column(SQLEnum(ExpenseCategory), nullable=True)
@@ -45,6 +85,11 @@ class Entry(Base):
     receipt_url = Column(String, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    
+    @validates("order_id")
+    def _set_order_key(self, key, order_id):
+        self.order_key = normalize_order_id(order_id)
+        return order_id
 
 class Settings(Base):
     __tablename__ = "settings"
@@ -87,13 +132,115 @@ class ApiCredential(Base):
 
 class SyncedOrder(Base):
     __tablename__ = "synced_orders"
+    __table_args__ = (
+        Index("uq_synced_orders_platform_order", "platform", "platform_order_id", unique=True),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     platform = Column(SQLEnum(PlatformIntegration), nullable=False)
     platform_order_id = Column(String, nullable=False, index=True)
-    entry_id = Column(Integer, nullable=True)
+    entry_id = Column(Integer, nullable=True, index=True)
     sync_status = Column(String, default="pending", nullable=False)
     synced_at = Column(DateTime, nullable=True)
+    # Key into order_payloads; raw_data only holds payloads from before the blob store
+    payload_hash = Column(String, nullable=True)
     raw_data = Column(Text, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+class SyncState(Base):
+    __tablename__ = "sync_states"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    credential_id = Column(Integer, nullable=False, unique=True)
+    platform = Column(SQLEnum(PlatformIntegration), nullable=False)
+    # Latest completed_at seen from the platform; incremental runs start here
+    watermark = Column(DateTime, nullable=True)
+    # Platform page cursor of an unfinished run, and the window it belongs to
+    cursor = Column(String, nullable=True)
+    window_start = Column(DateTime, nullable=True)
+    window_end = Column(DateTime, nullable=True)
+    last_synced_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+class SyncRun(Base):
+    __tablename__ = "sync_runs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    credential_id = Column(Integer, nullable=False, index=True)
+    platform = Column(SQLEnum(PlatformIntegration), nullable=False)
+    full_resync = Column(Integer, default=0, nullable=False)
+    window_start = Column(DateTime, nullable=False)
+    window_end = Column(DateTime, nullable=False)
+    started_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    finished_at = Column(DateTime, nullable=True)
+    status = Column(String, default="running", nullable=False)
+    fetched = Column(Integer, default=0, nullable=False)
+    new = Column(Integer, default=0, nullable=False)
+    duplicates = Column(Integer, default=0, nullable=False)
+    error = Column(Text, nullable=True)
+
+class JobLease(Base):
+    __tablename__ = "job_leases"
+    
+    name = Column(String, primary_key=True)
+    holder = Column(String, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+    heartbeat_at = Column(DateTime, nullable=False)
+
+class PayloadDictionary(Base):
+    __tablename__ = "payload_dictionaries"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    platform = Column(SQLEnum(PlatformIntegration), nullable=False)
+    data = Column(LargeBinary, nullable=False)
+    sample_count = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+class OrderPayload(Base):
+    __tablename__ = "order_payloads"
+    
+    # SHA-256 of the canonical JSON payload
+    hash = Column(String, primary_key=True)
+    platform = Column(SQLEnum(PlatformIntegration), nullable=False)
+    dictionary_id = Column(Integer, nullable=True)
+    raw_size = Column(Integer, nullable=False)
+    data = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+class SuggestionCache(Base):
+    __tablename__ = "suggestion_cache"
+    
+    # SHA-256 of the model name and the stats context sent to it
+    fingerprint = Column(String, primary_key=True)
+    suggestion = Column(Text, nullable=False)
+    hits = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+    last_used_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+class ReferenceVersion(Base):
+    __tablename__ = "reference_versions"
+    
+    # Bumped in the same transaction as every write to settings, goals or
+    # api_credentials; workers poll it to know when to reload their copy
+    name = Column(String, primary_key=True)
+    version = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+class DistributionSketch(Base):
+    __tablename__ = "distribution_sketches"
+    __table_args__ = (
+        Index("uq_distribution_sketches_key", "grain", "day", "app", "metric", unique=True),
+    )
+    
+    # A serialized QuantileSketch of one metric over one app's orders for a
+    # UTC day ("day") or a whole month ("month", day is the 1st)
+    id = Column(Integer, primary_key=True, index=True)
+    grain = Column(String, nullable=False)
+    day = Column(Date, nullable=False)
+    app = Column(SQLEnum(AppType), nullable=False)
+    metric = Column(String, nullable=False)
+    count = Column(Integer, nullable=False)
+    data = Column(LargeBinary, nullable=False)
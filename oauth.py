@@ -3,20 +3,16 @@ from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
 from backend.db import get_db
 from backend.models import ApiCredential, PlatformIntegration
+from backend.services.credential_manager import (
+    credential_manager,
+    UBER_CLIENT_ID, UBER_CLIENT_SECRET, UBER_REDIRECT_URI,
+    SHIPT_CLIENT_ID, SHIPT_CLIENT_SECRET, SHIPT_REDIRECT_URI
+)
+from backend.services.reference_data import reference_cache
 import httpx
-import os
 
 router = APIRouter()
 
-# OAuth credentials from environment
-UBER_CLIENT_ID = os.getenv("UBER_CLIENT_ID", "demo_uber_client")
-UBER_CLIENT_SECRET = os.getenv("UBER_CLIENT_SECRET", "demo_uber_secret")
-UBER_REDIRECT_URI = os.getenv("UBER_REDIRECT_URI", "http://localhost:5000/api/oauth/uber/callback")
-
-SHIPT_CLIENT_ID = os.getenv("SHIPT_CLIENT_ID", "demo_shipt_client")
-SHIPT_CLIENT_SECRET = os.getenv("SHIPT_CLIENT_SECRET", "demo_shipt_secret")
-SHIPT_REDIRECT_URI = os.getenv("SHIPT_REDIRECT_URI", "http://localhost:5000/api/oauth/shipt/callback")
-
 
 @router.get("/oauth/uber/authorize")
 async def uber_authorize():
@@ -80,7 +76,8 @@ async def uber_callback(code: str = Query(...), db: Session = Depends(get_db)):
                 )
                 db.add(cred)
             
-            db.commit()
+            reference_cache.commit(db)
+            credential_manager.invalidate(PlatformIntegration.UBER)
             
             return {"message": "Uber account connected successfully", "platform": "UBER"}
             
@@ -150,7 +147,8 @@ async def shipt_callback(code: str = Query(...), db: Session = Depends(get_db)):
                 )
                 db.add(cred)
             
-            db.commit()
+            reference_cache.commit(db)
+            credential_manager.invalidate(PlatformIntegration.SHIPT)
             
             return {"message": "Shipt account connected successfully", "platform": "SHIPT"}
             
@@ -171,7 +169,8 @@ async def disconnect_platform(platform: str, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail=f"No connection found for {platform}")
     
     cred.is_active = 0
-    db.commit()
+    reference_cache.commit(db)
+    credential_manager.invalidate(platform_enum)
     
     return {"message": f"{platform} account disconnected"}
 
@@ -179,13 +178,13 @@ async def disconnect_platform(platform: str, db: Session = Depends(get_db)):
 @router.get("/oauth/status")
 async def get_oauth_status(db: Session = Depends(get_db)):
     """Get status of all OAuth connections"""
-    credentials = db.query(ApiCredential).all()
+    credentials = reference_cache.get(db).credentials
     
     status = {}
-    for cred in credentials:
-        status[cred.platform.value] = {
-            "connected": bool(cred.is_active),
-            "token_expires_at": cred.token_expires_at.isoformat() if cred.token_expires_at else None
+    for platform, cred in credentials.items():
+        status[platform.value] = {
+            "connected": cred["connected"],
+            "token_expires_at": cred["token_expires_at"].isoformat() if cred["token_expires_at"] else None
         }
     
     return status
@@ -0,0 +1,210 @@
+import hashlib
+import json
+import logging
+import weakref
+import zlib
+from collections import Counter
+from typing import Dict, List, Optional
+from sqlalchemy import select, update, func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from backend.models import OrderPayload, PayloadDictionary, PlatformIntegration, SyncedOrder
+
+logger = logging.getLogger(__name__)
+
+# Raw platform payloads live compressed in order_payloads, keyed by the
+# SHA-256 of their canonical JSON, and are only read when asked for.
+# Compression is zlib primed with a per-platform preset dictionary built
+# from sample payloads, which is what makes small JSON documents shrink.
+
+# zlib only looks back 32 KB, so larger dictionaries would be wasted
+DICTIONARY_SIZE = 16 * 1024
+# A platform's dictionary is built from the first page with at least this many orders
+TRAIN_MIN_SAMPLES = 20
+COMPRESSION_LEVEL = 9
+MIGRATION_BATCH_SIZE = 1000
+
+# Dictionary data by id, per engine so separate databases never share ids
+_dictionaries = weakref.WeakKeyDictionary()
+
+
+def canonical_json(order: dict) -> bytes:
+    return json.dumps(order, sort_keys=True, separators=(",", ":")).encode()
+
+
+def train_dictionary(samples: List[bytes], size: int = DICTIONARY_SIZE) -> bytes:
+    """Build a zlib preset dictionary from the fragments samples share most.
+    
+    Fragments are split on JSON value boundaries, so keys and repeated
+    values ("status":"completed") become dictionary entries. zlib favours
+    matches near the end of the dictionary, so the most common go last.
+    """
+    counts = Counter()
+    for sample in samples:
+        for fragment in set(sample.replace(b"{", b",").replace(b"}", b",").split(b",")):
+            if len(fragment) > 2:
+                counts[fragment] += 1
+    
+    chosen = []
+    total = 0
+    for fragment, count in counts.most_common():
+        if count < 2 or total + len(fragment) + 1 > size:
+            continue
+        chosen.append(fragment)
+        total += len(fragment) + 1
+    return b",".join(reversed(chosen))
+
+
+def compress(raw: bytes, dictionary: Optional[bytes]) -> bytes:
+    compressor = zlib.compressobj(COMPRESSION_LEVEL, zdict=dictionary) if dictionary else zlib.compressobj(COMPRESSION_LEVEL)
+    return compressor.compress(raw) + compressor.flush()
+
+
+def decompress(data: bytes, dictionary: Optional[bytes]) -> bytes:
+    decompressor = zlib.decompressobj(zdict=dictionary) if dictionary else zlib.decompressobj()
+    return decompressor.decompress(data) + decompressor.flush()
+
+
+def _dictionary_data(db: Session, dictionary_id: int) -> bytes:
+    # Dictionaries never change once written, so they are cached for good
+    bind = db.get_bind()
+    cached = _dictionaries.setdefault(getattr(bind, "engine", bind), {})
+    if dictionary_id not in cached:
+        cached[dictionary_id] = db.get(PayloadDictionary, dictionary_id).data
+    return cached[dictionary_id]
+
+
+def current_dictionary(db: Session, platform: PlatformIntegration, samples: List[bytes] = ()) -> Optional[int]:
+    """Latest dictionary id for the platform, training one from samples if there is none"""
+    dictionary_id = db.execute(
+        select(func.max(PayloadDictionary.id)).where(PayloadDictionary.platform == platform)
+    ).scalar()
+    if dictionary_id is None and len(samples) >= TRAIN_MIN_SAMPLES:
+        dictionary = PayloadDictionary(
+            platform=platform,
+            data=train_dictionary(list(samples)),
+            sample_count=len(samples)
+        )
+        db.add(dictionary)
+        db.flush()
+        dictionary_id = dictionary.id
+    return dictionary_id
+
+
+def store_payloads(db: Session, platform: PlatformIntegration, orders: List[dict]) -> List[str]:
+    """Compress and store order payloads, returning their hashes in order"""
+    raws = [canonical_json(order) for order in orders]
+    dictionary_id = current_dictionary(db, platform, raws)
+    dictionary = _dictionary_data(db, dictionary_id) if dictionary_id else None
+    
+    rows = {}
+    for raw in raws:
+        payload_hash = hashlib.sha256(raw).hexdigest()
+        if payload_hash not in rows:
+            rows[payload_hash] = {
+                "hash": payload_hash,
+                "platform": platform,
+                "dictionary_id": dictionary_id,
+                "raw_size": len(raw),
+                "data": compress(raw, dictionary)
+            }
+    
+    if rows:
+        # Identical payloads are stored once
+        db.execute(
+            sqlite_insert(OrderPayload).on_conflict_do_nothing(index_elements=["hash"]),
+            list(rows.values())
+        )
+    return [hashlib.sha256(raw).hexdigest() for raw in raws]
+
+
+def load_payload(db: Session, payload_hash: str) -> Optional[dict]:
+    payload = db.get(OrderPayload, payload_hash)
+    if payload is None:
+        return None
+    dictionary = _dictionary_data(db, payload.dictionary_id) if payload.dictionary_id else None
+    return json.loads(decompress(payload.data, dictionary))
+
+
+def load_synced_order_payload(db: Session, synced_order: SyncedOrder) -> Optional[dict]:
+    """Raw platform payload for a synced order, from the blob store or the legacy column"""
+    if synced_order.payload_hash:
+        return load_payload(db, synced_order.payload_hash)
+    if synced_order.raw_data:
+        return json.loads(synced_order.raw_data)
+    return None
+
+
+def _parse_raw(row) -> Optional[dict]:
+    try:
+        return json.loads(row.raw_data)
+    except ValueError:
+        logger.warning("Leaving synced order %s in place: raw_data is not valid JSON", row.id)
+        return None
+
+
+def migrate_raw_payloads(db: Session) -> dict:
+    """Move inline synced_orders.raw_data into the compressed store.
+    
+    Rows whose raw_data doesn't parse are logged and left inline.
+    """
+    for platform in PlatformIntegration:
+        samples = db.execute(
+            select(SyncedOrder.id, SyncedOrder.raw_data).where(
+                SyncedOrder.platform == platform,
+                SyncedOrder.raw_data.isnot(None)
+            ).limit(500)
+        ).all()
+        parsed = (_parse_raw(row) for row in samples)
+        current_dictionary(db, platform, [canonical_json(order) for order in parsed if order is not None])
+    
+    moved = 0
+    skipped = 0
+    last_id = 0
+    while True:
+        # Walk by id so skipped rows are not fetched again
+        rows = db.execute(
+            select(SyncedOrder.id, SyncedOrder.platform, SyncedOrder.raw_data)
+            .where(SyncedOrder.raw_data.isnot(None), SyncedOrder.id > last_id)
+            .order_by(SyncedOrder.id)
+            .limit(MIGRATION_BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        
+        updates = []
+        for platform in PlatformIntegration:
+            batch = []
+            for row in rows:
+                if row.platform == platform:
+                    order = _parse_raw(row)
+                    if order is None:
+                        skipped += 1
+                    else:
+                        batch.append((row, order))
+            if batch:
+                hashes = store_payloads(db, platform, [order for _, order in batch])
+                updates.extend({"id": row.id, "payload_hash": h, "raw_data": None} for (row, _), h in zip(batch, hashes))
+        if updates:
+            db.execute(update(SyncedOrder), updates)
+        moved += len(updates)
+    
+    db.commit()
+    return {"moved": moved, "skipped": skipped, **payload_report(db)}
+
+
+def payload_report(db: Session) -> dict:
+    """Raw vs stored size of all payloads in the blob store"""
+    payloads, raw_bytes, stored_bytes = db.execute(
+        select(func.count(OrderPayload.hash), func.sum(OrderPayload.raw_size), func.sum(func.length(OrderPayload.data)))
+    ).one()
+    raw_bytes = raw_bytes or 0
+    stored_bytes = stored_bytes or 0
+    return {
+        "payloads": payloads,
+        "raw_bytes": raw_bytes,
+        "stored_bytes": stored_bytes,
+        "saved_bytes": raw_bytes - stored_bytes,
+        "compression_ratio": round(raw_bytes / stored_bytes, 2) if stored_bytes else None
+    }
@@ -1,4 +1,7 @@
-from datetime import datetime, timedelta
+from datetime import date, datetime, time, timedelta, timezone
+from typing import NamedTuple, Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from backend.models import TimeframeType
 
 def get_today():
     now = datetime.utcnow()
@@ -40,3 +43,110 @@ def get_last_month():
     start = datetime(last_month.year, last_month.month, 1, 0, 0, 0)
     end = datetime(last_month.year, last_month.month, last_month.day, 23, 59, 59)
     return start, end
+
+class Period(NamedTuple):
+    """A timeframe resolved in a driver's timezone.
+
+    start and end are naive UTC like Entry.timestamp, and the window is
+    half-open: start <= timestamp < end. Both are local midnights, so every
+    request for the same timeframe and tz within a period gets the same
+    window, whatever time it is sent.
+    """
+    timeframe: str
+    tz: str
+    start: datetime
+    end: datetime
+
+def _utc_midnight(day: date, zone: ZoneInfo) -> datetime:
+    return datetime.combine(day, time(), zone).astimezone(timezone.utc).replace(tzinfo=None)
+
+def resolve_period(timeframe: str, tz: str = "UTC", now: Optional[datetime] = None) -> Period:
+    """Resolve a TimeframeType name into its local-day window; ValueError if either is unknown"""
+    try:
+        tf = TimeframeType[timeframe]
+    except KeyError:
+        raise ValueError(f"Unknown timeframe: {timeframe}")
+    try:
+        zone = ZoneInfo(tz)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"Unknown timezone: {tz}")
+    
+    today = (now or datetime.now(timezone.utc)).astimezone(zone).date()
+    tomorrow = today + timedelta(days=1)
+    first_of_month = today.replace(day=1)
+    
+    if tf == TimeframeType.TODAY:
+        start, end = today, tomorrow
+    elif tf == TimeframeType.YESTERDAY:
+        start, end = today - timedelta(days=1), today
+    elif tf == TimeframeType.THIS_WEEK:
+        # Weeks start on Monday, as in get_this_week()
+        start = today - timedelta(days=today.weekday())
+        end = start + timedelta(days=7)
+    elif tf == TimeframeType.LAST_7_DAYS:
+        start, end = today - timedelta(days=6), tomorrow
+    elif tf == TimeframeType.THIS_MONTH:
+        start = first_of_month
+        end = (first_of_month + timedelta(days=32)).replace(day=1)
+    else:
+        start = (first_of_month - timedelta(days=1)).replace(day=1)
+        end = first_of_month
+    
+    return Period(tf.value, tz, _utc_midnight(start, zone), _utc_midnight(end, zone))
+
+COMPARISONS = ("previous", "same_last_year")
+
+def _local(moment: datetime, zone: ZoneInfo) -> datetime:
+    """Naive UTC to naive local wall-clock time"""
+    return moment.replace(tzinfo=timezone.utc).astimezone(zone).replace(tzinfo=None)
+
+def as_naive_utc(moment: datetime) -> datetime:
+    """Naive UTC like Entry.timestamp, converting an aware datetime"""
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+def _utc(local: datetime, zone: ZoneInfo) -> datetime:
+    return local.replace(tzinfo=zone).astimezone(timezone.utc).replace(tzinfo=None)
+
+def _add_months(day: date, months: int) -> date:
+    # Only ever called with the first of a month
+    year, month = divmod(day.year * 12 + day.month - 1 + months, 12)
+    return date(year, month + 1, 1)
+
+def comparison_period(period: Period, against: str) -> Period:
+    """The window a period is compared against; ValueError if against is unknown.
+
+    "previous" is the period just before, of the same kind: yesterday for
+    TODAY, last week for THIS_WEEK, last month for THIS_MONTH.
+    "same_last_year" is the same month a year back for month timeframes,
+    and 52 weeks back otherwise so weekdays still line up.
+    """
+    if against not in COMPARISONS:
+        raise ValueError(f"Unknown comparison: {against}")
+    zone = ZoneInfo(period.tz)
+    start = _local(period.start, zone).date()
+    end = _local(period.end, zone).date()
+    monthly = period.timeframe in (TimeframeType.THIS_MONTH.value, TimeframeType.LAST_MONTH.value)
+    
+    if monthly:
+        months = -1 if against == "previous" else -12
+        start, end = _add_months(start, months), _add_months(end, months)
+    else:
+        shift = timedelta(days=(end - start).days if against == "previous" else 364)
+        start, end = start - shift, end - shift
+    
+    return Period(period.timeframe, period.tz, _utc_midnight(start, zone), _utc_midnight(end, zone))
+
+def period_to_date(period: Period, comparison: Period, now: Optional[datetime] = None) -> Period:
+    """comparison cut off as far into it as now is into period, in local time.
+
+    Once period is over this is all of comparison.
+    """
+    zone = ZoneInfo(period.tz)
+    now_local = (now or datetime.now(timezone.utc)).astimezone(zone).replace(tzinfo=None)
+    start_local = _local(period.start, zone)
+    elapsed = min(max(now_local - start_local, timedelta(0)), _local(period.end, zone) - start_local)
+    
+    end_local = min(_local(comparison.start, zone) + elapsed, _local(comparison.end, zone))
+    return Period(comparison.timeframe, comparison.tz, comparison.start, _utc(end_local, zone))
@@ -0,0 +1,76 @@
+import math
+import struct
+from collections import Counter
+from typing import Iterable
+
+# A DDSketch: values go into logarithmically sized buckets, so any quantile
+# read back is within RELATIVE_ACCURACY of the true value, whatever the
+# distribution. Sketches merge by adding bucket counts, which is what lets
+# per-day sketches be combined into any date range.
+
+RELATIVE_ACCURACY = 0.01
+# Values at or below this (free orders, unpaid time) are counted as zero
+MIN_VALUE = 1e-6
+
+_HEADER = struct.Struct("<I")
+_BUCKET = struct.Struct("<hI")
+
+
+class QuantileSketch:
+    def __init__(self, relative_accuracy: float = RELATIVE_ACCURACY):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.buckets = Counter()
+        self.zero_count = 0
+
+    @property
+    def count(self) -> int:
+        return self.zero_count + sum(self.buckets.values())
+
+    def add(self, value: float):
+        if value <= MIN_VALUE:
+            self.zero_count += 1
+        else:
+            self.buckets[math.ceil(math.log(value) / self._log_gamma)] += 1
+
+    def extend(self, values: Iterable[float]) -> "QuantileSketch":
+        for value in values:
+            self.add(value)
+        return self
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        self.buckets.update(other.buckets)
+        self.zero_count += other.zero_count
+        return self
+
+    def quantile(self, q: float):
+        """Value at quantile q in [0, 1], or None if the sketch is empty"""
+        count = self.count
+        if count == 0:
+            return None
+        rank = q * (count - 1)
+        seen = self.zero_count
+        if seen > rank:
+            return 0.0
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if seen > rank:
+                # The point of bucket (gamma^(key-1), gamma^key] that is
+                # within the relative accuracy of both ends
+                return 2 * self.gamma ** key / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.buckets) / (self.gamma + 1)
+
+    def to_bytes(self) -> bytes:
+        """Zero count then (bucket, count) pairs; a day of orders is a few hundred bytes"""
+        return _HEADER.pack(self.zero_count) + b"".join(
+            _BUCKET.pack(key, n) for key, n in sorted(self.buckets.items())
+        )
+
+    @classmethod
+    def from_bytes(cls, data: bytes, relative_accuracy: float = RELATIVE_ACCURACY) -> "QuantileSketch":
+        sketch = cls(relative_accuracy)
+        (sketch.zero_count,) = _HEADER.unpack_from(data)
+        for key, n in _BUCKET.iter_unpack(data[_HEADER.size:]):
+            sketch.buckets[key] = n
+        return sketch
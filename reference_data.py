@@ -0,0 +1,145 @@
+import threading
+import time
+import weakref
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, NamedTuple, Optional
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from backend.models import ApiCredential, Goal, PlatformIntegration, ReferenceVersion, Settings, TimeframeType
+
+# Settings, goals and OAuth connection status change a few times a month
+# but are read on every request, so each worker keeps them in memory.
+# Writers commit through ReferenceCache.commit(), which bumps the version
+# row in the same transaction and reloads this worker's copy; the other
+# workers notice the new version on their next poll.
+
+VERSION_NAME = "reference_data"
+# Bumped by entry writers in the same transaction, for caches of results
+# computed from entries (see SharedVersion)
+ENTRIES_VERSION_NAME = "entries"
+# At most one version lookup per engine in this window
+POLL_INTERVAL_SECONDS = 2.0
+
+
+class ReferenceSnapshot(NamedTuple):
+    version: int
+    # None until the settings row has been created
+    settings: Optional[dict]
+    goals: Dict[TimeframeType, dict]
+    credentials: Dict[PlatformIntegration, dict]
+    
+    @property
+    def cost_per_mile(self) -> Decimal:
+        return self.settings["cost_per_mile"] if self.settings else Decimal("0")
+
+
+class ReferenceCache:
+    def __init__(self, poll_interval: float = POLL_INTERVAL_SECONDS):
+        self.poll_interval = poll_interval
+        # Keyed by engine so separate databases (tests, scripts) never share a copy
+        self._entries = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.polls = 0
+    
+    def get(self, db: Session) -> ReferenceSnapshot:
+        engine = db.get_bind()
+        entry = self._entries.get(engine)
+        if entry is None:
+            return self.load(db)
+        
+        snapshot, checked_at = entry
+        now = time.monotonic()
+        if now - checked_at < self.poll_interval:
+            return snapshot
+        
+        self.polls += 1
+        if _read_version(db) != snapshot.version:
+            return self.load(db)
+        self._entries[engine] = (snapshot, now)
+        return snapshot
+    
+    def load(self, db: Session) -> ReferenceSnapshot:
+        with self._lock:
+            self.loads += 1
+            # Version first: a write landing mid-load bumps past it and is
+            # picked up by the next poll rather than missed
+            version = _read_version(db)
+            settings = db.query(Settings).first()
+            snapshot = ReferenceSnapshot(
+                version=version,
+                settings={"id": settings.id, "cost_per_mile": settings.cost_per_mile} if settings else None,
+                goals={
+                    goal.timeframe: {
+                        "id": goal.id,
+                        "timeframe": goal.timeframe,
+                        "target_profit": goal.target_profit,
+                        "created_at": goal.created_at,
+                        "updated_at": goal.updated_at
+                    }
+                    for goal in db.query(Goal).order_by(Goal.id)
+                },
+                credentials={
+                    cred.platform: {
+                        "connected": bool(cred.is_active),
+                        "token_expires_at": cred.token_expires_at
+                    }
+                    for cred in db.query(ApiCredential)
+                }
+            )
+            self._entries[db.get_bind()] = (snapshot, time.monotonic())
+            return snapshot
+    
+    def commit(self, db: Session) -> ReferenceSnapshot:
+        """Commit the caller's writes to reference tables and reload this worker's copy"""
+        _bump_version(db, VERSION_NAME)
+        db.commit()
+        return self.load(db)
+
+
+class SharedVersion:
+    """A version row writers bump in their own transaction, polled per engine.
+
+    Lets a worker's caches notice commits made by the other workers, for
+    data that changes too often to keep a whole snapshot of.
+    """
+    
+    def __init__(self, name: str, poll_interval: float = POLL_INTERVAL_SECONDS):
+        self.name = name
+        self.poll_interval = poll_interval
+        self._checked = weakref.WeakKeyDictionary()
+    
+    def get(self, db: Session) -> int:
+        engine = db.get_bind()
+        now = time.monotonic()
+        entry = self._checked.get(engine)
+        if entry is not None and now - entry[1] < self.poll_interval:
+            return entry[0]
+        version = _read_version(db, self.name)
+        self._checked[engine] = (version, now)
+        return version
+    
+    def bump(self, db: Session):
+        """Move the version on when the caller's transaction commits"""
+        _bump_version(db, self.name)
+
+
+def _bump_version(db: Session, name: str):
+    db.execute(
+        sqlite_insert(ReferenceVersion)
+        .values(name=name, version=1, updated_at=datetime.utcnow())
+        .on_conflict_do_update(
+            index_elements=[ReferenceVersion.name],
+            set_={"version": ReferenceVersion.version + 1, "updated_at": datetime.utcnow()}
+        )
+    )
+
+
+def _read_version(db: Session, name: str = VERSION_NAME) -> int:
+    version = db.query(ReferenceVersion.version).filter(ReferenceVersion.name == name).scalar()
+    return version or 0
+
+
+reference_cache = ReferenceCache()
+entries_version = SharedVersion(ENTRIES_VERSION_NAME)
@@ -0,0 +1,193 @@
+import asyncio
+import logging
+import random
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+import httpx
+from backend.models import PlatformIntegration
+
+logger = logging.getLogger(__name__)
+
+# Client-side request budget per platform: (requests per second, burst)
+RATE_LIMITS = {
+    PlatformIntegration.UBER: (2.0, 5),
+    PlatformIntegration.SHIPT: (2.0, 5),
+}
+MAX_ATTEMPTS = 5
+BASE_DELAY_SECONDS = 1.0
+MAX_DELAY_SECONDS = 60.0
+# Consecutive failed attempts that open a platform's circuit, and how long it stays open
+FAILURE_THRESHOLD = 5
+RESET_TIMEOUT_SECONDS = 300.0
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a platform whose circuit is open"""
+
+
+class TokenBucket:
+    """Async token bucket; acquire() waits until a request may be sent"""
+    
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class CircuitBreaker:
+    """Closed -> open after repeated failures -> half-open trial after a cool-down.
+    
+    Half-open lets through a single trial request; everyone else is refused
+    until it succeeds or fails. A trial that never reports back (cancelled
+    mid-request) is given up on after another reset_timeout.
+    """
+    
+    def __init__(self, failure_threshold: int = FAILURE_THRESHOLD, reset_timeout: float = RESET_TIMEOUT_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_started_at: Optional[float] = None
+    
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+    
+    def before_request(self):
+        state = self.state
+        if state == "open":
+            raise CircuitOpenError("Circuit open after repeated failures")
+        if state == "half_open":
+            now = time.monotonic()
+            if self.trial_started_at is not None and now - self.trial_started_at < self.reset_timeout:
+                raise CircuitOpenError("Circuit half-open with a trial request in flight")
+            self.trial_started_at = now
+    
+    def end_trial(self):
+        """Give up the trial slot without a verdict, e.g. on a 429"""
+        self.trial_started_at = None
+    
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.trial_started_at = None
+    
+    def record_failure(self):
+        self.failures += 1
+        self.trial_started_at = None
+        # A failed half-open trial re-opens the circuit for another cool-down
+        if self.failures >= self.failure_threshold or self.opened_at is not None:
+            self.opened_at = time.monotonic()
+
+
+_limiters: Dict[PlatformIntegration, TokenBucket] = {}
+_breakers: Dict[PlatformIntegration, CircuitBreaker] = {}
+
+def get_limiter(platform: PlatformIntegration) -> TokenBucket:
+    if platform not in _limiters:
+        rate, burst = RATE_LIMITS.get(platform, (1.0, 1))
+        _limiters[platform] = TokenBucket(rate, burst)
+    return _limiters[platform]
+
+def configure_rate_limit(platform: PlatformIntegration, rate: float, burst: int):
+    """Replace a platform's client-side rate limit, e.g. for local mock servers"""
+    _limiters[platform] = TokenBucket(rate, burst)
+
+def get_breaker(platform: PlatformIntegration) -> CircuitBreaker:
+    if platform not in _breakers:
+        _breakers[platform] = CircuitBreaker()
+    return _breakers[platform]
+
+
+def retry_after_seconds(response: httpx.Response, max_delay: float = MAX_DELAY_SECONDS) -> Optional[float]:
+    """Parse a Retry-After header given as seconds or an HTTP date, capped at max_delay"""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        seconds = (retry_at - datetime.now(timezone.utc)).total_seconds()
+    return min(max_delay, max(0.0, seconds))
+
+
+def backoff_seconds(attempt: int, base_delay: float = BASE_DELAY_SECONDS, max_delay: float = MAX_DELAY_SECONDS) -> float:
+    """Exponential backoff with full jitter for the given 1-based attempt"""
+    return random.uniform(0, min(max_delay, base_delay * 2 ** (attempt - 1)))
+
+
+async def request_with_retries(
+    client: httpx.AsyncClient,
+    method: str,
+    url: str,
+    platform: PlatformIntegration,
+    max_attempts: int = MAX_ATTEMPTS,
+    base_delay: float = BASE_DELAY_SECONDS,
+    **kwargs
+) -> httpx.Response:
+    """Send a platform request through its rate limiter and circuit breaker.
+    
+    Retries timeouts, connection errors, 429 and 5xx responses, honouring
+    Retry-After. Returns the successful response or raises the last error.
+    """
+    limiter = get_limiter(platform)
+    breaker = get_breaker(platform)
+    
+    attempt = 0
+    while True:
+        attempt += 1
+        breaker.before_request()
+        await limiter.acquire()
+        
+        delay = None
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.TransportError as e:
+            breaker.record_failure()
+            if attempt >= max_attempts:
+                raise
+            logger.warning("%s request failed (%s), attempt %d/%d", platform.value, e, attempt, max_attempts)
+        else:
+            if response.status_code not in RETRYABLE_STATUS:
+                # Other client errors are the caller's problem, not the platform's health
+                breaker.record_success()
+                response.raise_for_status()
+                return response
+            
+            if response.status_code != 429:
+                breaker.record_failure()
+            else:
+                breaker.end_trial()
+            if attempt >= max_attempts:
+                response.raise_for_status()
+            delay = retry_after_seconds(response)
+            logger.warning("%s returned %d, attempt %d/%d", platform.value, response.status_code, attempt, max_attempts)
+        
+        if delay is None:
+            delay = backoff_seconds(attempt, base_delay)
+        await asyncio.sleep(delay)
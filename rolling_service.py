@@ -0,0 +1,118 @@
+from collections import deque
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Dict, List, NamedTuple
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from backend.models import Entry, EntryType
+
+# Moving averages over daily summaries. Each day is summed once in SQL and
+# then slides through a fixed-size window: entering adds its sums, leaving
+# subtracts them, so a series of N points costs N days of work rather than
+# N x window. The state lives only for the request: summaries are summed
+# afresh each time, which keeps them exact under edits to past entries.
+
+MAX_WINDOW_DAYS = 365
+# Points in one series; longer ranges are refused rather than walked day by day
+MAX_SPAN_DAYS = 366
+
+
+class DaySummary(NamedTuple):
+    profit: Decimal
+    miles: float
+    minutes: int
+    orders: int
+
+
+EMPTY_DAY = DaySummary(Decimal("0"), 0.0, 0, 0)
+
+
+def daily_summaries(db: Session, first_day: date, last_day: date) -> Dict[date, DaySummary]:
+    """Sums per UTC day in [first_day, last_day]; days without entries are absent"""
+    day = func.date(Entry.timestamp)
+    rows = db.execute(
+        select(
+            day,
+            func.sum(Entry.amount),
+            func.sum(Entry.distance_miles),
+            func.sum(Entry.duration_minutes),
+            func.count(Entry.id).filter(Entry.type == EntryType.ORDER)
+        ).where(
+            Entry.timestamp >= datetime.combine(first_day, datetime.min.time()),
+            Entry.timestamp < datetime.combine(last_day + timedelta(days=1), datetime.min.time())
+        ).group_by(day)
+    ).all()
+    return {
+        date.fromisoformat(d): DaySummary(profit or Decimal("0"), miles or 0.0, minutes or 0, orders)
+        for d, profit, miles, minutes, orders in rows
+    }
+
+
+class RollingWindow:
+    """Sums over the last `days` days pushed, with O(1) push"""
+
+    def __init__(self, days: int):
+        self.days = days
+        self._window = deque()
+        self.profit = Decimal("0")
+        self.miles = 0.0
+        self.minutes = 0
+        self.orders = 0
+
+    def _apply(self, summary: DaySummary, sign: int):
+        self.profit += sign * summary.profit
+        self.miles += sign * summary.miles
+        self.minutes += sign * summary.minutes
+        self.orders += sign * summary.orders
+
+    def push(self, summary: DaySummary):
+        self._window.append(summary)
+        self._apply(summary, 1)
+        if len(self._window) > self.days:
+            self._apply(self._window.popleft(), -1)
+
+    def point(self) -> dict:
+        hours = self.minutes / 60.0
+        # Float miles drift a little as days are added and removed
+        miles = round(self.miles, 6)
+        return {
+            "profit": float(self.profit),
+            "average_profit": float(round(self.profit / len(self._window), 2)),
+            "hours": round(hours, 2),
+            "miles": round(miles, 2),
+            "orders": self.orders,
+            "dollars_per_hour": float(round(self.profit / Decimal(str(hours)), 2)) if hours > 0 else None,
+            "dollars_per_mile": float(round(self.profit / Decimal(str(miles)), 2)) if miles > 0 else None
+        }
+
+
+def rolling_series(db: Session, window_days: int, first_day: date, last_day: date) -> dict:
+    """One point per day in [first_day, last_day], each over the window_days
+    days ending on it; ValueError for a window outside 1..MAX_WINDOW_DAYS or
+    a range longer than MAX_SPAN_DAYS"""
+    if not 1 <= window_days <= MAX_WINDOW_DAYS:
+        raise ValueError(f"window must be between 1 and {MAX_WINDOW_DAYS} days")
+    if last_day < first_day:
+        raise ValueError("from_date must not be after to_date")
+    if (last_day - first_day).days + 1 > MAX_SPAN_DAYS:
+        raise ValueError(f"from_date to to_date must span at most {MAX_SPAN_DAYS} days")
+
+    # Warm the window up on the days before the first point, so it is full
+    warm_up = first_day - timedelta(days=window_days - 1)
+    days = daily_summaries(db, warm_up, last_day)
+
+    window = RollingWindow(window_days)
+    series: List[dict] = []
+    day = warm_up
+    while day <= last_day:
+        window.push(days.get(day, EMPTY_DAY))
+        if day >= first_day:
+            series.append({"day": day, "day_profit": float(days.get(day, EMPTY_DAY).profit), **window.point()})
+        day += timedelta(days=1)
+
+    return {
+        "window_days": window_days,
+        "from_day": first_day,
+        "to_day": last_day,
+        "series": series
+    }
@@ -1,10 +1,15 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from backend.db import get_db
-from backend.schemas import RollupResponse
-from backend.services.rollup_service import calculate_rollup
+from backend.schemas import RollupResponse, RollupComparisonResponse
+from backend.services.rollup_service import calculate_rollup, calculate_rollup_comparison
+from backend.services.coalescing import coalesced
+from backend.services.period import resolve_period
+from backend.services.rolling_service import rolling_series
+from backend.services.cube_service import get_cube, parse_names, DIMENSIONS, MEASURES, DERIVED_MEASURES, DEFAULT_MEASURES
 from typing import Optional
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
+import re
 
 router = APIRouter()
 
@@ -13,8 +18,20 @@ async def get_rollup(
     from_date: Optional[str] = None,
     to_date: Optional[str] = None,
     timeframe: Optional[str] = None,
+    tz: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
+    # A timeframe with a tz, or with no explicit dates, is resolved here into
+    # canonical local-day bounds; client-sent from/to are the legacy path
+    if tz or (timeframe and not from_date and not to_date):
+        if not timeframe:
+            raise HTTPException(status_code=400, detail="tz requires a timeframe")
+        try:
+            period = resolve_period(timeframe, tz or "UTC")
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return await coalesced("rollup", db, calculate_rollup, None, None, None, period)
+    
     from_dt = None
     to_dt = None
     
@@ -23,5 +40,72 @@ async def get_rollup(
     if to_date:
         to_dt = datetime.fromisoformat(to_date.replace('Z', '+00:00')).astimezone(timezone.utc).replace(tzinfo=None)
     
-    rollup = calculate_rollup(db, from_dt, to_dt, timeframe)
+    rollup = await coalesced("rollup", db, calculate_rollup, from_dt, to_dt, timeframe)
     return rollup
+
+@router.get("/rollup/compare", response_model=RollupComparisonResponse)
+async def get_rollup_comparison(
+    timeframe: str,
+    against: str = "previous",
+    tz: str = "UTC",
+    db: Session = Depends(get_db)
+):
+    """The rollup for timeframe with deltas against the previous period or the
+    same period last year, both in full and up to the same point in it"""
+    try:
+        return await coalesced("rollup_compare", db, calculate_rollup_comparison, timeframe, against, tz)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/rollup/cube")
+async def get_rollup_cube(
+    dims: Optional[str] = None,
+    measures: Optional[str] = None,
+    from_date: Optional[str] = None,
+    to_date: Optional[str] = None,
+    timeframe: Optional[str] = None,
+    tz: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """Entries grouped by any of app, type, category, hour and weekday"""
+    try:
+        dim_names = parse_names(dims, DIMENSIONS)
+        measure_names = parse_names(measures, list(MEASURES) + list(DERIVED_MEASURES), DEFAULT_MEASURES)
+        period = resolve_period(timeframe, tz or "UTC") if timeframe else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    from_dt = None
+    to_dt = None
+    if not period:
+        if from_date:
+            from_dt = datetime.fromisoformat(from_date.replace('Z', '+00:00')).astimezone(timezone.utc).replace(tzinfo=None)
+        if to_date:
+            to_dt = datetime.fromisoformat(to_date.replace('Z', '+00:00')).astimezone(timezone.utc).replace(tzinfo=None)
+    
+    return await coalesced("rollup_cube", db, get_cube, dim_names, measure_names, from_dt, to_dt, period)
+
+@router.get("/rollup/rolling")
+async def get_rollup_rolling(
+    window: str = "7d",
+    from_date: Optional[str] = None,
+    to_date: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """Moving profit, $/hour and $/mile per UTC day over a window like 7d or 30d;
+    defaults to the 30 days ending today"""
+    match = re.fullmatch(r"(\d+)d", window)
+    if not match:
+        raise HTTPException(status_code=400, detail="window must be a number of days, like 7d")
+    
+    last_day = datetime.utcnow().date()
+    if to_date:
+        last_day = datetime.fromisoformat(to_date.replace('Z', '+00:00')).astimezone(timezone.utc).date()
+    first_day = last_day - timedelta(days=29)
+    if from_date:
+        first_day = datetime.fromisoformat(from_date.replace('Z', '+00:00')).astimezone(timezone.utc).date()
+    
+    try:
+        return await coalesced("rollup_rolling", db, rolling_series, int(match.group(1)), first_day, last_day)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -1,46 +1,68 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from backend.models import Entry, Settings, EntryType, AppType, Goal, TimeframeType
+from sqlalchemy import func, case, and_
+from backend.models import Entry, EntryType, AppType, TimeframeType
 from decimal import Decimal
-from datetime import datetime
-from typing import Optional
+from datetime import datetime, timezone
+from typing import List, Optional
+from backend.services.period import Period, resolve_period, comparison_period, period_to_date
+from backend.services.reference_data import reference_cache
+from backend.services.shifts_service import find_shifts
 
-def calculate_rollup(db: Session, from_date: Optional[datetime] = None, to_date: Optional[datetime] = None, timeframe: Optional[str] = None):
-    query = db.query(Entry)
-    
-    if from_date:
-        query = query.filter(Entry.timestamp >= from_date)
-    if to_date:
-        query = query.filter(Entry.timestamp <= to_date)
-    
-    entries = query.all()
-    
-    settings = db.query(Settings).first()
-    cost_per_mile = settings.cost_per_mile if settings else Decimal("0")
-    
+# The RollupResponse metrics a comparison reports deltas for
+COMPARED_METRICS = (
+    "revenue", "expenses", "profit", "miles", "hours", "dollars_per_mile",
+    "dollars_per_hour", "average_order_value", "per_hour_first_to_last"
+)
+
+def _group_sums(window: Optional[Period] = None):
+    """count, amount, positive amount, miles and minutes per (type, app) group,
+    restricted to window with conditional sums when one is given"""
+    if window is None:
+        return [
+            func.count(Entry.id),
+            func.sum(Entry.amount),
+            func.sum(case((Entry.amount > 0, Entry.amount), else_=0)),
+            func.sum(Entry.distance_miles),
+            func.sum(Entry.duration_minutes)
+        ]
+    inside = and_(Entry.timestamp >= window.start, Entry.timestamp < window.end)
+    return [
+        func.sum(case((inside, 1), else_=0)),
+        func.sum(case((inside, Entry.amount), else_=0)),
+        func.sum(case((and_(inside, Entry.amount > 0), Entry.amount), else_=0)),
+        func.sum(case((inside, Entry.distance_miles), else_=0)),
+        func.sum(case((inside, Entry.duration_minutes), else_=0))
+    ]
+
+def _summarize(groups, shift_hours: float) -> dict:
+    """Fold (type, app, count, amount, positive, miles, minutes) groups into
+    the RollupResponse metrics"""
     total_amount = Decimal("0")
     revenue = Decimal("0")
-    expenses = Decimal("0")
     miles = 0.0
     total_minutes = 0
     
     by_type = {t.value: Decimal("0") for t in EntryType}
     by_app = {a.value: Decimal("0") for a in AppType}
     
-    for entry in entries:
-        amount = Decimal(str(entry.amount))
+    order_count = 0
+    total_order_revenue = Decimal("0")
+    
+    for entry_type, app, count, amount, positive, distance, minutes in groups:
+        amount = Decimal(str(amount or 0))
         total_amount += amount
+        revenue += Decimal(str(positive or 0))
+        miles += distance or 0.0
+        total_minutes += minutes or 0
         
-        if amount > 0:
-            revenue += amount
-        else:
-            expenses += abs(amount)
-        
-        miles += entry.distance_miles
-        total_minutes += entry.duration_minutes
+        by_type[entry_type.value] += amount
+        by_app[app.value] += amount
         
-        by_type[entry.type.value] += amount
-        by_app[entry.app.value] += amount
+        if entry_type == EntryType.ORDER:
+            order_count += count or 0
+            total_order_revenue += amount
+    
+    expenses = revenue - total_amount
     
     hours = total_minutes / 60.0 if total_minutes > 0 else 0.0
     net_earnings = total_amount
@@ -50,48 +72,16 @@ def calculate_rollup(db: Session, from_date: Optional[datetime] = None, to_date:
     dollars_per_hour = net_earnings / Decimal(str(hours)) if hours > 0 else Decimal("0")
     
     # Calculate metrics for orders
-    order_entries = [e for e in entries if e.type.value == 'ORDER']
-    order_count = len(order_entries)
     average_order_value = Decimal("0")
     per_hour_first_to_last = Decimal("0")
     
     if order_count > 0:
-        total_order_revenue = Decimal("0")
-        for order in order_entries:
-            total_order_revenue += Decimal(str(order.amount))
         average_order_value = total_order_revenue / Decimal(str(order_count))
-        
-        # Calculate per-hour rate based on first and last order
-        order_timestamps = sorted([e.timestamp for e in order_entries])
-        first_timestamp = order_timestamps[0]
-        last_timestamp = order_timestamps[-1]
-        
-        hours_first_to_last = (last_timestamp - first_timestamp).total_seconds() / 3600.0
-        if hours_first_to_last > 0:
-            per_hour_first_to_last = profit / Decimal(str(hours_first_to_last))
-        elif order_count == 1:
-            per_hour_first_to_last = Decimal("0")
-    
-    # Get goal data if timeframe provided
-    goal_data = None
-    goal_progress = None
-    if timeframe:
-        try:
-            tf = TimeframeType[timeframe]
-            goal = db.query(Goal).filter(Goal.timeframe == tf).first()
-            if goal:
-                goal_data = {
-                    "id": goal.id,
-                    "timeframe": goal.timeframe.value,
-                    "target_profit": float(goal.target_profit),
-                    "created_at": goal.created_at.isoformat(),
-                    "updated_at": goal.updated_at.isoformat()
-                }
-                target = float(goal.target_profit)
-                if target > 0:
-                    goal_progress = min(100.0, (float(revenue) / target) * 100)
-        except (KeyError, ValueError):
-            pass
+    
+    # Per hour actually worked: the hours inside shifts, so the gaps between
+    # shifts (overnight, days off) do not dilute the rate over longer windows
+    if shift_hours > 0:
+        per_hour_first_to_last = profit / Decimal(str(shift_hours))
     
     return {
         "revenue": float(revenue),
@@ -104,7 +94,184 @@ def calculate_rollup(db: Session, from_date: Optional[datetime] = None, to_date:
         "average_order_value": float(round(average_order_value, 2)),
         "per_hour_first_to_last": float(round(per_hour_first_to_last, 2)),
         "by_type": {k: float(v) for k, v in by_type.items()},
-        "by_app": {k: float(v) for k, v in by_app.items()},
+        "by_app": {k: float(v) for k, v in by_app.items()}
+    }
+
+def _goal(reference, timeframe: Optional[str], profit: float):
+    """The goal for timeframe and the percent of it reached, if one is set"""
+    if not timeframe:
+        return None, None
+    try:
+        goal = reference.goals.get(TimeframeType[timeframe])
+    except KeyError:
+        return None, None
+    if not goal:
+        return None, None
+    
+    goal_data = {
+        "id": goal["id"],
+        "timeframe": goal["timeframe"].value,
+        "target_profit": float(goal["target_profit"]),
+        "created_at": goal["created_at"].isoformat(),
+        "updated_at": goal["updated_at"].isoformat()
+    }
+    target = float(goal["target_profit"])
+    goal_progress = min(100.0, (profit / target) * 100) if target > 0 else None
+    return goal_data, goal_progress
+
+def _period_dict(period: Optional[Period]) -> Optional[dict]:
+    if not period:
+        return None
+    return {
+        "timeframe": period.timeframe,
+        "tz": period.tz,
+        "start": period.start.replace(tzinfo=timezone.utc),
+        "end": period.end.replace(tzinfo=timezone.utc)
+    }
+
+def calculate_rollup(
+    db: Session,
+    from_date: Optional[datetime] = None,
+    to_date: Optional[datetime] = None,
+    timeframe: Optional[str] = None,
+    period: Optional[Period] = None
+):
+    """Aggregate entries between from_date and to_date inclusive, or within a
+    resolved period (half-open, and its timeframe picks the goal)"""
+    # One row per (type, app) with the sums in exact integer cents; every
+    # total below is folded from these few groups rather than from entries
+    query = db.query(Entry.type, Entry.app, *_group_sums())
+    
+    if period:
+        query = query.filter(Entry.timestamp >= period.start, Entry.timestamp < period.end)
+        timeframe = period.timeframe
+    if from_date:
+        query = query.filter(Entry.timestamp >= from_date)
+    if to_date:
+        query = query.filter(Entry.timestamp <= to_date)
+    
+    groups = query.group_by(Entry.type, Entry.app).all()
+    shift_hours = sum(shift["active_hours"] for shift in find_shifts(db, from_date, to_date, period))
+    
+    rollup = _summarize(groups, shift_hours)
+    goal_data, goal_progress = _goal(reference_cache.get(db), timeframe, rollup["profit"])
+    rollup.update({
         "goal": goal_data,
-        "goal_progress": goal_progress
+        "goal_progress": goal_progress,
+        "period": _period_dict(period)
+    })
+    return rollup
+
+def _hours_within(shifts: List[dict], window: Period) -> float:
+    """Shift hours that fall inside window, clipping shifts that cross its edges"""
+    hours = 0.0
+    for shift in shifts:
+        overlap = (min(shift["end"], window.end) - max(shift["start"], window.start)).total_seconds()
+        if overlap > 0:
+            hours += overlap / 3600
+    return hours
+
+def _delta(current: float, previous: float) -> dict:
+    return {
+        "absolute": round(current - previous, 2),
+        "percent": round((current - previous) / abs(previous) * 100, 1) if previous else None
+    }
+
+def _deltas(current: dict, previous: dict) -> dict:
+    deltas = {m: _delta(current[m], previous[m]) for m in COMPARED_METRICS}
+    for breakdown in ("by_type", "by_app"):
+        deltas[breakdown] = {k: _delta(v, previous[breakdown][k]) for k, v in current[breakdown].items()}
+    return deltas
+
+def calculate_rollup_comparison(
+    db: Session,
+    timeframe: str,
+    against: str = "previous",
+    tz: str = "UTC",
+    now: Optional[datetime] = None
+) -> dict:
+    """The rollup for timeframe against an earlier window, in one scan.
+
+    Besides the whole comparison window, the comparison is also cut off at
+    the same point into it as now is into the current period, so a partial
+    week is paced against the same partial week rather than a full one.
+    ValueError for an unknown timeframe, tz or against.
+    """
+    now = now or datetime.now(timezone.utc)
+    current = resolve_period(timeframe, tz, now)
+    comparison = comparison_period(current, against)
+    pacing = period_to_date(current, comparison, now)
+    windows = (current, comparison, pacing)
+    
+    # Conditional sums per window over the union range, grouped by (type, app)
+    start = min(w.start for w in windows)
+    end = max(w.end for w in windows)
+    groups = db.query(
+        Entry.type, Entry.app, *[column for w in windows for column in _group_sums(w)]
+    ).filter(
+        Entry.timestamp >= start, Entry.timestamp < end
+    ).group_by(Entry.type, Entry.app).all()
+    shifts = find_shifts(db, period=Period(current.timeframe, tz, start, end))
+    
+    rollups = []
+    for i, window in enumerate(windows):
+        window_groups = [(row[0], row[1], *row[2 + 5 * i:7 + 5 * i]) for row in groups]
+        rollup = _summarize(window_groups, _hours_within(shifts, window))
+        rollup.update({"goal": None, "goal_progress": None, "period": _period_dict(window)})
+        rollups.append(rollup)
+    current_rollup, comparison_rollup, pacing_rollup = rollups
+    
+    goal_data, goal_progress = _goal(reference_cache.get(db), timeframe, current_rollup["profit"])
+    current_rollup.update({"goal": goal_data, "goal_progress": goal_progress})
+    
+    return {
+        "against": against,
+        "current": current_rollup,
+        "comparison": comparison_rollup,
+        "comparison_to_date": pacing_rollup,
+        "deltas": _deltas(current_rollup, comparison_rollup),
+        "pacing_deltas": _deltas(current_rollup, pacing_rollup)
     }
+
+def calculate_goal_progress(db: Session, tz: str = "UTC", now: Optional[datetime] = None):
+    """Profit against every configured goal, summed for all goal periods in one query"""
+    goals = list(reference_cache.get(db).goals.values())
+    if not goals:
+        return []
+    
+    now = now or datetime.now(timezone.utc)
+    periods = [resolve_period(goal["timeframe"].value, tz, now) for goal in goals]
+    
+    # One conditional sum per goal, over the union of the goal windows
+    totals = db.query(*[
+        func.sum(case((and_(Entry.timestamp >= p.start, Entry.timestamp < p.end), Entry.amount), else_=0))
+        for p in periods
+    ]).filter(
+        Entry.timestamp >= min(p.start for p in periods),
+        Entry.timestamp < max(p.end for p in periods)
+    ).one()
+    
+    now_utc = now.astimezone(timezone.utc).replace(tzinfo=None)
+    progress = []
+    for goal, period, total in zip(goals, periods, totals):
+        profit = Decimal(str(total or 0))
+        target = Decimal(str(goal["target_profit"]))
+        
+        # Straight-line projection of the profit so far to the end of the period
+        length = (period.end - period.start).total_seconds()
+        elapsed = min(max((now_utc - period.start).total_seconds(), 0), length)
+        projected = profit * Decimal(length / elapsed) if elapsed > 0 else profit
+        
+        progress.append({
+            "goal_id": goal["id"],
+            "timeframe": goal["timeframe"].value,
+            "target_profit": float(target),
+            "profit": float(profit),
+            "percent": float(round(profit / target * 100, 1)) if target > 0 else None,
+            "remaining": float(max(target - profit, Decimal("0"))),
+            "projected_profit": float(round(projected, 2)),
+            "on_track": projected >= target,
+            "period_start": period.start.replace(tzinfo=timezone.utc),
+            "period_end": period.end.replace(tzinfo=timezone.utc)
+        })
+    return progress
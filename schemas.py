@@ -2,7 +2,7 @@ from pydantic import BaseModel, Field
 from datetime import datetime
 from decimal import Decimal
 from typing import Optional
-from backend.models import EntryType, AppType, ExpenseCategory, TimeframeType
+from backend.models import EntryType, AppType, ExpenseCategory, TimeframeType, PlatformIntegration
 
 class EntryCreate(BaseModel):
     timestamp: Optional[datetime] = None
@@ -72,6 +72,24 @@ class GoalResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class GoalProgressResponse(BaseModel):
+    goal_id: int
+    timeframe: TimeframeType
+    target_profit: float
+    profit: float
+    percent: Optional[float] = None
+    remaining: float
+    projected_profit: float
+    on_track: bool
+    period_start: datetime
+    period_end: datetime
+
+class PeriodResponse(BaseModel):
+    timeframe: TimeframeType
+    tz: str
+    start: datetime
+    end: datetime
+
 class RollupResponse(BaseModel):
     revenue: float
     expenses: float
@@ -86,3 +104,55 @@ class RollupResponse(BaseModel):
     by_app: dict[str, float]
     goal: Optional[GoalResponse] = None
     goal_progress: Optional[float] = None
+    period: Optional[PeriodResponse] = None
+
+class MetricDelta(BaseModel):
+    absolute: float
+    percent: Optional[float] = None
+
+class RollupDeltas(BaseModel):
+    revenue: MetricDelta
+    expenses: MetricDelta
+    profit: MetricDelta
+    miles: MetricDelta
+    hours: MetricDelta
+    dollars_per_mile: MetricDelta
+    dollars_per_hour: MetricDelta
+    average_order_value: MetricDelta
+    per_hour_first_to_last: MetricDelta
+    by_type: dict[str, MetricDelta]
+    by_app: dict[str, MetricDelta]
+
+class RollupComparisonResponse(BaseModel):
+    against: str
+    current: RollupResponse
+    comparison: RollupResponse
+    comparison_to_date: RollupResponse
+    deltas: RollupDeltas
+    pacing_deltas: RollupDeltas
+
+class SyncRunResponse(BaseModel):
+    id: int
+    platform: PlatformIntegration
+    full_resync: bool
+    window_start: datetime
+    window_end: datetime
+    started_at: datetime
+    finished_at: Optional[datetime]
+    status: str
+    fetched: int
+    new: int
+    duplicates: int
+    error: Optional[str]
+    
+    class Config:
+        from_attributes = True
+
+class SyncStateResponse(BaseModel):
+    platform: PlatformIntegration
+    watermark: Optional[datetime]
+    cursor: Optional[str]
+    last_synced_at: Optional[datetime]
+    
+    class Config:
+        from_attributes = True
@@ -3,6 +3,7 @@ from sqlalchemy.orm import Session
 from backend.db import get_db
 from backend.models import Settings
 from backend.schemas import SettingsResponse, SettingsUpdate
+from backend.services.reference_data import reference_cache
 from decimal import Decimal
 import os
 
@@ -10,13 +11,11 @@ router = APIRouter()
 
 @router.get("/settings", response_model=SettingsResponse)
 async def get_settings(db: Session = Depends(get_db)):
-    settings = db.query(Settings).first()
+    settings = reference_cache.get(db).settings
     if not settings:
         default_cost = Decimal(os.getenv("COST_PER_MILE_DEFAULT", "0"))
-        settings = Settings(id=1, cost_per_mile=default_cost)
-        db.add(settings)
-        db.commit()
-        db.refresh(settings)
+        db.add(Settings(id=1, cost_per_mile=default_cost))
+        settings = reference_cache.commit(db).settings
     return settings
 
 @router.put("/settings", response_model=SettingsResponse)
@@ -27,6 +26,4 @@ async def update_settings(settings_update: SettingsUpdate, db: Session = Depends
         db.add(settings)
     
     settings.cost_per_mile = settings_update.cost_per_mile
-    db.commit()
-    db.refresh(settings)
-    return settings
+    return reference_cache.commit(db).settings
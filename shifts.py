@@ -0,0 +1,41 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from backend.db import get_db
+from backend.services.period import resolve_period
+from backend.services.shifts_service import find_shifts, summarize_shifts, SHIFT_GAP
+from typing import Optional
+from datetime import datetime, timedelta, timezone
+
+router = APIRouter()
+
+@router.get("/shifts")
+async def get_shifts(
+    from_date: Optional[str] = None,
+    to_date: Optional[str] = None,
+    timeframe: Optional[str] = None,
+    tz: Optional[str] = None,
+    gap_minutes: int = Query(int(SHIFT_GAP.total_seconds() // 60), ge=1),
+    db: Session = Depends(get_db)
+):
+    """Orders grouped into shifts, split wherever the gap between them exceeds gap_minutes"""
+    period = None
+    from_dt = None
+    to_dt = None
+    
+    if timeframe:
+        try:
+            period = resolve_period(timeframe, tz or "UTC")
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    else:
+        if from_date:
+            from_dt = datetime.fromisoformat(from_date.replace('Z', '+00:00')).astimezone(timezone.utc).replace(tzinfo=None)
+        if to_date:
+            to_dt = datetime.fromisoformat(to_date.replace('Z', '+00:00')).astimezone(timezone.utc).replace(tzinfo=None)
+    
+    shifts = find_shifts(db, from_dt, to_dt, period, timedelta(minutes=gap_minutes))
+    return {
+        "gap_minutes": gap_minutes,
+        "shifts": shifts,
+        "totals": summarize_shifts(shifts)
+    }
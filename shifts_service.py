@@ -0,0 +1,98 @@
+from sqlalchemy import select, func, case
+from sqlalchemy.orm import Session
+from backend.models import Entry, EntryType
+from backend.services.period import Period
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import List, Optional
+
+# Orders more than this far apart (previous drop-off to next pickup) are
+# in different shifts
+SHIFT_GAP = timedelta(hours=2)
+
+UNIX_EPOCH_JULIAN_DAY = 2440587.5
+
+def _from_julian_day(day: float) -> datetime:
+    # julianday() is a float, so round to the nearest second rather than truncate
+    return datetime(1970, 1, 1) + timedelta(seconds=round((day - UNIX_EPOCH_JULIAN_DAY) * 86400))
+
+def find_shifts(
+    db: Session,
+    from_date: Optional[datetime] = None,
+    to_date: Optional[datetime] = None,
+    period: Optional[Period] = None,
+    gap: timedelta = SHIFT_GAP
+) -> List[dict]:
+    """Split orders into shifts at every gap longer than `gap`, in SQL.
+
+    Each order covers [timestamp - duration, timestamp]. LAG() finds the
+    previous order's drop-off, a running SUM() of the new-shift flags numbers
+    the shifts, and one GROUP BY aggregates them.
+    """
+    picked_up = func.julianday(Entry.timestamp) - func.coalesce(Entry.duration_minutes, 0) / 1440.0
+    dropped_off = func.julianday(Entry.timestamp)
+    previous_drop_off = func.lag(dropped_off).over(order_by=(Entry.timestamp, Entry.id))
+
+    orders = select(
+        Entry.id,
+        Entry.timestamp,
+        Entry.amount,
+        Entry.distance_miles,
+        picked_up.label("picked_up"),
+        dropped_off.label("dropped_off"),
+        case(
+            (previous_drop_off.is_(None), 1),
+            ((picked_up - previous_drop_off) * 86400 > gap.total_seconds(), 1),
+            else_=0
+        ).label("starts_shift")
+    ).where(Entry.type == EntryType.ORDER)
+
+    if period:
+        orders = orders.where(Entry.timestamp >= period.start, Entry.timestamp < period.end)
+    if from_date:
+        orders = orders.where(Entry.timestamp >= from_date)
+    if to_date:
+        orders = orders.where(Entry.timestamp <= to_date)
+
+    orders = orders.subquery()
+    numbered = select(
+        orders,
+        func.sum(orders.c.starts_shift).over(order_by=(orders.c.timestamp, orders.c.id)).label("shift")
+    ).subquery()
+
+    rows = db.execute(
+        select(
+            func.min(numbered.c.picked_up),
+            func.max(numbered.c.dropped_off),
+            func.count(numbered.c.id),
+            func.sum(numbered.c.amount),
+            func.sum(numbered.c.distance_miles)
+        ).group_by(numbered.c.shift).order_by(numbered.c.shift)
+    ).all()
+
+    shifts = []
+    for start_day, end_day, order_count, revenue, miles in rows:
+        active_hours = (end_day - start_day) * 24
+        miles = miles or 0.0
+        shifts.append({
+            "start": _from_julian_day(start_day),
+            "end": _from_julian_day(end_day),
+            "orders": order_count,
+            "revenue": float(revenue),
+            "miles": round(miles, 2),
+            "active_hours": round(active_hours, 2),
+            "dollars_per_hour": float(round(revenue / Decimal(str(active_hours)), 2)) if active_hours > 0 else None,
+            "dollars_per_mile": float(round(revenue / Decimal(str(miles)), 2)) if miles > 0 else None
+        })
+    return shifts
+
+def summarize_shifts(shifts: List[dict]) -> dict:
+    revenue = sum(Decimal(str(s["revenue"])) for s in shifts)
+    active_hours = sum(s["active_hours"] for s in shifts)
+    return {
+        "shifts": len(shifts),
+        "orders": sum(s["orders"] for s in shifts),
+        "revenue": float(revenue),
+        "active_hours": round(active_hours, 2),
+        "dollars_per_hour": float(round(revenue / Decimal(str(active_hours)), 2)) if active_hours > 0 else None
+    }
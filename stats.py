@@ -0,0 +1,53 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from backend.db import get_db
+from backend.services.distribution_service import get_distribution, DEFAULT_QUANTILES
+from backend.services.period import resolve_period
+from typing import Optional
+from datetime import datetime, timezone
+
+router = APIRouter()
+
+def _parse_quantiles(quantiles: Optional[str]):
+    if not quantiles:
+        return DEFAULT_QUANTILES
+    try:
+        parsed = tuple(float(q) for q in quantiles.split(","))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="quantiles must be comma-separated numbers")
+    if not all(0 <= q <= 1 for q in parsed):
+        raise HTTPException(status_code=400, detail="quantiles must be between 0 and 1")
+    return parsed
+
+@router.get("/stats/distribution")
+async def get_stats_distribution(
+    from_date: Optional[str] = None,
+    to_date: Optional[str] = None,
+    timeframe: Optional[str] = None,
+    tz: Optional[str] = None,
+    quantiles: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """Order value and $/hour quantiles per app from the per-day sketches.
+    
+    Values are within relative_accuracy of the exact percentiles. The range
+    is whole UTC days, from_day inclusive to to_day exclusive; a timeframe
+    in another tz covers the UTC days nearest its local start and end.
+    """
+    parsed = _parse_quantiles(quantiles)
+    period = None
+    from_dt = None
+    to_dt = None
+    
+    if timeframe:
+        try:
+            period = resolve_period(timeframe, tz or "UTC")
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    else:
+        if from_date:
+            from_dt = datetime.fromisoformat(from_date.replace('Z', '+00:00')).astimezone(timezone.utc).replace(tzinfo=None)
+        if to_date:
+            to_dt = datetime.fromisoformat(to_date.replace('Z', '+00:00')).astimezone(timezone.utc).replace(tzinfo=None)
+    
+    return get_distribution(db, from_dt, to_dt, period, parsed)
@@ -1,12 +1,19 @@
 from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from backend.db import get_db
-from backend.services.ai_suggestions import get_ai_suggestions
+from backend.services.ai_suggestions import get_ai_suggestions, stream_ai_suggestions
+from backend.services.coalescing import coalesced
 from typing import Optional
 from datetime import datetime, timezone
 
 router = APIRouter()
 
+def _parse_date(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    return datetime.fromisoformat(value.replace('Z', '+00:00')).astimezone(timezone.utc).replace(tzinfo=None)
+
 @router.get("/suggestions")
 async def get_suggestions(
     from_date: Optional[str] = None,
@@ -14,13 +21,18 @@ async def get_suggestions(
     db: Session = Depends(get_db)
 ):
     """Get AI-powered suggestions for earning optimization"""
-    from_dt = None
-    to_dt = None
-    
-    if from_date:
-        from_dt = datetime.fromisoformat(from_date.replace('Z', '+00:00')).astimezone(timezone.utc).replace(tzinfo=None)
-    if to_date:
-        to_dt = datetime.fromisoformat(to_date.replace('Z', '+00:00')).astimezone(timezone.utc).replace(tzinfo=None)
-    
-    suggestions = get_ai_suggestions(db, from_dt, to_dt)
+    suggestions = await coalesced("suggestions", db, get_ai_suggestions, _parse_date(from_date), _parse_date(to_date))
     return suggestions
+
+@router.get("/suggestions/stream")
+async def stream_suggestions(
+    from_date: Optional[str] = None,
+    to_date: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """Stream suggestions as server-sent events: stats, token..., done"""
+    return StreamingResponse(
+        stream_ai_suggestions(db, _parse_date(from_date), _parse_date(to_date)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,49 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from backend.db import get_db
+from backend.models import SyncState, SyncRun, SyncedOrder, PlatformIntegration
+from backend.schemas import SyncRunResponse, SyncStateResponse
+from backend.services.sync_service import sync_all_platforms
+from backend.services.payload_store import load_synced_order_payload, payload_report
+from typing import List, Optional
+
+router = APIRouter()
+
+@router.get("/sync/status", response_model=List[SyncStateResponse])
+async def get_sync_status(db: Session = Depends(get_db)):
+    """Get the sync watermark for each connected platform"""
+    return db.query(SyncState).order_by(SyncState.platform).all()
+
+@router.get("/sync/runs", response_model=List[SyncRunResponse])
+async def get_sync_runs(limit: int = 20, db: Session = Depends(get_db)):
+    """Get recent sync runs with fetched/new/duplicate counts"""
+    return db.query(SyncRun).order_by(SyncRun.id.desc()).limit(limit).all()
+
+@router.post("/sync/resync", response_model=List[SyncRunResponse])
+async def full_resync(platform: Optional[str] = None, db: Session = Depends(get_db)):
+    """Re-pull the full lookback window, ignoring watermarks"""
+    platform_enum = None
+    if platform:
+        try:
+            platform_enum = PlatformIntegration[platform.upper()]
+        except KeyError:
+            raise HTTPException(status_code=400, detail="Invalid platform")
+    
+    return await sync_all_platforms(db, full_resync=True, platform=platform_enum)
+
+@router.get("/sync/orders/{synced_order_id}/raw")
+async def get_synced_order_raw(synced_order_id: int, db: Session = Depends(get_db)):
+    """Get the raw platform payload of a synced order"""
+    synced_order = db.query(SyncedOrder).filter(SyncedOrder.id == synced_order_id).first()
+    if not synced_order:
+        raise HTTPException(status_code=404, detail="Synced order not found")
+    
+    payload = load_synced_order_payload(db, synced_order)
+    if payload is None:
+        raise HTTPException(status_code=404, detail="No payload stored for this order")
+    return payload
+
+@router.get("/sync/payloads/report")
+async def get_payload_report(db: Session = Depends(get_db)):
+    """Get raw vs compressed size of stored platform payloads"""
+    return payload_report(db)
@@ -1,193 +1,413 @@
+import abc
+import asyncio
 import httpx
 import json
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from decimal import Decimal
+from sqlalchemy import select, insert, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
-from backend.models import Entry, EntryType, AppType, SyncedOrder, PlatformIntegration, ApiCredential
+from backend.models import Entry, EntryType, AppType, SyncedOrder, PlatformIntegration, ApiCredential, SyncState, SyncRun
+from backend.services.resilience import request_with_retries
+from backend.services.credential_manager import credential_manager
+from backend.services.payload_store import store_payloads
+from backend.services.dedup_service import match_manual_entries
+from backend.services.period import as_naive_utc
+from backend.services.reference_data import entries_version
+from typing import Dict, NamedTuple, Optional
+import logging
 import os
 
-class UberSyncService:
+logger = logging.getLogger(__name__)
+
+# Orders requested per page from the platform APIs
+PAGE_SIZE = 100
+# Pages fetched ahead of the one being persisted
+PREFETCH_PAGES = 1
+REQUEST_TIMEOUT = httpx.Timeout(30.0, connect=10.0)
+# Window used the first time a credential is synced
+INITIAL_LOOKBACK = timedelta(days=7)
+# Window used by an explicit full resync
+FULL_RESYNC_LOOKBACK = timedelta(days=90)
+# Incremental runs re-read this much before the watermark to catch late orders
+SYNC_OVERLAP = timedelta(hours=1)
+
+
+class OrderPage(NamedTuple):
+    orders: list
+    # Platform cursor for the page after this one, None on the last page
+    next_cursor: Optional[str]
+
+
+class PlatformSyncService(abc.ABC):
+    """Shared persistence for platform sync services.
+    
+    Subclasses set PLATFORM and implement map_order() to turn a platform
+    payload into Entry column values.
+    """
+    PLATFORM: PlatformIntegration
+    
+    @abc.abstractmethod
+    def map_order(self, order: dict) -> dict:
+        """Turn a platform order payload into Entry column values"""
+    
+    async def sync_orders(self, db: Session, orders: list):
+        """Convert platform orders to Entry records, returning the new entry ids"""
+        persist = asyncio.ensure_future(asyncio.to_thread(self._persist_orders, db, orders))
+        try:
+            return await asyncio.shield(persist)
+        except asyncio.CancelledError:
+            # The thread can't be interrupted and is still using db; let it
+            # finish before the caller's cleanup closes the session
+            await asyncio.wait({persist})
+            raise
+    
+    def _persist_orders(self, db: Session, orders: list):
+        # Collapse repeats within the page, keeping the last payload seen
+        by_order_id = {}
+        for order in orders:
+            order_id = order.get("order_id")
+            if order_id:
+                by_order_id[str(order_id)] = order
+        
+        if not by_order_id:
+            # Still commit: the caller's page checkpoint rides on this transaction
+            db.commit()
+            return []
+        
+        # One IN (...) lookup per page instead of one SELECT per order
+        existing = set(db.execute(
+            select(SyncedOrder.platform_order_id).where(
+                SyncedOrder.platform == self.PLATFORM,
+                SyncedOrder.platform_order_id.in_(list(by_order_id))
+            )
+        ).scalars())
+        
+        pending = {k: v for k, v in by_order_id.items() if k not in existing}
+        if not pending:
+            db.commit()
+            return []
+        
+        # Claim the orders first; the unique (platform, platform_order_id)
+        # index makes a concurrent writer's rows fall through DO NOTHING
+        now = datetime.utcnow()
+        claim = sqlite_insert(SyncedOrder).on_conflict_do_nothing(
+            index_elements=["platform", "platform_order_id"]
+        ).returning(SyncedOrder.id, SyncedOrder.platform_order_id)
+        payload_hashes = store_payloads(db, self.PLATFORM, list(pending.values()))
+        claimed = db.execute(claim, [
+            {
+                "platform": self.PLATFORM,
+                "platform_order_id": order_id,
+                "sync_status": "pending",
+                "payload_hash": payload_hash
+            }
+            for order_id, payload_hash in zip(pending, payload_hashes)
+        ]).all()
+        
+        if not claimed:
+            db.commit()
+            return []
+        
+        # Orders the driver already logged by hand are linked to that entry
+        # instead of being inserted a second time
+        mapped = [self.map_order(pending[order_id]) for _, order_id in claimed]
+        for values in mapped:
+            # Platforms may send offsets; entries are stored in naive UTC
+            values["timestamp"] = as_naive_utc(values["timestamp"])
+        manual = match_manual_entries(db, mapped)
+        merged = {claimed[i][1]: entry_id for i, entry_id in manual.items()}
+        new_orders = [values for i, values in enumerate(mapped) if i not in manual]
+        
+        # RETURNING rows are matched back by order_id, which is unique within
+        # the page, so the insert stays batched without ordering guarantees
+        entry_ids = {}
+        if new_orders:
+            inserted = db.execute(insert(Entry).returning(Entry.id, Entry.order_id), new_orders)
+            entry_ids = {order_id: entry_id for entry_id, order_id in inserted}
+            entries_version.bump(db)
+        
+        db.execute(update(SyncedOrder), [
+            {
+                "id": synced_id,
+                "entry_id": merged.get(order_id) or entry_ids[order_id],
+                "sync_status": "merged" if order_id in merged else "completed",
+                "synced_at": now
+            }
+            for synced_id, order_id in claimed
+        ])
+        
+        db.commit()
+        return list(entry_ids.values())
+
+
+class UberSyncService(PlatformSyncService):
     """Service to sync orders from Uber Eats API"""
+    PLATFORM = PlatformIntegration.UBER
     BASE_URL = "https://api.uber.com/v1"
     
-    def __init__(self, access_token: str):
+    def __init__(self, access_token: str, transport: Optional[httpx.AsyncBaseTransport] = None):
         self.access_token = access_token
+        self.transport = transport
         self.headers = {
             "Authorization": f"Bearer {access_token}",
             "Content-Type": "application/json"
         }
     
+    async def iter_order_pages(self, start_date: datetime, end_date: datetime, cursor: Optional[str] = None):
+        """Yield pages of orders from Uber API, following next_page_token"""
+        async with httpx.AsyncClient(transport=self.transport, timeout=REQUEST_TIMEOUT) as client:
+            # Uber API endpoint for deliveries
+            endpoint = f"{self.BASE_URL}/marketplace/orders"
+            params = {
+                # Naive datetimes here are UTC; .timestamp() alone would read them as local time
+                "start_time": int(start_date.replace(tzinfo=timezone.utc).timestamp()),
+                "end_time": int(end_date.replace(tzinfo=timezone.utc).timestamp()),
+                "limit": PAGE_SIZE,
+                "status": "completed"
+            }
+            if cursor:
+                params["page_token"] = cursor
+            
+            while True:
+                response = await request_with_retries(
+                    client, "GET", endpoint, self.PLATFORM, headers=self.headers, params=params
+                )
+                
+                data = response.json()
+                next_token = data.get("next_page_token")
+                orders = data.get("orders", [])
+                if orders:
+                    yield OrderPage(orders, next_token)
+                
+                if not next_token:
+                    return
+                params["page_token"] = next_token
+    
     async def fetch_orders(self, start_date: datetime, end_date: datetime):
-        """Fetch orders from Uber API"""
+        """Fetch all orders from Uber API"""
+        orders = []
         try:
-            async with httpx.AsyncClient() as client:
-                # Uber API endpoint for deliveries
-                endpoint = f"{self.BASE_URL}/marketplace/orders"
-                params = {
-                    "start_time": int(start_date.timestamp()),
-                    "end_time": int(end_date.timestamp()),
-                    "limit": 100,
-                    "status": "completed"
-                }
-                
-                response = await client.get(endpoint, headers=self.headers, params=params)
-                if response.status_code == 200:
-                    return response.json().get("orders", [])
-                return []
-        except Exception as e:
-            print(f"Error fetching Uber orders: {e}")
-            return []
+            async for page in self.iter_order_pages(start_date, end_date):
+                orders.extend(page.orders)
+        except Exception:
+            logger.exception("Error fetching Uber orders")
+        return orders
     
-    async def sync_orders(self, db: Session, orders: list):
-        """Convert Uber orders to Entry records"""
-        created_entries = []
-        
-        for order in orders:
-            order_id = order.get("order_id")
-            
-            # Check if already synced
-            existing = db.query(SyncedOrder).filter(
-                SyncedOrder.platform == PlatformIntegration.UBER,
-                SyncedOrder.platform_order_id == order_id
-            ).first()
-            
-            if existing:
-                continue
-            
-            # Create entry from Uber order
-            amount = Decimal(str(order.get("fare", {}).get("total_amount", 0)))
-            distance_miles = order.get("trip_distance", 0)
-            timestamp = datetime.fromtimestamp(order.get("completed_at", 0))
-            
-            entry = Entry(
-                timestamp=timestamp,
-                type=EntryType.ORDER,
-                app=AppType.UBEREATS,
-                order_id=order_id,
-                amount=amount,
-                distance_miles=distance_miles,
-                duration_minutes=int(order.get("trip_duration", 0) / 60)
-            )
-            
-            db.add(entry)
-            db.flush()
-            
-            # Track synced order
-            synced_order = SyncedOrder(
-                platform=PlatformIntegration.UBER,
-                platform_order_id=order_id,
-                entry_id=entry.id,
-                sync_status="completed",
-                synced_at=datetime.utcnow(),
-                raw_data=json.dumps(order)
-            )
-            db.add(synced_order)
-            created_entries.append(entry)
-        
-        db.commit()
-        return created_entries
+    def map_order(self, order: dict) -> dict:
+        """Map an Uber order payload to Entry column values"""
+        return {
+            "timestamp": datetime.fromtimestamp(order.get("completed_at", 0), timezone.utc).replace(tzinfo=None),
+            "type": EntryType.ORDER,
+            "app": AppType.UBEREATS,
+            "order_id": order.get("order_id"),
+            "amount": Decimal(str(order.get("fare", {}).get("total_amount", 0))),
+            "distance_miles": order.get("trip_distance", 0),
+            "duration_minutes": int(order.get("trip_duration", 0) / 60)
+        }
 
 
-class ShiptSyncService:
+class ShiptSyncService(PlatformSyncService):
     """Service to sync orders from Shipt API"""
+    PLATFORM = PlatformIntegration.SHIPT
     BASE_URL = "https://shipt.com/api/v1"
     
-    def __init__(self, access_token: str):
+    def __init__(self, access_token: str, transport: Optional[httpx.AsyncBaseTransport] = None):
         self.access_token = access_token
+        self.transport = transport
         self.headers = {
             "Authorization": f"Bearer {access_token}",
             "Content-Type": "application/json"
         }
     
+    async def iter_order_pages(self, start_date: datetime, end_date: datetime, cursor: Optional[str] = None):
+        """Yield pages of orders from Shipt API, following the next link"""
+        async with httpx.AsyncClient(transport=self.transport, timeout=REQUEST_TIMEOUT) as client:
+            endpoint = f"{self.BASE_URL}/orders"
+            params = {
+                "start_date": start_date.isoformat(),
+                "end_date": end_date.isoformat(),
+                "status": "completed",
+                "page_size": PAGE_SIZE
+            }
+            # The next link already carries the query string
+            if cursor:
+                endpoint, params = cursor, None
+            
+            while endpoint:
+                response = await request_with_retries(
+                    client, "GET", endpoint, self.PLATFORM, headers=self.headers, params=params
+                )
+                
+                data = response.json()
+                next_link = data.get("next")
+                orders = data.get("results", [])
+                if orders:
+                    yield OrderPage(orders, next_link)
+                
+                endpoint, params = next_link, None
+    
     async def fetch_orders(self, start_date: datetime, end_date: datetime):
-        """Fetch orders from Shipt API"""
+        """Fetch all orders from Shipt API"""
+        orders = []
         try:
-            async with httpx.AsyncClient() as client:
-                endpoint = f"{self.BASE_URL}/orders"
-                params = {
-                    "start_date": start_date.isoformat(),
-                    "end_date": end_date.isoformat(),
-                    "status": "completed"
-                }
-                
-                response = await client.get(endpoint, headers=self.headers, params=params)
-                if response.status_code == 200:
-                    return response.json().get("results", [])
-                return []
+            async for page in self.iter_order_pages(start_date, end_date):
+                orders.extend(page.orders)
+        except Exception:
+            logger.exception("Error fetching Shipt orders")
+        return orders
+    
+    def map_order(self, order: dict) -> dict:
+        """Map a Shipt order payload to Entry column values"""
+        return {
+            "timestamp": datetime.fromisoformat(order.get("completed_at")),
+            "type": EntryType.ORDER,
+            "app": AppType.SHIPT,
+            "order_id": order.get("order_id"),
+            "amount": Decimal(str(order.get("payout", 0))),
+            "distance_miles": order.get("estimated_mileage", 0),
+            "duration_minutes": int(order.get("estimated_time", 0))
+        }
+
+
+_END_OF_PAGES = object()
+
+async def prefetch_pages(pages, depth: int = PREFETCH_PAGES):
+    """Re-yield pages from an async iterator while up to `depth` more are fetched in the background"""
+    queue = asyncio.Queue(maxsize=depth)
+    
+    async def produce():
+        try:
+            async for page in pages:
+                await queue.put(page)
+            await queue.put(_END_OF_PAGES)
         except Exception as e:
-            print(f"Error fetching Shipt orders: {e}")
-            return []
+            await queue.put(e)
     
-    async def sync_orders(self, db: Session, orders: list):
-        """Convert Shipt orders to Entry records"""
-        created_entries = []
-        
-        for order in orders:
-            order_id = order.get("order_id")
-            
-            # Check if already synced
-            existing = db.query(SyncedOrder).filter(
-                SyncedOrder.platform == PlatformIntegration.SHIPT,
-                SyncedOrder.platform_order_id == order_id
-            ).first()
-            
-            if existing:
-                continue
-            
-            # Create entry from Shipt order
-            amount = Decimal(str(order.get("payout", 0)))
-            distance_miles = order.get("estimated_mileage", 0)
-            timestamp = datetime.fromisoformat(order.get("completed_at"))
-            
-            entry = Entry(
-                timestamp=timestamp,
-                type=EntryType.ORDER,
-                app=AppType.SHIPT,
-                order_id=order_id,
-                amount=amount,
-                distance_miles=distance_miles,
-                duration_minutes=int(order.get("estimated_time", 0))
-            )
-            
-            db.add(entry)
-            db.flush()
+    producer = asyncio.create_task(produce())
+    try:
+        while True:
+            item = await queue.get()
+            if item is _END_OF_PAGES:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        producer.cancel()
+
+
+def _service_for(cred: ApiCredential, access_token: str, transport: Optional[httpx.AsyncBaseTransport] = None):
+    if cred.platform == PlatformIntegration.UBER:
+        return UberSyncService(access_token, transport)
+    if cred.platform == PlatformIntegration.SHIPT:
+        return ShiptSyncService(access_token, transport)
+    return None
+
+
+async def sync_credential(
+    db: Session,
+    cred: ApiCredential,
+    full_resync: bool = False,
+    transport: Optional[httpx.AsyncBaseTransport] = None
+) -> Optional[SyncRun]:
+    """Sync one platform from its watermark, recording the run"""
+    if cred.platform not in (PlatformIntegration.UBER, PlatformIntegration.SHIPT):
+        return None
+    
+    state = db.query(SyncState).filter(SyncState.credential_id == cred.id).first()
+    if not state:
+        state = SyncState(credential_id=cred.id, platform=cred.platform)
+        db.add(state)
+    
+    now = datetime.utcnow()
+    cursor = None
+    if full_resync:
+        start_date, end_date = now - FULL_RESYNC_LOOKBACK, now
+    elif state.cursor and state.window_start and state.window_end:
+        # Resume the unfinished run mid-pagination; its cursor is only valid for its window
+        start_date, end_date, cursor = state.window_start, state.window_end, state.cursor
+    elif state.watermark:
+        start_date, end_date = state.watermark - SYNC_OVERLAP, now
+    else:
+        start_date, end_date = now - INITIAL_LOOKBACK, now
+    state.window_start = start_date
+    state.window_end = end_date
+    
+    run = SyncRun(
+        credential_id=cred.id,
+        platform=cred.platform,
+        full_resync=1 if full_resync else 0,
+        window_start=start_date,
+        window_end=end_date,
+        started_at=now,
+        status="running"
+    )
+    db.add(run)
+    db.commit()
+    
+    watermark = state.watermark
+    fetched = 0
+    new = 0
+    try:
+        service = _service_for(cred, await credential_manager.get_token(cred.platform), transport)
+        # Persist each page while the next one is being fetched
+        async for page in prefetch_pages(service.iter_order_pages(start_date, end_date, cursor)):
+            # Committed together with the page's rows
+            state.cursor = page.next_cursor
+            entry_ids = await service.sync_orders(db, page.orders)
             
-            # Track synced order
-            synced_order = SyncedOrder(
-                platform=PlatformIntegration.SHIPT,
-                platform_order_id=order_id,
-                entry_id=entry.id,
-                sync_status="completed",
-                synced_at=datetime.utcnow(),
-                raw_data=json.dumps(order)
-            )
-            db.add(synced_order)
-            created_entries.append(entry)
+            fetched += len(page.orders)
+            new += len(entry_ids)
+            for order in page.orders:
+                completed_at = as_naive_utc(service.map_order(order)["timestamp"])
+                if watermark is None or completed_at > watermark:
+                    watermark = completed_at
         
-        db.commit()
-        return created_entries
+        # Only advance the watermark once the whole window is in
+        state.watermark = watermark
+        state.cursor = None
+        state.window_start = None
+        state.window_end = None
+        state.last_synced_at = datetime.utcnow()
+        run.status = "completed"
+    except Exception as e:
+        db.rollback()
+        if isinstance(e, httpx.HTTPStatusError) and e.response.status_code == 401:
+            # Revoked or rotated elsewhere; reload from the database next time
+            credential_manager.invalidate(cred.platform)
+        run.status = "failed"
+        run.error = str(e)
+        logger.error("Error syncing %s: %s", cred.platform.value, e)
+    
+    run.fetched = fetched
+    run.new = new
+    run.duplicates = fetched - new
+    run.finished_at = datetime.utcnow()
+    db.commit()
+    return run
 
 
-async def sync_all_platforms(db: Session):
-    """Sync orders from all configured platforms"""
-    # Get all active credentials
-    credentials = db.query(ApiCredential).filter(
-        ApiCredential.is_active == 1
-    ).all()
+async def sync_all_platforms(
+    db: Session,
+    full_resync: bool = False,
+    platform: Optional[PlatformIntegration] = None,
+    transports: Optional[Dict[PlatformIntegration, httpx.AsyncBaseTransport]] = None
+):
+    """Sync orders from all configured platforms.
     
-    # Last 7 days
-    start_date = datetime.utcnow() - timedelta(days=7)
-    end_date = datetime.utcnow()
+    transports optionally routes a platform's requests somewhere other
+    than the network, e.g. the mock platform servers.
+    """
+    # Get all active credentials
+    query = db.query(ApiCredential).filter(ApiCredential.is_active == 1)
+    if platform:
+        query = query.filter(ApiCredential.platform == platform)
     
-    for cred in credentials:
-        try:
-            if cred.platform == PlatformIntegration.UBER:
-                service = UberSyncService(cred.access_token)
-                orders = await service.fetch_orders(start_date, end_date)
-                await service.sync_orders(db, orders)
-            elif cred.platform == PlatformIntegration.SHIPT:
-                service = ShiptSyncService(cred.access_token)
-                orders = await service.fetch_orders(start_date, end_date)
-                await service.sync_orders(db, orders)
-        except Exception as e:
-            print(f"Error syncing {cred.platform}: {e}")
+    runs = []
+    for cred in query.all():
+        transport = (transports or {}).get(cred.platform)
+        run = await sync_credential(db, cred, full_resync=full_resync, transport=transport)
+        if run:
+            runs.append(run)
+    return runs
@@ -0,0 +1,241 @@
+import asyncio
+import json
+import os
+import threading
+os.environ.setdefault("AI_INTEGRATIONS_OPENAI_API_KEY", "test-key")
+
+import pytest
+from types import SimpleNamespace
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from backend.db import Base
+from backend.models import Entry, EntryType, AppType, SuggestionCache
+from backend.services import ai_suggestions
+from backend.services.ai_suggestions import build_suggestion_stats, get_ai_suggestions, get_cached_suggestion, store_suggestion, stream_ai_suggestions
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+@pytest.fixture
+def db_session(monkeypatch):
+    test_engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=test_engine)
+    TestSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
+    session = TestSessionLocal()
+    yield session
+    session.close()
+    Base.metadata.drop_all(bind=test_engine)
+
+@pytest.fixture
+def completions(monkeypatch):
+    calls = []
+    
+    async def fake_complete(context):
+        calls.append(context)
+        return f"tip {len(calls)}"
+    
+    monkeypatch.setattr(ai_suggestions, "_complete", fake_complete)
+    return calls
+
+def add_order(db_session, amount, hour=12, type=EntryType.ORDER):
+    db_session.add(Entry(
+        timestamp=datetime(2025, 1, 6, hour, 0),
+        type=type,
+        app=AppType.DOORDASH,
+        amount=Decimal(amount),
+        distance_miles=3.0,
+        duration_minutes=20
+    ))
+    db_session.commit()
+
+def test_stats_aggregate_orders_expenses_and_peak_hour(db_session):
+    add_order(db_session, "10.00", hour=9)
+    add_order(db_session, "20.00", hour=9)
+    add_order(db_session, "40.00", hour=18)
+    add_order(db_session, "5.00", hour=18, type=EntryType.BONUS)
+    add_order(db_session, "-7.50", hour=20, type=EntryType.EXPENSE)
+    
+    stats = build_suggestion_stats(db_session)
+    
+    assert stats["entry_count"] == 5
+    assert stats["order_count"] == 3
+    assert stats["avg_order"] == pytest.approx(70 / 3)
+    assert stats["peak_hour"] == 18
+    assert "Minimum order seen: $10.00" in stats["context"]
+    assert "Maximum order seen: $40.00" in stats["context"]
+    assert "Total expenses: $7.50" in stats["context"]
+    assert build_suggestion_stats(db_session, from_date=datetime(2025, 1, 7)) is None
+
+@pytest.mark.asyncio
+async def test_unchanged_data_reuses_cached_completion(db_session, completions):
+    add_order(db_session, "12.00")
+    
+    first = await get_ai_suggestions(db_session)
+    second = await get_ai_suggestions(db_session)
+    
+    assert first["cache_status"] == "miss"
+    assert second["cache_status"] == "hit"
+    assert second["suggestion"] == first["suggestion"]
+    assert len(completions) == 1
+
+@pytest.mark.asyncio
+async def test_changed_data_triggers_new_completion(db_session, completions):
+    add_order(db_session, "12.00")
+    await get_ai_suggestions(db_session)
+    add_order(db_session, "30.00", hour=18)
+    
+    result = await get_ai_suggestions(db_session)
+    
+    assert result["cache_status"] == "miss"
+    assert len(completions) == 2
+
+@pytest.mark.asyncio
+async def test_failed_completion_falls_back_uncached(db_session, monkeypatch):
+    async def failing_complete(context):
+        raise RuntimeError("model unavailable")
+    
+    monkeypatch.setattr(ai_suggestions, "_complete", failing_complete)
+    add_order(db_session, "12.00")
+    
+    result = await get_ai_suggestions(db_session)
+    
+    assert result["cache_status"] == "fallback"
+    assert db_session.query(SuggestionCache).count() == 0
+
+@pytest.mark.asyncio
+async def test_database_work_runs_off_the_event_loop(db_session, completions, monkeypatch):
+    threads = []
+    original = ai_suggestions.build_suggestion_stats
+    
+    def recording_stats(*args):
+        threads.append(threading.get_ident())
+        return original(*args)
+    
+    monkeypatch.setattr(ai_suggestions, "build_suggestion_stats", recording_stats)
+    add_order(db_session, "12.00")
+    await get_ai_suggestions(db_session)
+    
+    assert threads and threading.get_ident() not in threads
+
+@pytest.mark.asyncio
+async def test_slow_completion_falls_back_then_caches(db_session, monkeypatch):
+    finish = asyncio.Event()
+    
+    async def slow_complete(context):
+        await finish.wait()
+        return "late tip"
+    
+    monkeypatch.setattr(ai_suggestions, "_complete", slow_complete)
+    monkeypatch.setattr(ai_suggestions, "COMPLETION_TIMEOUT_SECONDS", 0.01)
+    add_order(db_session, "12.00")
+    
+    result = await get_ai_suggestions(db_session)
+    assert result["cache_status"] == "fallback"
+    assert result["peak_time"] == "12:00 - 13:00"
+    
+    # The completion carries on in the background and fills the cache,
+    # through a session on the request's engine
+    finish.set()
+    for _ in range(50):
+        if db_session.query(SuggestionCache).count():
+            break
+        await asyncio.sleep(0.01)
+    result = await get_ai_suggestions(db_session)
+    assert result["cache_status"] == "hit"
+    assert result["suggestion"] == "late tip"
+
+class FakeStream:
+    def __init__(self, tokens, delay=0):
+        self.tokens = tokens
+        self.delay = delay
+        self.closed = False
+    
+    async def __aiter__(self):
+        for token in self.tokens:
+            await asyncio.sleep(self.delay)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=token))])
+    
+    async def close(self):
+        self.closed = True
+
+def fake_client(monkeypatch, stream):
+    async def create(**kwargs):
+        assert kwargs["stream"] is True
+        return stream
+    
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    monkeypatch.setattr(ai_suggestions, "client", client)
+
+async def collect_events(db_session):
+    events = []
+    async for message in stream_ai_suggestions(db_session):
+        event, data = message.strip().split("\n")
+        events.append((event.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+    return events
+
+@pytest.mark.asyncio
+async def test_stream_sends_stats_tokens_and_caches(db_session, monkeypatch):
+    stream = FakeStream(["Work ", "lunch."])
+    fake_client(monkeypatch, stream)
+    add_order(db_session, "12.00")
+    
+    events = await collect_events(db_session)
+    
+    assert [e for e, _ in events] == ["stats", "token", "token", "done"]
+    assert events[0][1]["total_orders"] == 1
+    assert events[-1][1] == {"cache_status": "miss"}
+    assert stream.closed
+    
+    events = await collect_events(db_session)
+    assert events[1] == ("token", {"text": "Work lunch."})
+    assert events[-1][1] == {"cache_status": "hit"}
+
+@pytest.mark.asyncio
+async def test_stream_falls_back_when_first_token_is_slow(db_session, monkeypatch):
+    fake_client(monkeypatch, FakeStream(["too late"], delay=1))
+    monkeypatch.setattr(ai_suggestions, "FIRST_TOKEN_TIMEOUT_SECONDS", 0.01)
+    add_order(db_session, "12.00")
+    
+    events = await collect_events(db_session)
+    
+    assert events[1][1]["text"].startswith("Keep working during peak hours")
+    assert events[-1][1] == {"cache_status": "fallback"}
+    assert db_session.query(SuggestionCache).count() == 0
+
+def test_cache_evicts_expired_and_least_recently_used(db_session, monkeypatch):
+    monkeypatch.setattr(ai_suggestions, "CACHE_MAX_ENTRIES", 2)
+    db_session.add(SuggestionCache(
+        fingerprint="expired",
+        suggestion="old",
+        expires_at=datetime.utcnow() - timedelta(minutes=1)
+    ))
+    db_session.commit()
+    
+    for fingerprint in ["a", "b", "c"]:
+        store_suggestion(db_session, fingerprint, fingerprint)
+    
+    remaining = {c.fingerprint for c in db_session.query(SuggestionCache).all()}
+    assert remaining == {"b", "c"}
+
+def test_cache_hit_only_writes_once_the_last_use_is_stale(db_session):
+    store_suggestion(db_session, "a", "tip")
+    writes = []
+    
+    @event.listens_for(db_session, "after_commit")
+    def count(session):
+        writes.append(1)
+    
+    assert get_cached_suggestion(db_session, "a") == "tip"
+    assert writes == []
+    
+    cached = db_session.get(SuggestionCache, "a")
+    cached.last_used_at = datetime.utcnow() - ai_suggestions.CACHE_TOUCH_INTERVAL
+    db_session.flush()
+    assert get_cached_suggestion(db_session, "a") == "tip"
+    assert writes == [1]
+    assert cached.hits == 1
+    assert cached.last_used_at > datetime.utcnow() - timedelta(minutes=1)
@@ -0,0 +1,57 @@
+import asyncio
+import pytest
+from datetime import timedelta
+from backend.services.background_jobs import JobScheduler
+
+@pytest.mark.asyncio
+async def test_scheduled_job_records_success():
+    calls = []
+    
+    async def job():
+        calls.append(1)
+    
+    scheduler = JobScheduler()
+    scheduler.add_job(job, timedelta(milliseconds=20), id="tick", name="Tick")
+    scheduler.start()
+    await asyncio.sleep(0.1)
+    await scheduler.shutdown()
+    
+    status = scheduler.jobs["tick"].status()
+    assert len(calls) >= 2
+    assert status["run_count"] == len(calls)
+    assert status["last_success_at"] is not None
+    assert status["last_lag_seconds"] >= 0
+    assert status["running"] is False
+
+@pytest.mark.asyncio
+async def test_failed_job_records_error():
+    async def job():
+        raise RuntimeError("platform down")
+    
+    scheduler = JobScheduler()
+    scheduler.add_job(job, timedelta(hours=1), id="sync", name="Sync")
+    assert scheduler.trigger("sync")
+    await asyncio.sleep(0.01)
+    
+    status = scheduler.jobs["sync"].status()
+    assert status["failure_count"] == 1
+    assert status["last_error"] == "platform down"
+    assert status["last_success_at"] is None
+
+@pytest.mark.asyncio
+async def test_trigger_prevents_overlap():
+    release = asyncio.Event()
+    
+    async def job():
+        await release.wait()
+    
+    scheduler = JobScheduler()
+    scheduler.add_job(job, timedelta(hours=1), id="slow", name="Slow")
+    assert scheduler.trigger("slow")
+    assert not scheduler.trigger("slow")
+    
+    release.set()
+    await asyncio.sleep(0.01)
+    assert scheduler.jobs["slow"].run_count == 1
+    assert scheduler.trigger("slow")
+    await scheduler.shutdown()
@@ -0,0 +1,126 @@
+import asyncio
+import threading
+import pytest
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from backend.db import Base, get_db
+from backend.models import Entry, EntryType, AppType, SuggestionCache
+from backend.routers import rollup
+from backend.services import coalescing
+from backend.services.coalescing import SingleFlight, coalesced, data_version
+from datetime import datetime
+from decimal import Decimal
+
+@pytest.fixture
+def session_factory():
+    test_engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=test_engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
+    Base.metadata.drop_all(bind=test_engine)
+
+@pytest.fixture
+def single_flight(monkeypatch):
+    flight = SingleFlight()
+    monkeypatch.setattr(coalescing, "single_flight", flight)
+    return flight
+
+def order(amount="10.00"):
+    return Entry(
+        timestamp=datetime(2025, 1, 6, 12, 0),
+        type=EntryType.ORDER,
+        app=AppType.DOORDASH,
+        amount=Decimal(amount),
+        distance_miles=1.0,
+        duration_minutes=10
+    )
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_requests_share_one_computation(session_factory, single_flight):
+    release = threading.Event()
+    calls = []
+    
+    def slow_count(db, label):
+        calls.append(label)
+        release.wait(5)
+        return db.query(Entry).count()
+    
+    db = session_factory()
+    tasks = [asyncio.create_task(coalesced("count", db, slow_count, "a")) for _ in range(5)]
+    other = asyncio.create_task(coalesced("count", db, slow_count, "b"))
+    await asyncio.sleep(0.05)
+    release.set()
+    
+    assert await asyncio.gather(*tasks) == [0] * 5
+    assert await other == 0
+    assert calls.count("a") == 1
+    assert single_flight.metrics()["endpoints"]["count"] == {"executed": 2, "coalesced": 4}
+    assert single_flight.metrics()["in_flight"] == 0
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_cancel_shared_computation(single_flight):
+    finish = asyncio.Event()
+    
+    async def compute():
+        await finish.wait()
+        return "done"
+    
+    first = asyncio.create_task(single_flight.run(("slow",), compute))
+    second = asyncio.create_task(single_flight.run(("slow",), compute))
+    await asyncio.sleep(0)
+    first.cancel()
+    finish.set()
+    
+    assert await second == "done"
+
+def test_writes_to_read_tables_bump_data_version(session_factory):
+    db = session_factory()
+    
+    before = data_version()
+    db.add(order())
+    db.commit()
+    assert data_version() == before + 1
+    
+    db.execute(insert(Entry), [{
+        "timestamp": datetime(2025, 1, 6, 13, 0),
+        "type": EntryType.ORDER,
+        "app": AppType.DOORDASH,
+        "amount": Decimal("5.00")
+    }])
+    db.commit()
+    assert data_version() == before + 2
+    
+    db.add(SuggestionCache(fingerprint="f", suggestion="s", expires_at=datetime(2030, 1, 1)))
+    db.commit()
+    db.add(order())
+    db.rollback()
+    db.commit()
+    assert data_version() == before + 2
+
+@pytest.mark.asyncio
+async def test_rollup_endpoint_is_coalesced(session_factory, single_flight):
+    db = session_factory()
+    db.add(order("12.00"))
+    db.commit()
+    
+    app = FastAPI()
+    app.include_router(rollup.router, prefix="/api")
+    
+    def override_get_db():
+        session = session_factory()
+        try:
+            yield session
+        finally:
+            session.close()
+    
+    app.dependency_overrides[get_db] = override_get_db
+    
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        responses = await asyncio.gather(*[client.get("/api/rollup") for _ in range(4)])
+    
+    assert {r.json()["revenue"] for r in responses} == {12.0}
+    counts = single_flight.metrics()["endpoints"]["rollup"]
+    assert counts["executed"] + counts["coalesced"] == 4
+    assert counts["executed"] >= 1
@@ -0,0 +1,82 @@
+import asyncio
+import httpx
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from backend.db import Base
+from backend.models import ApiCredential, PlatformIntegration
+from backend.services import resilience
+from backend.services.credential_manager import CredentialManager, TokenUnavailableError
+from datetime import datetime, timedelta
+
+@pytest.fixture
+def session_factory(monkeypatch):
+    monkeypatch.setattr(resilience, "_limiters", {})
+    monkeypatch.setattr(resilience, "_breakers", {})
+    test_engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=test_engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
+    Base.metadata.drop_all(bind=test_engine)
+
+def add_credential(session_factory, expires_in):
+    db = session_factory()
+    db.add(ApiCredential(
+        platform=PlatformIntegration.UBER,
+        access_token="old-token",
+        refresh_token="refresh-1",
+        token_expires_at=datetime.utcnow() + expires_in,
+        is_active=1
+    ))
+    db.commit()
+    db.close()
+
+def token_server(calls):
+    async def handler(request):
+        calls.append(request)
+        await asyncio.sleep(0.01)
+        return httpx.Response(200, json={"access_token": f"new-token-{len(calls)}", "refresh_token": "refresh-2", "expires_in": 3600})
+    return httpx.MockTransport(handler)
+
+@pytest.mark.asyncio
+async def test_fresh_token_is_served_from_cache(session_factory):
+    add_credential(session_factory, timedelta(hours=1))
+    calls = []
+    manager = CredentialManager(session_factory=session_factory, transport=token_server(calls))
+    
+    assert await manager.get_token(PlatformIntegration.UBER) == "old-token"
+    assert await manager.get_token(PlatformIntegration.UBER) == "old-token"
+    assert calls == []
+
+@pytest.mark.asyncio
+async def test_expiring_token_is_refreshed_once(session_factory):
+    add_credential(session_factory, timedelta(minutes=1))
+    calls = []
+    manager = CredentialManager(session_factory=session_factory, transport=token_server(calls))
+    
+    tokens = await asyncio.gather(*[manager.get_token(PlatformIntegration.UBER) for _ in range(5)])
+    
+    assert tokens == ["new-token-1"] * 5
+    assert len(calls) == 1
+    assert b"refresh_token=refresh-1" in calls[0].content
+    
+    cred = session_factory().query(ApiCredential).first()
+    assert cred.access_token == "new-token-1"
+    assert cred.refresh_token == "refresh-2"
+    assert cred.token_expires_at > datetime.utcnow() + timedelta(minutes=50)
+
+@pytest.mark.asyncio
+async def test_refresh_expiring_updates_in_background(session_factory):
+    add_credential(session_factory, timedelta(minutes=5))
+    calls = []
+    manager = CredentialManager(session_factory=session_factory, transport=token_server(calls))
+    
+    await manager.refresh_expiring()
+    assert len(calls) == 1
+    assert await manager.get_token(PlatformIntegration.UBER) == "new-token-1"
+
+@pytest.mark.asyncio
+async def test_disconnected_platform_has_no_token(session_factory):
+    manager = CredentialManager(session_factory=session_factory)
+    with pytest.raises(TokenUnavailableError):
+        await manager.get_token(PlatformIntegration.SHIPT)
@@ -0,0 +1,100 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from backend.db import Base
+from backend.models import ReferenceVersion, Entry, EntryType, AppType, ExpenseCategory
+from backend.services import coalescing
+from backend.services.reference_data import ENTRIES_VERSION_NAME, entries_version
+from backend.services.cube_service import calculate_cube, parse_names, CubeCache, DIMENSIONS
+from datetime import datetime
+from decimal import Decimal
+
+@pytest.fixture
+def db_session():
+    test_engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=test_engine)
+    TestSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
+    session = TestSessionLocal()
+    yield session
+    session.close()
+    Base.metadata.drop_all(bind=test_engine)
+
+@pytest.fixture
+def week(db_session):
+    def add(timestamp, type, app, amount, miles=None, minutes=None, category=None):
+        db_session.add(Entry(
+            timestamp=timestamp, type=type, app=app, amount=Decimal(amount),
+            distance_miles=miles, duration_minutes=minutes, category=category
+        ))
+    # Monday 2025-01-06 and Tuesday 2025-01-07
+    add(datetime(2025, 1, 6, 12, 0), EntryType.ORDER, AppType.DOORDASH, "10.00", 4.0, 30)
+    add(datetime(2025, 1, 6, 12, 40), EntryType.ORDER, AppType.DOORDASH, "14.00", 6.0, 30)
+    add(datetime(2025, 1, 6, 18, 0), EntryType.ORDER, AppType.UBEREATS, "20.00", 5.0, 20)
+    add(datetime(2025, 1, 7, 12, 15), EntryType.ORDER, AppType.UBEREATS, "9.50", 2.5, 15)
+    add(datetime(2025, 1, 7, 9, 0), EntryType.EXPENSE, AppType.OTHER, "-30.00", category=ExpenseCategory.GAS)
+    add(datetime(2025, 1, 7, 10, 0), EntryType.EXPENSE, AppType.OTHER, "-5.25", category=ExpenseCategory.PARKING)
+    db_session.commit()
+
+def test_cube_groups_by_several_dimensions(db_session, week):
+    cube = calculate_cube(db_session, ("app", "hour"), ("amount", "count", "dollars_per_mile", "dollars_per_hour"))
+    
+    cells = {(c["app"], c["hour"]): c for c in cube["cells"]}
+    lunch = cells[("DOORDASH", 12)]
+    assert lunch["amount"] == 24.0
+    assert lunch["count"] == 2
+    assert lunch["dollars_per_mile"] == 2.4
+    assert lunch["dollars_per_hour"] == 24.0
+    # Expenses log no miles or minutes, so they have no rates
+    assert cells[("OTHER", 9)]["dollars_per_mile"] is None
+    assert cube["totals"]["amount"] == 18.25
+    assert cube["totals"]["count"] == 6
+
+def test_cube_category_and_weekday_labels(db_session, week):
+    cube = calculate_cube(db_session, ("category", "weekday"), ("amount",))
+    
+    assert {(c["category"], c["weekday"]): c["amount"] for c in cube["cells"]} == {
+        (None, "Mon"): 44.0,
+        (None, "Tue"): 9.5,
+        ("GAS", "Tue"): -30.0,
+        ("PARKING", "Tue"): -5.25
+    }
+
+def test_cube_without_dimensions_is_the_grand_total(db_session, week):
+    cube = calculate_cube(db_session, (), ("amount", "miles", "minutes"), from_date=datetime(2025, 1, 7))
+    
+    assert cube["cells"] == [{"amount": -25.75, "miles": 2.5, "minutes": 15}]
+
+def test_parse_names_rejects_unknown_dimensions():
+    assert parse_names("app, hour,app", DIMENSIONS) == ("app", "hour")
+    assert parse_names(None, DIMENSIONS, ("amount",)) == ("amount",)
+    with pytest.raises(ValueError):
+        parse_names("app,zipcode", DIMENSIONS)
+
+def test_cache_serves_repeats_until_data_changes(db_session, week):
+    cache = CubeCache()
+    first = cache.get(db_session, ("app",), ("amount",), None, None, None)
+    assert cache.get(db_session, ("app",), ("amount",), None, None, None) is first
+    assert cache.metrics() == {"entries": 1, "hits": 1, "misses": 1}
+    
+    db_session.add(Entry(timestamp=datetime(2025, 1, 8), type=EntryType.BONUS, app=AppType.DOORDASH, amount=Decimal("3.00")))
+    db_session.commit()
+    
+    refreshed = cache.get(db_session, ("app",), ("amount",), None, None, None)
+    assert {c["app"]: c["amount"] for c in refreshed["cells"]}["DOORDASH"] == 27.0
+    assert cache.metrics()["misses"] == 2
+
+def test_cache_sees_writes_from_other_workers(db_session, week, monkeypatch):
+    monkeypatch.setattr(entries_version, "poll_interval", 0)
+    cache = CubeCache()
+    cache.get(db_session, ("app",), ("amount",), None, None, None)
+    
+    # Another worker's commit: the local version stays put, the shared row moves
+    local = coalescing.data_version()
+    entries_version.bump(db_session)
+    db_session.connection().execute(Entry.__table__.update().where(Entry.app == AppType.DOORDASH).values(amount_cents=0))
+    db_session.commit()
+    
+    refreshed = cache.get(db_session, ("app",), ("amount",), None, None, None)
+    assert coalescing.data_version() == local
+    assert db_session.get(ReferenceVersion, ENTRIES_VERSION_NAME).version == 1
+    assert {c["app"]: c["amount"] for c in refreshed["cells"]}["DOORDASH"] == 0.0
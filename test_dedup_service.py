@@ -0,0 +1,144 @@
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from backend.db import Base
+from backend.models import Entry, EntryType, AppType, SyncedOrder, normalize_order_id
+from backend.schemas import EntryCreate
+from backend.routers.entries import create_entry
+from backend.services.dedup_service import duplicate_report
+from backend.services.sync_service import ShiptSyncService, UberSyncService
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+@pytest.fixture
+def db_session():
+    test_engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=test_engine)
+    TestSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
+    session = TestSessionLocal()
+    yield session
+    session.close()
+    Base.metadata.drop_all(bind=test_engine)
+
+def uber_order(order_id, total=12.5, completed_at=1700000000):
+    return {
+        "order_id": order_id,
+        "fare": {"total_amount": total},
+        "trip_distance": 3.2,
+        "trip_duration": 900,
+        "completed_at": completed_at
+    }
+
+def manual_order(db_session, timestamp, amount, order_id=None, app=AppType.UBEREATS):
+    entry = Entry(timestamp=timestamp, type=EntryType.ORDER, app=app, order_id=order_id, amount=Decimal(amount))
+    db_session.add(entry)
+    db_session.commit()
+    return entry
+
+def test_order_ids_are_normalized():
+    assert normalize_order_id(" #ue-3401") == normalize_order_id("UE3401") == "UE3401"
+    assert normalize_order_id("--") is None
+    assert normalize_order_id(None) is None
+
+def test_sync_links_orders_logged_by_hand(db_session):
+    synced_at = datetime(2023, 11, 14, 22, 13, 20)
+    by_id = manual_order(db_session, synced_at - timedelta(hours=2), "30.00", order_id="ue-a1")
+    by_time = manual_order(db_session, synced_at + timedelta(minutes=3), "12.50")
+    # Same pay and time, but a different order id: a different order
+    other = manual_order(db_session, synced_at, "12.50", order_id="UE-ZZ")
+    
+    new_ids = UberSyncService("token")._persist_orders(db_session, [
+        uber_order("UE-A1", total=30.0, completed_at=1700000000 - 7200),
+        uber_order("b2"),
+        uber_order("c3", total=8.0)
+    ])
+    
+    links = {s.platform_order_id: s for s in db_session.query(SyncedOrder)}
+    assert links["UE-A1"].entry_id == by_id.id
+    assert links["UE-A1"].sync_status == "merged"
+    assert links["b2"].entry_id == by_time.id
+    assert len(new_ids) == 1 and links["c3"].entry_id == new_ids[0]
+    assert db_session.query(Entry).count() == 4
+    assert other.id not in {s.entry_id for s in links.values()}
+
+def test_synced_inserts_get_order_keys(db_session):
+    UberSyncService("token")._persist_orders(db_session, [uber_order("ue-77")])
+    
+    assert db_session.query(Entry.order_key).scalar() == "UE77"
+
+@pytest.mark.asyncio
+async def test_manual_entry_rejected_when_order_id_exists(db_session):
+    UberSyncService("token")._persist_orders(db_session, [uber_order("UE-5")])
+    
+    with pytest.raises(HTTPException) as error:
+        await create_entry(EntryCreate(type=EntryType.ORDER, app=AppType.UBEREATS, order_id="ue 5", amount=Decimal("12.50")), db_session)
+    assert error.value.status_code == 409
+    # Another app may reuse the id
+    await create_entry(EntryCreate(type=EntryType.ORDER, app=AppType.DOORDASH, order_id="ue 5", amount=Decimal("12.50")), db_session)
+
+@pytest.mark.asyncio
+async def test_manual_entry_with_same_pay_minutes_apart_is_recorded(db_session):
+    # Stacked orders can pay the same; they are reported, not refused
+    synced_at = datetime(2025, 3, 1, 18, 0)
+    first = manual_order(db_session, synced_at, "14.25")
+    
+    second = await create_entry(EntryCreate(
+        type=EntryType.ORDER, app=AppType.UBEREATS, amount=Decimal("14.25"),
+        timestamp=(synced_at + timedelta(minutes=4)).replace(tzinfo=timezone.utc)
+    ), db_session)
+    
+    assert second.timestamp == synced_at + timedelta(minutes=4)
+    assert [p["entry_ids"] for p in duplicate_report(db_session)["by_amount_and_time"]] == [[first.id, second.id]]
+
+def test_sync_matches_orders_with_utc_offsets(db_session):
+    by_time = manual_order(db_session, datetime(2025, 1, 1, 12, 3), "18.50", app=AppType.SHIPT)
+    
+    new_ids = ShiptSyncService("token")._persist_orders(db_session, [
+        {"order_id": "s1", "payout": 18.5, "completed_at": "2025-01-01T07:00:00-05:00"},
+        {"order_id": "s2", "payout": 9.0, "completed_at": "2025-01-01T12:00:00+00:00"}
+    ])
+    
+    links = {s.platform_order_id: s for s in db_session.query(SyncedOrder)}
+    assert links["s1"].entry_id == by_time.id
+    assert len(new_ids) == 1
+    assert db_session.get(Entry, new_ids[0]).timestamp == datetime(2025, 1, 1, 12, 0)
+
+def test_report_covers_existing_duplicates(db_session):
+    noon = datetime(2025, 1, 6, 12, 0)
+    first = manual_order(db_session, noon, "9.00", order_id="DD-1", app=AppType.DOORDASH)
+    second = manual_order(db_session, noon + timedelta(hours=1), "9.00", order_id="dd1", app=AppType.DOORDASH)
+    keyed = manual_order(db_session, noon + timedelta(hours=3), "14.00", order_id="UE-9")
+    unkeyed = manual_order(db_session, noon + timedelta(hours=3, minutes=4), "14.00")
+    manual_order(db_session, noon + timedelta(hours=3, minutes=30), "14.00")
+    
+    report = duplicate_report(db_session)
+    
+    assert [g["entry_ids"] for g in report["by_order_id"]] == [[first.id, second.id]]
+    assert [p["entry_ids"] for p in report["by_amount_and_time"]] == [[keyed.id, unkeyed.id]]
+    assert report["by_amount_and_time"][0]["minutes_apart"] == 4.0
+    assert report["double_counted"] == 23.0
+
+def test_migration_fills_order_keys():
+    from backend.services.migrations import run_migrations
+    legacy_engine = create_engine("sqlite:///:memory:")
+    with legacy_engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE entries (id INTEGER PRIMARY KEY, timestamp DATETIME NOT NULL, type VARCHAR(12) NOT NULL, "
+            "app VARCHAR(9) NOT NULL, order_id VARCHAR, amount_cents INTEGER NOT NULL, distance_miles FLOAT, "
+            "duration_minutes INTEGER, category VARCHAR(12), note TEXT, receipt_url VARCHAR, "
+            "created_at DATETIME NOT NULL, updated_at DATETIME NOT NULL)"
+        ))
+        conn.execute(text(
+            "INSERT INTO entries (timestamp, type, app, order_id, amount_cents, created_at, updated_at) VALUES "
+            "('2025-01-06 12:00:00', 'ORDER', 'DOORDASH', 'dd-42', 829, '2025-01-06', '2025-01-06')"
+        ))
+    Base.metadata.create_all(bind=legacy_engine)
+    
+    run_migrations(legacy_engine)
+    run_migrations(legacy_engine)
+    
+    session = sessionmaker(bind=legacy_engine)()
+    assert session.query(Entry.order_key).scalar() == "DD42"
+    indexes = [row[1] for row in session.execute(text("PRAGMA index_list(entries)"))]
+    assert "ix_entries_app_amount_timestamp" in indexes
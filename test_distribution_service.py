@@ -0,0 +1,139 @@
+import random
+import numpy as np
+import pytest
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import sessionmaker
+from backend.db import Base
+from backend.models import DistributionSketch, Entry, EntryType, AppType
+from backend.services import distribution_service
+from backend.services.distribution_service import get_distribution, refresh_sketches, ALL_DAYS
+from backend.services.quantile_sketch import QuantileSketch, RELATIVE_ACCURACY
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+@pytest.fixture
+def db_session():
+    test_engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=test_engine)
+    TestSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
+    session = TestSessionLocal()
+    yield session
+    session.close()
+    Base.metadata.drop_all(bind=test_engine)
+
+def order(timestamp, amount, app=AppType.DOORDASH, minutes=30):
+    return Entry(
+        timestamp=timestamp,
+        type=EntryType.ORDER,
+        app=app,
+        amount=Decimal(amount),
+        distance_miles=3.0,
+        duration_minutes=minutes
+    )
+
+def test_sketch_quantiles_are_within_the_relative_accuracy():
+    values = [random.Random(7).lognormvariate(3, 0.6) for _ in range(5000)]
+    halves = QuantileSketch().extend(values[:2500]), QuantileSketch().extend(values[2500:])
+    merged = QuantileSketch.from_bytes(halves[0].merge(halves[1]).to_bytes())
+    
+    assert merged.count == 5000
+    for q in (0.1, 0.5, 0.9, 0.99):
+        exact = np.quantile(values, q, method="lower")
+        assert abs(merged.quantile(q) - exact) <= exact * RELATIVE_ACCURACY
+
+def test_commits_keep_day_and_month_sketches_current(db_session):
+    # Jan 30 - Feb 2: the range straddles a month, and February is whole
+    for day in range(4):
+        for amount in ("8.00", "12.00", "20.00"):
+            db_session.add(order(datetime(2025, 1, 30, 12) + timedelta(days=day), amount))
+    db_session.add(order(datetime(2025, 2, 20, 12), "40.00", AppType.UBEREATS, minutes=0))
+    db_session.commit()
+    
+    result = get_distribution(db_session, datetime(2025, 1, 31), datetime(2025, 2, 28), quantiles=(0.5, 1.0))
+    
+    values = result["metrics"]["order_value"]
+    assert values["count"] == 10
+    assert values["by_app"]["DOORDASH"]["quantiles"]["p50"] == pytest.approx(12.0, rel=RELATIVE_ACCURACY)
+    assert values["quantiles"]["p100"] == pytest.approx(40.0, rel=RELATIVE_ACCURACY)
+    # The Uber order logged no time, so it has an order value but no $/hour
+    assert "UBEREATS" not in result["metrics"]["dollars_per_hour"]["by_app"]
+    assert result["metrics"]["dollars_per_hour"]["quantiles"]["p50"] == pytest.approx(24.0, rel=RELATIVE_ACCURACY)
+
+def test_updates_and_deletes_rebuild_the_days_they_touch(db_session):
+    moved = order(datetime(2025, 3, 3, 12), "10.00")
+    gone = order(datetime(2025, 3, 3, 13), "30.00")
+    db_session.add_all([moved, gone])
+    db_session.commit()
+    
+    moved.timestamp = datetime(2025, 3, 10, 12)
+    db_session.delete(gone)
+    db_session.commit()
+    
+    march_3 = get_distribution(db_session, datetime(2025, 3, 3), datetime(2025, 3, 3))
+    march_10 = get_distribution(db_session, datetime(2025, 3, 10), datetime(2025, 3, 10))
+    assert march_3["metrics"]["order_value"]["count"] == 0
+    assert march_10["metrics"]["order_value"]["count"] == 1
+    assert get_distribution(db_session)["metrics"]["order_value"]["count"] == 1
+
+def test_bulk_writes_are_sketched(db_session):
+    # Synced orders arrive as one executemany insert
+    db_session.execute(insert(Entry), [
+        {"timestamp": datetime(2025, 4, 1, 9), "type": EntryType.ORDER, "app": AppType.UBEREATS,
+         "amount": Decimal("15.00"), "duration_minutes": 20},
+        {"timestamp": datetime(2025, 4, 2, 9), "type": EntryType.ORDER, "app": AppType.UBEREATS,
+         "amount": Decimal("25.00"), "duration_minutes": 20},
+    ])
+    db_session.commit()
+    assert get_distribution(db_session)["metrics"]["order_value"]["count"] == 2
+    
+    db_session.query(Entry).delete()
+    db_session.commit()
+    assert get_distribution(db_session)["metrics"]["order_value"]["count"] == 0
+    assert db_session.query(DistributionSketch).count() == 0
+
+def test_new_orders_are_added_without_reading_entries(db_session):
+    db_session.add(order(datetime(2025, 6, 2, 12), "10.00"))
+    db_session.commit()
+    statements = []
+    event.listen(db_session.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+    
+    db_session.add_all([order(datetime(2025, 6, 2, 13), "20.00"), order(datetime(2025, 6, 3, 9), "30.00")])
+    db_session.commit()
+    
+    assert not [s for s in statements if s.startswith("SELECT") and "FROM entries" in s]
+    june_2 = get_distribution(db_session, datetime(2025, 6, 2), datetime(2025, 6, 2))
+    assert june_2["metrics"]["order_value"]["count"] == 2
+    assert get_distribution(db_session, datetime(2025, 6, 1), datetime(2025, 6, 30))["metrics"]["order_value"]["count"] == 3
+
+def test_bulk_updates_rebuild_only_the_days_they_touch(db_session, monkeypatch):
+    db_session.add_all([
+        order(datetime(2025, 7, 1, 12), "10.00"),
+        order(datetime(2025, 7, 2, 12), "20.00"),
+        order(datetime(2025, 7, 3, 12), "30.00"),
+    ])
+    db_session.commit()
+    rebuilt = []
+    monkeypatch.setattr(distribution_service, "refresh_sketches", lambda db, days: rebuilt.append(days) or refresh_sketches(db, days))
+    
+    db_session.query(Entry).filter(Entry.amount == Decimal("20.00")).update(
+        {"timestamp": datetime(2025, 7, 5, 12)}, synchronize_session=False
+    )
+    db_session.commit()
+    
+    assert rebuilt == [{datetime(2025, 7, 2).date(), datetime(2025, 7, 5).date()}]
+    july_2 = get_distribution(db_session, datetime(2025, 7, 2), datetime(2025, 7, 2))
+    july_5 = get_distribution(db_session, datetime(2025, 7, 5), datetime(2025, 7, 5))
+    assert july_2["metrics"]["order_value"]["count"] == 0
+    assert july_5["metrics"]["order_value"]["count"] == 1
+    assert get_distribution(db_session)["metrics"]["order_value"]["count"] == 3
+
+def test_full_rebuild_matches_incremental_sketches(db_session):
+    for hour in range(0, 24 * 40, 7):
+        db_session.add(order(datetime(2025, 5, 1) + timedelta(hours=hour), str(5 + hour % 23)))
+    db_session.commit()
+    incremental = get_distribution(db_session, datetime(2025, 5, 3), datetime(2025, 6, 5))
+    
+    refresh_sketches(db_session, ALL_DAYS)
+    db_session.commit()
+    
+    assert get_distribution(db_session, datetime(2025, 5, 3), datetime(2025, 6, 5)) == incremental
@@ -1,5 +1,5 @@
 import pytest
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, func, text
 from sqlalchemy.orm import sessionmaker
 from backend.db import Base
 from backend.models import Entry, EntryType, AppType, ExpenseCategory
@@ -73,3 +73,43 @@ def test_bonus_stored_as_positive(db_session):
     
     retrieved = db_session.query(Entry).first()
     assert retrieved.amount > 0
+
+def test_amount_stored_as_integer_cents(db_session):
+    for amount in ["0.10", "0.20", "-19.99", "0.29"]:
+        db_session.add(Entry(
+            timestamp=datetime.utcnow(),
+            type=EntryType.ORDER,
+            app=AppType.DOORDASH,
+            amount=Decimal(amount)
+        ))
+    db_session.commit()
+    
+    stored = db_session.execute(text("SELECT amount_cents, typeof(amount_cents) FROM entries ORDER BY id")).all()
+    assert stored == [(10, "integer"), (20, "integer"), (-1999, "integer"), (29, "integer")]
+    assert db_session.query(func.sum(Entry.amount)).scalar() == Decimal("-19.40")
+    assert db_session.query(Entry).filter(Entry.amount > 0).count() == 3
+
+def test_migration_converts_numeric_amounts_to_cents():
+    from backend.services.migrations import run_migrations
+    legacy_engine = create_engine("sqlite:///:memory:")
+    with legacy_engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE entries (id INTEGER PRIMARY KEY, timestamp DATETIME NOT NULL, type VARCHAR(12) NOT NULL, "
+            "app VARCHAR(9) NOT NULL, order_id VARCHAR, amount NUMERIC(10, 2) NOT NULL, distance_miles FLOAT, "
+            "duration_minutes INTEGER, category VARCHAR(12), note TEXT, receipt_url VARCHAR, "
+            "created_at DATETIME NOT NULL, updated_at DATETIME NOT NULL)"
+        ))
+        conn.execute(text(
+            "INSERT INTO entries (timestamp, type, app, amount, created_at, updated_at) VALUES "
+            "('2025-01-06 12:00:00', 'ORDER', 'DOORDASH', 8.29, '2025-01-06', '2025-01-06'), "
+            "('2025-01-06 13:00:00', 'EXPENSE', 'OTHER', -40.1, '2025-01-06', '2025-01-06')"
+        ))
+    Base.metadata.create_all(bind=legacy_engine)
+    
+    run_migrations(legacy_engine)
+    run_migrations(legacy_engine)
+    
+    session = sessionmaker(bind=legacy_engine)()
+    assert [e.amount for e in session.query(Entry).order_by(Entry.id)] == [Decimal("8.29"), Decimal("-40.10")]
+    columns = [row[1] for row in session.execute(text("PRAGMA table_info(entries)"))]
+    assert "amount" not in columns
@@ -0,0 +1,100 @@
+import time
+import numpy as np
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from backend.db import Base
+from backend.models import Entry, EntryType, AppType
+from backend.services.insights_service import APPS, compute_insights, get_insights, load_order_arrays
+from datetime import datetime
+from decimal import Decimal
+
+@pytest.fixture
+def db_session():
+    test_engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=test_engine)
+    TestSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
+    session = TestSessionLocal()
+    yield session
+    session.close()
+    Base.metadata.drop_all(bind=test_engine)
+
+def add_entry(db_session, timestamp, amount, app=AppType.DOORDASH, minutes=30, miles=5.0, type=EntryType.ORDER):
+    db_session.add(Entry(
+        timestamp=timestamp,
+        type=type,
+        app=app,
+        amount=Decimal(amount),
+        distance_miles=miles,
+        duration_minutes=minutes
+    ))
+
+def test_heatmap_cells_rates_and_thresholds(db_session):
+    # 2025-01-06 is a Monday
+    for amount in ["10.00", "15.00", "20.00"]:
+        add_entry(db_session, datetime(2025, 1, 6, 12, 0), amount)
+    for amount in ["30.00", "30.00", "30.00"]:
+        add_entry(db_session, datetime(2025, 1, 11, 19, 0), amount, app=AppType.UBEREATS, minutes=20, miles=2.0)
+    add_entry(db_session, datetime(2025, 1, 6, 12, 0), "5.00", type=EntryType.BONUS)
+    add_entry(db_session, datetime(2025, 1, 6, 12, 0), "-9.00", type=EntryType.EXPENSE)
+    db_session.commit()
+    
+    insights = get_insights(db_session)
+    doordash, ubereats = APPS.index("DOORDASH"), APPS.index("UBEREATS")
+    
+    assert insights["total_orders"] == 6
+    assert insights["orders"][0][12][doordash] == 3
+    assert insights["orders"][5][19][ubereats] == 3
+    assert insights["dollars_per_hour"][0][12][doordash] == 30.0
+    assert insights["dollars_per_hour"][5][19][ubereats] == 90.0
+    assert insights["dollars_per_mile"][0][12][doordash] == 3.0
+    assert insights["dollars_per_hour"][1][12][doordash] is None
+    assert insights["peak_hour"] == 19
+    assert insights["best_slots"][0] == {
+        "weekday": "Sat", "hour": 19, "app": "UBEREATS", "orders": 3, "dollars_per_hour": 90.0
+    }
+    # Median order pays $65/hr: a 30 minute DoorDash order has to pay $32.50 to match it
+    assert insights["target_hourly_rate"] == 65.0
+    assert insights["by_app"]["DOORDASH"]["acceptance_threshold"] == 32.5
+    assert insights["by_app"]["UBEREATS"]["acceptance_threshold"] == 21.67
+    assert insights["order_value_percentiles"]["p50"] == 25.0
+
+def test_untimed_orders_leave_rates_empty(db_session):
+    add_entry(db_session, datetime(2025, 1, 6, 12, 0), "10.00", minutes=0, miles=0.0)
+    db_session.commit()
+    
+    insights = get_insights(db_session)
+    
+    assert insights["total_orders"] == 1
+    assert insights["peak_hour"] is None
+    assert insights["target_hourly_rate"] is None
+    assert insights["acceptance_threshold"] is None
+    assert insights["best_slots"] == []
+    assert insights["by_app"]["DOORDASH"]["dollars_per_hour"] is None
+
+def test_empty_window(db_session):
+    insights = get_insights(db_session, from_date=datetime(2025, 1, 1))
+    
+    assert insights["total_orders"] == 0
+    assert insights["order_value_percentiles"] is None
+    assert insights["by_app"] == {}
+    assert load_order_arrays(db_session)["amount"].size == 0
+
+def test_year_of_orders_computes_in_milliseconds():
+    rng = np.random.default_rng(7)
+    n = 50_000
+    orders = {
+        "weekday": rng.integers(0, 7, n),
+        "hour": rng.integers(0, 24, n),
+        "app": rng.integers(0, len(APPS), n),
+        "amount": rng.uniform(3, 40, n),
+        "miles": rng.uniform(0, 10, n),
+        "minutes": rng.integers(0, 60, n).astype(np.float64)
+    }
+    
+    started = time.perf_counter()
+    insights = compute_insights(orders)
+    elapsed = time.perf_counter() - started
+    
+    assert insights["total_orders"] == n
+    assert elapsed < 0.5
@@ -0,0 +1,88 @@
+import asyncio
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from backend.db import Base
+from backend.models import JobLease
+from backend.services.leader import LeaderElector
+from datetime import datetime, timedelta
+
+@pytest.fixture
+def session_factory():
+    test_engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=test_engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
+    Base.metadata.drop_all(bind=test_engine)
+
+async def noop():
+    pass
+
+def make_elector(session_factory, **kwargs):
+    return LeaderElector("jobs", on_elected=lambda: None, on_demoted=noop, session_factory=session_factory, **kwargs)
+
+def test_only_one_worker_holds_lease(session_factory):
+    first = make_elector(session_factory)
+    second = make_elector(session_factory)
+    
+    assert first.try_acquire()
+    assert not second.try_acquire()
+    # Heartbeat renews the lease for the holder
+    assert first.try_acquire()
+    assert not second.try_acquire()
+
+def test_expired_lease_is_taken_over(session_factory):
+    first = make_elector(session_factory)
+    second = make_elector(session_factory)
+    assert first.try_acquire()
+    
+    db = session_factory()
+    lease = db.query(JobLease).first()
+    lease.expires_at = datetime.utcnow() - timedelta(seconds=1)
+    db.commit()
+    db.close()
+    
+    assert second.try_acquire()
+    assert not first.try_acquire()
+
+def test_release_hands_over_immediately(session_factory):
+    first = make_elector(session_factory)
+    second = make_elector(session_factory)
+    assert first.try_acquire()
+    
+    first.release()
+    assert second.try_acquire()
+
+def test_current_holder_reports_unexpired_lease(session_factory):
+    first = make_elector(session_factory)
+    second = make_elector(session_factory)
+    assert second.current_holder() is None
+    
+    assert first.try_acquire()
+    assert second.current_holder() == first.worker_id
+    
+    first.release()
+    assert second.current_holder() is None
+
+@pytest.mark.asyncio
+async def test_run_starts_and_stops_jobs(session_factory):
+    events = []
+    
+    async def on_demoted():
+        events.append("demoted")
+    
+    elector = LeaderElector(
+        "jobs",
+        on_elected=lambda: events.append("elected"),
+        on_demoted=on_demoted,
+        session_factory=session_factory,
+        heartbeat_interval=timedelta(milliseconds=10)
+    )
+    task = asyncio.create_task(elector.run())
+    await asyncio.sleep(0.05)
+    assert elector.is_leader
+    
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    assert events == ["elected", "demoted"]
+    assert session_factory().query(JobLease).count() == 0
@@ -0,0 +1,80 @@
+import json
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from backend.db import Base
+from backend.models import SyncedOrder, OrderPayload, PayloadDictionary, PlatformIntegration
+from backend.services.payload_store import (
+    store_payloads, load_payload, load_synced_order_payload, migrate_raw_payloads, payload_report, TRAIN_MIN_SAMPLES
+)
+
+@pytest.fixture
+def db_session():
+    test_engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=test_engine)
+    TestSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
+    session = TestSessionLocal()
+    yield session
+    session.close()
+    Base.metadata.drop_all(bind=test_engine)
+
+def uber_order(i):
+    return {
+        "order_id": f"order-{i}",
+        "status": "completed",
+        "fare": {"total_amount": 10 + i % 7, "currency_code": "USD", "tip": 2.5},
+        "trip_distance": 3.1,
+        "trip_duration": 900,
+        "completed_at": 1700000000 + i * 60,
+        "restaurant": {"name": "Taqueria", "address": "123 Main St"}
+    }
+
+def test_payloads_round_trip_and_deduplicate(db_session):
+    orders = [uber_order(i) for i in range(TRAIN_MIN_SAMPLES)] + [uber_order(0)]
+    hashes = store_payloads(db_session, PlatformIntegration.UBER, orders)
+    db_session.commit()
+    
+    assert hashes[0] == hashes[-1]
+    assert db_session.query(OrderPayload).count() == TRAIN_MIN_SAMPLES
+    assert db_session.query(PayloadDictionary).count() == 1
+    assert load_payload(db_session, hashes[5]) == uber_order(5)
+
+def test_dictionary_compresses_small_payloads(db_session):
+    store_payloads(db_session, PlatformIntegration.UBER, [uber_order(i) for i in range(200)])
+    db_session.commit()
+    
+    report = payload_report(db_session)
+    assert report["payloads"] == 200
+    assert report["compression_ratio"] > 2
+
+def test_migration_moves_inline_payloads(db_session):
+    for i in range(50):
+        db_session.add(SyncedOrder(
+            platform=PlatformIntegration.UBER,
+            platform_order_id=f"order-{i}",
+            sync_status="completed",
+            raw_data=json.dumps(uber_order(i))
+        ))
+    db_session.commit()
+    
+    report = migrate_raw_payloads(db_session)
+    
+    assert report["moved"] == 50
+    assert report["saved_bytes"] > 0
+    synced_order = db_session.query(SyncedOrder).filter(SyncedOrder.platform_order_id == "order-7").first()
+    assert synced_order.raw_data is None
+    assert load_synced_order_payload(db_session, synced_order) == uber_order(7)
+    assert migrate_raw_payloads(db_session)["moved"] == 0
+
+def test_migration_skips_malformed_payloads(db_session):
+    db_session.add(SyncedOrder(platform=PlatformIntegration.UBER, platform_order_id="bad", sync_status="completed", raw_data="{not json"))
+    db_session.add(SyncedOrder(platform=PlatformIntegration.UBER, platform_order_id="good", sync_status="completed", raw_data=json.dumps(uber_order(1))))
+    db_session.commit()
+    
+    report = migrate_raw_payloads(db_session)
+    
+    assert report["moved"] == 1
+    assert report["skipped"] == 1
+    bad = db_session.query(SyncedOrder).filter(SyncedOrder.platform_order_id == "bad").first()
+    assert bad.raw_data == "{not json"
+    assert bad.payload_hash is None
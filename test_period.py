@@ -0,0 +1,66 @@
+import pytest
+from backend.services.period import resolve_period, comparison_period, period_to_date
+from datetime import datetime, timezone
+
+# 2025-03-07 23:30 in Los Angeles, a Friday, two days before DST starts
+LA_FRIDAY_NIGHT = datetime(2025, 3, 8, 7, 30, tzinfo=timezone.utc)
+
+def test_today_follows_the_local_day():
+    period = resolve_period("TODAY", "America/Los_Angeles", now=LA_FRIDAY_NIGHT)
+    
+    assert period.start == datetime(2025, 3, 7, 8, 0)
+    assert period.end == datetime(2025, 3, 8, 8, 0)
+    assert resolve_period("TODAY", "UTC", now=LA_FRIDAY_NIGHT).start == datetime(2025, 3, 8, 0, 0)
+
+def test_window_is_stable_within_the_period():
+    morning = resolve_period("THIS_WEEK", "America/Los_Angeles", now=datetime(2025, 3, 3, 17, 0, tzinfo=timezone.utc))
+    
+    assert resolve_period("THIS_WEEK", "America/Los_Angeles", now=LA_FRIDAY_NIGHT) == morning
+    assert morning.start == datetime(2025, 3, 3, 8, 0)
+    # The week spans the switch to daylight time, so it ends at 07:00 UTC
+    assert morning.end == datetime(2025, 3, 10, 7, 0)
+
+@pytest.mark.parametrize("timeframe, start, end", [
+    ("YESTERDAY", datetime(2025, 3, 6, 8), datetime(2025, 3, 7, 8)),
+    ("LAST_7_DAYS", datetime(2025, 3, 1, 8), datetime(2025, 3, 8, 8)),
+    ("THIS_MONTH", datetime(2025, 3, 1, 8), datetime(2025, 4, 1, 7)),
+    ("LAST_MONTH", datetime(2025, 2, 1, 8), datetime(2025, 3, 1, 8)),
+])
+def test_timeframes(timeframe, start, end):
+    period = resolve_period(timeframe, "America/Los_Angeles", now=LA_FRIDAY_NIGHT)
+    
+    assert (period.start, period.end) == (start, end)
+
+def test_unknown_timeframe_or_zone():
+    with pytest.raises(ValueError):
+        resolve_period("FOREVER")
+    with pytest.raises(ValueError):
+        resolve_period("TODAY", "Mars/Olympus_Mons")
+
+@pytest.mark.parametrize("timeframe, against, start, end", [
+    ("TODAY", "previous", datetime(2025, 3, 6, 8), datetime(2025, 3, 7, 8)),
+    ("THIS_WEEK", "previous", datetime(2025, 2, 24, 8), datetime(2025, 3, 3, 8)),
+    ("THIS_MONTH", "previous", datetime(2025, 2, 1, 8), datetime(2025, 3, 1, 8)),
+    ("THIS_MONTH", "same_last_year", datetime(2024, 3, 1, 8), datetime(2024, 4, 1, 7)),
+    # 52 weeks back, so it is also a Monday-to-Monday week
+    ("THIS_WEEK", "same_last_year", datetime(2024, 3, 4, 8), datetime(2024, 3, 11, 7)),
+])
+def test_comparison_periods(timeframe, against, start, end):
+    period = comparison_period(resolve_period(timeframe, "America/Los_Angeles", now=LA_FRIDAY_NIGHT), against)
+    
+    assert (period.start, period.end) == (start, end)
+
+def test_comparison_to_date_stops_at_the_same_local_time():
+    week = resolve_period("THIS_WEEK", "America/Los_Angeles", now=LA_FRIDAY_NIGHT)
+    last_week = comparison_period(week, "previous")
+    
+    pacing = period_to_date(week, last_week, now=LA_FRIDAY_NIGHT)
+    
+    # Friday 23:30 local the week before
+    assert pacing.start == last_week.start
+    assert pacing.end == datetime(2025, 3, 1, 7, 30)
+    assert period_to_date(week, last_week, now=datetime(2025, 3, 20, tzinfo=timezone.utc)) == last_week
+
+def test_unknown_comparison_is_rejected():
+    with pytest.raises(ValueError):
+        comparison_period(resolve_period("TODAY"), "last_decade")
@@ -0,0 +1,93 @@
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from backend.db import Base
+from backend.models import Entry, EntryType, AppType, Goal, Settings, TimeframeType
+from backend.services.reference_data import ReferenceCache
+from backend.services import rollup_service
+from backend.services.rollup_service import calculate_rollup
+from datetime import datetime
+from decimal import Decimal
+
+@pytest.fixture
+def engine():
+    test_engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=test_engine)
+    yield test_engine
+    Base.metadata.drop_all(bind=test_engine)
+
+@pytest.fixture
+def session_factory(engine):
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+@pytest.fixture
+def statements(engine):
+    executed = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *args: executed.append(statement))
+    return executed
+
+def test_reads_are_served_from_memory_between_polls(session_factory, statements):
+    cache = ReferenceCache(poll_interval=60)
+    db = session_factory()
+    db.add(Settings(id=1, cost_per_mile=Decimal("0.45")))
+    db.commit()
+    
+    assert cache.get(db).cost_per_mile == Decimal("0.45")
+    statements.clear()
+    for _ in range(10):
+        cache.get(db)
+    
+    assert statements == []
+    assert cache.loads == 1
+
+def test_commit_writes_through_and_other_workers_reload_on_poll(session_factory):
+    writer = ReferenceCache(poll_interval=60)
+    reader = ReferenceCache(poll_interval=0)
+    stale_reader = ReferenceCache(poll_interval=60)
+    db = session_factory()
+    for cache in (writer, reader, stale_reader):
+        assert cache.get(db).goals == {}
+    
+    db.add(Goal(timeframe=TimeframeType.TODAY, target_profit=Decimal("150.00")))
+    snapshot = writer.commit(db)
+    
+    assert snapshot.goals[TimeframeType.TODAY]["target_profit"] == Decimal("150.00")
+    assert reader.get(session_factory()).goals[TimeframeType.TODAY]["target_profit"] == Decimal("150.00")
+    assert reader.loads == 2
+    # Until its poll interval passes a worker keeps its copy
+    assert stale_reader.get(db).goals == {}
+
+def test_unchanged_version_poll_does_not_reload(session_factory):
+    cache = ReferenceCache(poll_interval=0)
+    db = session_factory()
+    
+    cache.get(db)
+    cache.get(db)
+    
+    assert cache.loads == 1
+    assert cache.polls == 1
+
+def test_rollup_does_no_configuration_queries(session_factory, statements, monkeypatch):
+    cache = ReferenceCache(poll_interval=60)
+    monkeypatch.setattr(rollup_service, "reference_cache", cache)
+    db = session_factory()
+    db.add(Settings(id=1, cost_per_mile=Decimal("0")))
+    db.add(Goal(timeframe=TimeframeType.TODAY, target_profit=Decimal("100.00")))
+    db.add(Entry(
+        timestamp=datetime.utcnow(),
+        type=EntryType.ORDER,
+        app=AppType.DOORDASH,
+        amount=Decimal("25.00"),
+        distance_miles=1.0,
+        duration_minutes=10
+    ))
+    db.commit()
+    cache.get(db)
+    statements.clear()
+    
+    rollup = calculate_rollup(db, timeframe="TODAY")
+    
+    assert rollup["goal_progress"] == 25.0
+    assert statements
+    assert not any("settings" in statement or "goals" in statement for statement in statements)
@@ -0,0 +1,117 @@
+import asyncio
+import httpx
+import pytest
+from types import SimpleNamespace
+from backend.models import PlatformIntegration
+from backend.services import resilience
+from backend.services.resilience import CircuitBreaker, CircuitOpenError, TokenBucket, request_with_retries, retry_after_seconds
+
+@pytest.fixture(autouse=True)
+def fresh_platform_state(monkeypatch):
+    monkeypatch.setattr(resilience, "_limiters", {})
+    monkeypatch.setattr(resilience, "_breakers", {})
+
+def faulty_transport(responses):
+    """Serve the given responses in order, raising any exceptions instead of returning them"""
+    calls = []
+    
+    def handler(request):
+        calls.append(request)
+        response = responses[min(len(calls), len(responses)) - 1]
+        if isinstance(response, Exception):
+            raise response
+        return response
+    
+    return httpx.MockTransport(handler), calls
+
+@pytest.mark.asyncio
+async def test_retries_rate_limit_and_server_errors():
+    transport, calls = faulty_transport([
+        httpx.Response(429, headers={"Retry-After": "0"}),
+        httpx.ConnectTimeout("timed out"),
+        httpx.Response(503),
+        httpx.Response(200, json={"ok": True}),
+    ])
+    async with httpx.AsyncClient(transport=transport) as client:
+        response = await request_with_retries(client, "GET", "https://platform.test/orders", PlatformIntegration.UBER, base_delay=0)
+    
+    assert response.json() == {"ok": True}
+    assert len(calls) == 4
+
+@pytest.mark.asyncio
+async def test_gives_up_after_max_attempts():
+    transport, calls = faulty_transport([httpx.Response(500)])
+    async with httpx.AsyncClient(transport=transport) as client:
+        with pytest.raises(httpx.HTTPStatusError):
+            await request_with_retries(client, "GET", "https://platform.test/orders", PlatformIntegration.UBER, max_attempts=3, base_delay=0)
+    assert len(calls) == 3
+
+@pytest.mark.asyncio
+async def test_client_errors_are_not_retried():
+    transport, calls = faulty_transport([httpx.Response(401)])
+    async with httpx.AsyncClient(transport=transport) as client:
+        with pytest.raises(httpx.HTTPStatusError):
+            await request_with_retries(client, "GET", "https://platform.test/orders", PlatformIntegration.SHIPT, base_delay=0)
+    assert len(calls) == 1
+
+@pytest.mark.asyncio
+async def test_open_circuit_short_circuits_requests():
+    transport, calls = faulty_transport([httpx.Response(502)])
+    async with httpx.AsyncClient(transport=transport) as client:
+        with pytest.raises(httpx.HTTPStatusError):
+            await request_with_retries(client, "GET", "https://platform.test/orders", PlatformIntegration.SHIPT, base_delay=0)
+        with pytest.raises(CircuitOpenError):
+            await request_with_retries(client, "GET", "https://platform.test/orders", PlatformIntegration.SHIPT, base_delay=0)
+    assert len(calls) == resilience.MAX_ATTEMPTS
+
+def test_circuit_half_opens_after_timeout():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "half_open"
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+def test_half_open_allows_one_trial_request():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    breaker.record_failure()
+    breaker.opened_at -= 60
+    assert breaker.state == "half_open"
+    
+    breaker.before_request()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+    
+    # A failed trial re-opens the circuit; a later one is let through again
+    breaker.record_failure()
+    assert breaker.state == "open"
+    breaker.opened_at -= 60
+    breaker.before_request()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    breaker.before_request()
+    breaker.before_request()
+
+def test_retry_after_accepts_seconds_and_dates():
+    assert retry_after_seconds(httpx.Response(429, headers={"Retry-After": "7"})) == 7.0
+    assert retry_after_seconds(httpx.Response(429, headers={"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"})) == 0.0
+    assert retry_after_seconds(httpx.Response(429)) is None
+
+def test_retry_after_is_capped():
+    assert retry_after_seconds(httpx.Response(429, headers={"Retry-After": "86400"})) == resilience.MAX_DELAY_SECONDS
+    assert retry_after_seconds(httpx.Response(503, headers={"Retry-After": "Fri, 01 Jan 2100 00:00:00 GMT"})) == resilience.MAX_DELAY_SECONDS
+
+@pytest.mark.asyncio
+async def test_token_bucket_allows_burst(monkeypatch):
+    # Freeze the bucket's clock (not the event loop's) so no tokens come back
+    # while the test runs
+    monkeypatch.setattr(resilience, "time", SimpleNamespace(monotonic=lambda: 1000.0))
+    bucket = TokenBucket(rate=1.0, capacity=3)
+    for _ in range(3):
+        await asyncio.wait_for(bucket.acquire(), 0.1)
+
+    # The burst is spent, so the 4th and 5th callers have to wait for a refill
+    for _ in range(2):
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(bucket.acquire(), 0.05)
@@ -0,0 +1,71 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from backend.db import Base
+from backend.models import Entry, EntryType, AppType
+from backend.services.rolling_service import rolling_series, RollingWindow, DaySummary
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+@pytest.fixture
+def db_session():
+    test_engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=test_engine)
+    TestSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
+    session = TestSessionLocal()
+    yield session
+    session.close()
+    Base.metadata.drop_all(bind=test_engine)
+
+def add(db_session, timestamp, amount, type=EntryType.ORDER, miles=0.0, minutes=0):
+    db_session.add(Entry(
+        timestamp=timestamp,
+        type=type,
+        app=AppType.DOORDASH,
+        amount=Decimal(amount),
+        distance_miles=miles,
+        duration_minutes=minutes
+    ))
+
+def test_window_drops_days_as_they_leave():
+    window = RollingWindow(2)
+    for profit in ("10", "20", "40"):
+        window.push(DaySummary(Decimal(profit), 1.0, 60, 1))
+    
+    point = window.point()
+    assert point["profit"] == 60.0
+    assert point["average_profit"] == 30.0
+    assert point["dollars_per_hour"] == 30.0
+    assert point["orders"] == 2
+
+def test_series_matches_recomputing_every_window(db_session):
+    for day in range(20):
+        add(db_session, datetime(2025, 1, 1, 12) + timedelta(days=day), f"{10 + day}.00", miles=2.0 + day, minutes=30)
+        if day % 4 == 0:
+            add(db_session, datetime(2025, 1, 1, 18) + timedelta(days=day), "-6.50", EntryType.EXPENSE)
+    db_session.commit()
+    
+    result = rolling_series(db_session, 7, date(2025, 1, 10), date(2025, 1, 24))
+    
+    assert len(result["series"]) == 15
+    for point in result["series"]:
+        days = [point["day"] - timedelta(days=n) for n in range(7)]
+        in_window = [d for d in days if date(2025, 1, 1) <= d <= date(2025, 1, 20)]
+        profit = sum(10 + (d - date(2025, 1, 1)).days for d in in_window) - 6.5 * sum(
+            1 for d in in_window if (d - date(2025, 1, 1)).days % 4 == 0
+        )
+        miles = sum(2.0 + (d - date(2025, 1, 1)).days for d in in_window)
+        assert point["profit"] == pytest.approx(profit)
+        assert point["average_profit"] == round(profit / 7, 2)
+        assert point["dollars_per_mile"] == (round(profit / miles, 2) if miles else None)
+        assert point["dollars_per_hour"] == (round(profit / (len(in_window) * 0.5), 2) if in_window else None)
+
+def test_invalid_windows_are_rejected(db_session):
+    with pytest.raises(ValueError):
+        rolling_series(db_session, 0, date(2025, 1, 1), date(2025, 1, 2))
+    with pytest.raises(ValueError):
+        rolling_series(db_session, 7, date(2025, 1, 3), date(2025, 1, 2))
+    with pytest.raises(ValueError):
+        rolling_series(db_session, 7, date(1990, 1, 1), date(2025, 1, 1))
+    # A leap year's worth of points is the most one series holds
+    assert len(rolling_series(db_session, 7, date(2024, 1, 1), date(2024, 12, 31))["series"]) == 366
@@ -2,9 +2,10 @@ import pytest
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from backend.db import Base
-from backend.models import Entry, Settings, EntryType, AppType, ExpenseCategory
-from backend.services.rollup_service import calculate_rollup
-from datetime import datetime
+from backend.models import Entry, Settings, EntryType, AppType, ExpenseCategory, Goal, TimeframeType
+from backend.services.rollup_service import calculate_rollup, calculate_goal_progress, calculate_rollup_comparison
+from backend.services.period import Period
+from datetime import datetime, timezone
 from decimal import Decimal
 
 @pytest.fixture
@@ -138,3 +139,104 @@ def test_rollup_dollars_per_hour(db_session):
     
     assert rollup["hours"] == 2.0
     assert rollup["dollars_per_hour"] == Decimal("30.00")
+
+def test_rollup_period_is_half_open(db_session):
+    db_session.add(Settings(id=1, cost_per_mile=Decimal("0")))
+    for timestamp, amount in [
+        (datetime(2025, 3, 7, 7, 59), "1.00"),
+        (datetime(2025, 3, 7, 8, 0), "10.00"),
+        (datetime(2025, 3, 8, 7, 59), "20.00"),
+        (datetime(2025, 3, 8, 8, 0), "100.00")
+    ]:
+        db_session.add(Entry(
+            timestamp=timestamp,
+            type=EntryType.ORDER,
+            app=AppType.DOORDASH,
+            amount=Decimal(amount),
+            distance_miles=0,
+            duration_minutes=0
+        ))
+    db_session.commit()
+    period = Period("TODAY", "America/Los_Angeles", datetime(2025, 3, 7, 8, 0), datetime(2025, 3, 8, 8, 0))
+    
+    rollup = calculate_rollup(db_session, period=period)
+    
+    assert rollup["revenue"] == 30.0
+    assert rollup["period"]["tz"] == "America/Los_Angeles"
+
+def add_amount(db_session, timestamp, amount, type=EntryType.ORDER):
+    db_session.add(Entry(
+        timestamp=timestamp,
+        type=type,
+        app=AppType.DOORDASH,
+        amount=Decimal(amount),
+        distance_miles=0,
+        duration_minutes=0
+    ))
+
+def test_goal_progress_measures_profit_for_every_goal(db_session):
+    db_session.add(Goal(timeframe=TimeframeType.TODAY, target_profit=Decimal("100.00")))
+    db_session.add(Goal(timeframe=TimeframeType.THIS_MONTH, target_profit=Decimal("1000.00")))
+    db_session.add(Goal(timeframe=TimeframeType.LAST_MONTH, target_profit=Decimal("50.00")))
+    add_amount(db_session, datetime(2025, 6, 10, 9, 0), "80.00")
+    add_amount(db_session, datetime(2025, 6, 10, 10, 0), "-20.00", EntryType.EXPENSE)
+    add_amount(db_session, datetime(2025, 6, 2, 12, 0), "240.00")
+    add_amount(db_session, datetime(2025, 5, 20, 12, 0), "75.00")
+    db_session.commit()
+    
+    # Noon UTC on June 10th: half of today and (9.5 / 30) of June are gone
+    progress = {
+        p["timeframe"]: p
+        for p in calculate_goal_progress(db_session, "UTC", now=datetime(2025, 6, 10, 12, 0, tzinfo=timezone.utc))
+    }
+    
+    today = progress["TODAY"]
+    assert today["profit"] == 60.0
+    assert today["percent"] == 60.0
+    assert today["remaining"] == 40.0
+    assert today["projected_profit"] == 120.0
+    assert today["on_track"] is True
+    
+    month = progress["THIS_MONTH"]
+    assert month["profit"] == 300.0
+    assert month["projected_profit"] == round(300 * 30 / 9.5, 2)
+    assert month["on_track"] is False
+    
+    last_month = progress["LAST_MONTH"]
+    assert last_month["profit"] == 75.0
+    assert last_month["projected_profit"] == 75.0
+    assert last_month["remaining"] == 0.0
+
+def test_rollup_goal_progress_uses_profit(db_session):
+    db_session.add(Goal(timeframe=TimeframeType.TODAY, target_profit=Decimal("100.00")))
+    add_amount(db_session, datetime.utcnow(), "80.00")
+    add_amount(db_session, datetime.utcnow(), "-30.00", EntryType.EXPENSE)
+    db_session.commit()
+    
+    rollup = calculate_rollup(db_session, timeframe="TODAY")
+    
+    assert rollup["goal_progress"] == 50.0
+
+def test_comparison_reports_full_and_to_date_deltas(db_session):
+    # This week so far: Monday and Tuesday; last week: Monday, Tuesday and Friday
+    add_amount(db_session, datetime(2025, 6, 9, 12, 0), "60.00")
+    add_amount(db_session, datetime(2025, 6, 10, 9, 0), "30.00")
+    add_amount(db_session, datetime(2025, 6, 2, 12, 0), "40.00")
+    add_amount(db_session, datetime(2025, 6, 3, 9, 0), "20.00")
+    add_amount(db_session, datetime(2025, 6, 6, 12, 0), "100.00")
+    add_amount(db_session, datetime(2025, 6, 3, 10, 0), "-10.00", EntryType.EXPENSE)
+    db_session.commit()
+    
+    comparison = calculate_rollup_comparison(
+        db_session, "THIS_WEEK", "previous", "UTC", now=datetime(2025, 6, 10, 12, 0, tzinfo=timezone.utc)
+    )
+    
+    assert comparison["current"]["profit"] == 90.0
+    assert comparison["comparison"]["profit"] == 150.0
+    assert comparison["comparison_to_date"]["profit"] == 50.0
+    assert comparison["comparison_to_date"]["period"]["end"] == datetime(2025, 6, 3, 12, 0, tzinfo=timezone.utc)
+    
+    assert comparison["deltas"]["profit"] == {"absolute": -60.0, "percent": -40.0}
+    assert comparison["pacing_deltas"]["profit"] == {"absolute": 40.0, "percent": 80.0}
+    assert comparison["pacing_deltas"]["expenses"] == {"absolute": -10.0, "percent": -100.0}
+    assert comparison["pacing_deltas"]["by_type"]["BONUS"] == {"absolute": 0.0, "percent": None}
@@ -0,0 +1,76 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from backend.db import Base
+from backend.models import Entry, EntryType, AppType
+from backend.services.shifts_service import find_shifts, summarize_shifts
+from backend.services.rollup_service import calculate_rollup
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+@pytest.fixture
+def db_session():
+    test_engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=test_engine)
+    TestSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
+    session = TestSessionLocal()
+    yield session
+    session.close()
+    Base.metadata.drop_all(bind=test_engine)
+
+def add_order(db_session, timestamp, amount, minutes=30, miles=5.0, type=EntryType.ORDER):
+    db_session.add(Entry(
+        timestamp=timestamp,
+        type=type,
+        app=AppType.DOORDASH,
+        amount=Decimal(amount),
+        distance_miles=miles,
+        duration_minutes=minutes
+    ))
+
+@pytest.fixture
+def two_days(db_session):
+    # Monday lunch: 11:30-13:00; Monday dinner: 18:00-19:30; Tuesday: 11:30-12:00
+    add_order(db_session, datetime(2025, 1, 6, 12, 0), "15.00")
+    add_order(db_session, datetime(2025, 1, 6, 13, 0), "15.00")
+    add_order(db_session, datetime(2025, 1, 6, 18, 30), "20.00")
+    add_order(db_session, datetime(2025, 1, 6, 19, 30), "25.00", miles=10.0)
+    add_order(db_session, datetime(2025, 1, 7, 12, 0), "12.00")
+    add_order(db_session, datetime(2025, 1, 6, 21, 0), "5.00", type=EntryType.BONUS)
+    add_order(db_session, datetime(2025, 1, 6, 14, 0), "-10.00", minutes=0, miles=0, type=EntryType.EXPENSE)
+    db_session.commit()
+
+def test_orders_split_at_gaps(db_session, two_days):
+    shifts = find_shifts(db_session)
+    
+    assert [(s["start"], s["end"], s["orders"]) for s in shifts] == [
+        (datetime(2025, 1, 6, 11, 30), datetime(2025, 1, 6, 13, 0), 2),
+        (datetime(2025, 1, 6, 18, 0), datetime(2025, 1, 6, 19, 30), 2),
+        (datetime(2025, 1, 7, 11, 30), datetime(2025, 1, 7, 12, 0), 1)
+    ]
+    lunch = shifts[0]
+    assert lunch["revenue"] == 30.0
+    assert lunch["active_hours"] == 1.5
+    assert lunch["dollars_per_hour"] == 20.0
+    assert lunch["dollars_per_mile"] == 3.0
+    
+    totals = summarize_shifts(shifts)
+    assert totals["shifts"] == 3
+    assert totals["active_hours"] == 3.5
+    assert totals["revenue"] == 87.0
+
+def test_gap_threshold_is_configurable(db_session, two_days):
+    assert len(find_shifts(db_session, gap=timedelta(hours=6))) == 2
+    assert len(find_shifts(db_session, gap=timedelta(minutes=20))) == 5
+
+def test_window_filters_orders(db_session, two_days):
+    shifts = find_shifts(db_session, from_date=datetime(2025, 1, 7))
+    
+    assert len(shifts) == 1
+    assert find_shifts(db_session, to_date=datetime(2025, 1, 1)) == []
+
+def test_rollup_rate_ignores_time_between_shifts(db_session, two_days):
+    rollup = calculate_rollup(db_session)
+    
+    # $82 profit over 3.5 worked hours, not over the 24.5 hours from first to last order
+    assert rollup["per_hour_first_to_last"] == round(82 / 3.5, 2)
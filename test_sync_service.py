@@ -0,0 +1,279 @@
+import asyncio
+import threading
+import time
+import httpx
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from backend.db import Base
+from backend.models import Entry, SyncedOrder, AppType, ApiCredential, PlatformIntegration, SyncState
+from backend.services import sync_service, resilience
+from backend.mock_platforms import MockPlatformConfig, create_uber_app, create_shipt_app, mock_transport
+from backend.services.credential_manager import CredentialManager
+from backend.services.sync_service import UberSyncService, ShiptSyncService, OrderPage, sync_credential, sync_all_platforms, SYNC_OVERLAP
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+@pytest.fixture
+def db_session(monkeypatch):
+    # StaticPool keeps one connection so worker threads see the same in-memory database
+    test_engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=test_engine)
+    TestSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
+    session = TestSessionLocal()
+    # Tokens are read through the credential manager, so point it at the test database
+    monkeypatch.setattr(sync_service, "credential_manager", CredentialManager(session_factory=TestSessionLocal))
+    monkeypatch.setattr(resilience, "_limiters", {})
+    monkeypatch.setattr(resilience, "_breakers", {})
+    yield session
+    session.close()
+    Base.metadata.drop_all(bind=test_engine)
+
+def uber_order(order_id, total=12.5):
+    return {
+        "order_id": order_id,
+        "fare": {"total_amount": total},
+        "trip_distance": 3.2,
+        "trip_duration": 900,
+        "completed_at": 1700000000
+    }
+
+@pytest.mark.asyncio
+async def test_sync_orders_creates_entries_and_links(db_session):
+    service = UberSyncService("token")
+    entry_ids = await service.sync_orders(db_session, [uber_order("a"), uber_order("b", 20)])
+    
+    assert len(entry_ids) == 2
+    entries = db_session.query(Entry).order_by(Entry.id).all()
+    assert [e.amount for e in entries] == [Decimal("12.50"), Decimal("20.00")]
+    assert all(e.app == AppType.UBEREATS for e in entries)
+    assert entries[0].duration_minutes == 15
+    
+    links = {s.platform_order_id: s for s in db_session.query(SyncedOrder).all()}
+    assert links["a"].entry_id == entries[0].id
+    assert links["b"].entry_id == entries[1].id
+    assert links["a"].sync_status == "completed"
+
+@pytest.mark.asyncio
+async def test_sync_orders_skips_already_synced(db_session):
+    service = UberSyncService("token")
+    await service.sync_orders(db_session, [uber_order("a")])
+    entry_ids = await service.sync_orders(db_session, [uber_order("a"), uber_order("b"), uber_order("b")])
+    
+    assert len(entry_ids) == 1
+    assert db_session.query(Entry).count() == 2
+    assert db_session.query(SyncedOrder).count() == 2
+
+@pytest.mark.asyncio
+async def test_sync_orders_page_mixing_new_and_synced_orders(db_session):
+    service = UberSyncService("token")
+    first_ids = await service.sync_orders(db_session, [uber_order("a"), uber_order("b", 20)])
+    
+    entry_ids = await service.sync_orders(db_session, [uber_order("b", 20), uber_order("c", 7), uber_order("a"), uber_order("d", 9)])
+    
+    assert len(entry_ids) == 2
+    assert set(entry_ids).isdisjoint(first_ids)
+    amounts = {e.order_id: e.amount for e in db_session.query(Entry)}
+    assert amounts == {"a": Decimal("12.50"), "b": Decimal("20.00"), "c": Decimal("7.00"), "d": Decimal("9.00")}
+    links = {s.platform_order_id: s.entry_id for s in db_session.query(SyncedOrder)}
+    assert {links["c"], links["d"]} == set(entry_ids)
+    assert all(s.sync_status == "completed" for s in db_session.query(SyncedOrder))
+
+@pytest.mark.asyncio
+async def test_all_duplicate_page_still_checkpoints_cursor(db_session, monkeypatch):
+    async def pages(self, start_date, end_date, cursor=None):
+        yield OrderPage([uber_order("a")], "page-2")
+        yield OrderPage([uber_order("a")], "page-3")
+        raise httpx.HTTPError("boom")
+    
+    monkeypatch.setattr(UberSyncService, "iter_order_pages", pages)
+    cred = ApiCredential(platform=PlatformIntegration.UBER, access_token="token", is_active=1)
+    db_session.add(cred)
+    db_session.commit()
+    
+    await sync_credential(db_session, cred)
+    
+    state = db_session.query(SyncState).filter(SyncState.credential_id == cred.id).first()
+    assert state.cursor == "page-3"
+
+@pytest.mark.asyncio
+async def test_cancelled_sync_waits_for_persist_thread(db_session, monkeypatch):
+    started = threading.Event()
+    release = threading.Event()
+    finished = []
+    service = UberSyncService("token")
+    
+    def slow_persist(db, orders):
+        started.set()
+        release.wait(1)
+        finished.append(len(orders))
+    
+    monkeypatch.setattr(service, "_persist_orders", slow_persist)
+    task = asyncio.create_task(service.sync_orders(db_session, [uber_order("a")]))
+    await asyncio.to_thread(started.wait, 1)
+    task.cancel()
+    await asyncio.sleep(0.01)
+    # Cancellation doesn't return while the thread still holds the session
+    assert not task.done()
+    
+    release.set()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert finished == [1]
+
+@pytest.mark.asyncio
+async def test_sync_orders_uses_constant_statements_per_page(db_session):
+    statements = []
+    event.listen(db_session.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+    
+    service = ShiptSyncService("token")
+    orders = [
+        {"order_id": f"s{i}", "payout": 9.75, "estimated_mileage": 4, "estimated_time": 30, "completed_at": "2025-01-01T12:00:00"}
+        for i in range(500)
+    ]
+    await service.sync_orders(db_session, orders)
+    
+    assert db_session.query(Entry).count() == 500
+    # IN lookup, claim insert, entry insert, link update, the entries
+    # version bump, and a read and an upsert each for the day and month
+    # sketches the page's orders are added to
+    assert len(statements) <= 15
+
+@pytest.fixture
+def local_time_new_york(monkeypatch):
+    monkeypatch.setenv("TZ", "America/New_York")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+@pytest.mark.asyncio
+async def test_uber_epoch_seconds_are_utc_whatever_the_host_zone(local_time_new_york):
+    requests = []
+    
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, json={"orders": [], "next_page_token": None})
+    
+    service = UberSyncService("token", transport=httpx.MockTransport(handler))
+    assert service.map_order(uber_order("a"))["timestamp"] == datetime(2023, 11, 14, 22, 13, 20)
+    
+    await service.fetch_orders(datetime(2023, 11, 14, 22, 13, 20), datetime(2023, 11, 15))
+    assert requests[0].url.params["start_time"] == "1700000000"
+
+@pytest.mark.asyncio
+async def test_sync_credential_advances_watermark(db_session, monkeypatch):
+    windows = []
+    
+    async def fake_pages(self, start_date, end_date, cursor=None):
+        windows.append(start_date)
+        yield OrderPage([uber_order("a"), uber_order("b")], "next")
+        yield OrderPage([uber_order("b")], None)
+    
+    monkeypatch.setattr(UberSyncService, "iter_order_pages", fake_pages)
+    cred = ApiCredential(platform=PlatformIntegration.UBER, access_token="token", is_active=1)
+    db_session.add(cred)
+    db_session.commit()
+    
+    run = await sync_credential(db_session, cred)
+    assert run.status == "completed"
+    assert (run.fetched, run.new, run.duplicates) == (3, 2, 1)
+    
+    state = db_session.query(SyncState).filter(SyncState.credential_id == cred.id).first()
+    assert state.watermark == datetime(2023, 11, 14, 22, 13, 20)
+    assert state.cursor is None
+    
+    run = await sync_credential(db_session, cred)
+    assert windows[1] == state.watermark - SYNC_OVERLAP
+    assert (run.fetched, run.new, run.duplicates) == (3, 0, 3)
+
+@pytest.mark.asyncio
+async def test_failed_sync_keeps_watermark(db_session, monkeypatch):
+    async def failing_pages(self, start_date, end_date, cursor=None):
+        yield OrderPage([uber_order("a")], "page-2")
+        raise httpx.HTTPError("boom")
+    
+    monkeypatch.setattr(UberSyncService, "iter_order_pages", failing_pages)
+    cred = ApiCredential(platform=PlatformIntegration.UBER, access_token="token", is_active=1)
+    db_session.add(cred)
+    db_session.commit()
+    
+    run = await sync_credential(db_session, cred)
+    assert run.status == "failed"
+    assert run.new == 1
+    
+    state = db_session.query(SyncState).filter(SyncState.credential_id == cred.id).first()
+    assert state.watermark is None
+    assert state.cursor == "page-2"
+
+@pytest.mark.asyncio
+async def test_failed_sync_resumes_from_cursor(db_session, monkeypatch):
+    calls = []
+    
+    async def pages(self, start_date, end_date, cursor=None):
+        calls.append((start_date, end_date, cursor))
+        if cursor is None:
+            yield OrderPage([uber_order("a")], "page-2")
+            raise httpx.HTTPError("boom")
+        yield OrderPage([uber_order("b")], None)
+    
+    monkeypatch.setattr(UberSyncService, "iter_order_pages", pages)
+    cred = ApiCredential(platform=PlatformIntegration.UBER, access_token="token", is_active=1)
+    db_session.add(cred)
+    db_session.commit()
+    
+    await sync_credential(db_session, cred)
+    run = await sync_credential(db_session, cred)
+    
+    assert run.status == "completed"
+    assert calls[1] == (calls[0][0], calls[0][1], "page-2")
+    assert db_session.query(Entry).count() == 2
+    state = db_session.query(SyncState).first()
+    assert state.cursor is None and state.window_start is None
+
+
+def connect_platforms(db_session):
+    for platform in PlatformIntegration:
+        db_session.add(ApiCredential(platform=platform, access_token="token", is_active=1))
+    db_session.commit()
+
+@pytest.mark.asyncio
+async def test_sync_all_platforms_pages_through_mock_servers(db_session):
+    connect_platforms(db_session)
+    uber = create_uber_app(MockPlatformConfig(order_count=250, days=5))
+    shipt = create_shipt_app(MockPlatformConfig(order_count=120, days=5))
+    transports = {PlatformIntegration.UBER: mock_transport(uber), PlatformIntegration.SHIPT: mock_transport(shipt)}
+    
+    runs = await sync_all_platforms(db_session, transports=transports)
+    
+    assert [run.status for run in runs] == ["completed", "completed"]
+    assert db_session.query(Entry).filter(Entry.app == AppType.UBEREATS).count() == 250
+    assert db_session.query(Entry).filter(Entry.app == AppType.SHIPT).count() == 120
+    assert uber.state.platform.requests == 3
+    assert shipt.state.platform.requests == 2
+
+@pytest.mark.asyncio
+async def test_incremental_sync_only_pulls_recent_orders(db_session):
+    connect_platforms(db_session)
+    uber = create_uber_app(MockPlatformConfig(order_count=300, days=7))
+    transports = {PlatformIntegration.UBER: mock_transport(uber)}
+    await sync_all_platforms(db_session, platform=PlatformIntegration.UBER, transports=transports)
+    
+    uber.state.platform.add_orders(5, datetime.utcnow() - timedelta(minutes=1))
+    runs = await sync_all_platforms(db_session, platform=PlatformIntegration.UBER, transports=transports)
+    
+    assert runs[0].new == 5
+    assert runs[0].fetched < 100
+    assert db_session.query(Entry).count() == 305
+
+@pytest.mark.asyncio
+async def test_sync_survives_injected_errors(db_session):
+    connect_platforms(db_session)
+    shipt = create_shipt_app(MockPlatformConfig(order_count=400, error_rate=0.3, error_status=429))
+    
+    runs = await sync_all_platforms(db_session, platform=PlatformIntegration.SHIPT, transports={PlatformIntegration.SHIPT: mock_transport(shipt)})
+    
+    assert runs[0].status == "completed"
+    assert shipt.state.platform.errors > 0
+    assert db_session.query(Entry).count() == 400
@@ -0,0 +1,97 @@
+import hashlib
+import hmac
+import json
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from backend.db import Base
+from backend.models import Entry, SyncedOrder, PlatformIntegration
+from backend.routers import webhooks
+from backend.services.webhook_ingest import WebhookQueue, WEBHOOK_SECRETS
+
+@pytest.fixture
+def session_factory():
+    test_engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=test_engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
+    Base.metadata.drop_all(bind=test_engine)
+
+@pytest.fixture
+def client(session_factory, monkeypatch):
+    monkeypatch.setitem(WEBHOOK_SECRETS, PlatformIntegration.SHIPT, "shipt-webhook-secret")
+    monkeypatch.setitem(WEBHOOK_SECRETS, PlatformIntegration.UBER, None)
+    queue = WebhookQueue(maxsize=2, session_factory=session_factory)
+    monkeypatch.setattr(webhooks, "webhook_queue", queue)
+    app = FastAPI()
+    app.include_router(webhooks.router, prefix="/api")
+    return TestClient(app), queue
+
+def shipt_event(order_id):
+    return {
+        "event_type": "order.completed",
+        "order": {"order_id": order_id, "payout": 18.5, "estimated_mileage": 6, "estimated_time": 45, "completed_at": "2025-01-01T12:00:00"}
+    }
+
+def post_signed(test_client, platform, event):
+    body = json.dumps(event).encode()
+    signature = hmac.new(WEBHOOK_SECRETS[platform].encode(), body, hashlib.sha256).hexdigest()
+    return test_client.post(
+        f"/api/webhooks/{platform.value.lower()}",
+        content=body,
+        headers={"X-Shipt-Signature": signature, "X-Uber-Signature": signature}
+    )
+
+def test_webhook_rejects_bad_signature(client):
+    test_client, queue = client
+    response = test_client.post("/api/webhooks/shipt", json=shipt_event("a"), headers={"X-Shipt-Signature": "bad"})
+    assert response.status_code == 401
+    assert queue.metrics()["accepted"] == 0
+
+def test_webhook_disabled_without_secret(client):
+    test_client, queue = client
+    response = test_client.post("/api/webhooks/uber", json={"event_type": "orders.completed"}, headers={"X-Uber-Signature": "x"})
+    assert response.status_code == 503
+    assert queue.metrics()["accepted"] == 0
+
+def test_webhook_rejects_non_object_body(client):
+    test_client, queue = client
+    assert post_signed(test_client, PlatformIntegration.SHIPT, ["order.completed"]).status_code == 400
+    assert post_signed(test_client, PlatformIntegration.SHIPT, 42).status_code == 400
+    assert queue.metrics()["accepted"] == 0
+
+def test_webhook_ignores_other_events(client):
+    test_client, queue = client
+    response = post_signed(test_client, PlatformIntegration.SHIPT, {"event_type": "order.created", "order": {}})
+    assert response.json() == {"status": "ignored"}
+    assert queue.metrics()["depth"] == 0
+
+def test_webhook_applies_backpressure_when_full(client):
+    test_client, queue = client
+    assert post_signed(test_client, PlatformIntegration.SHIPT, shipt_event("a")).status_code == 202
+    assert post_signed(test_client, PlatformIntegration.SHIPT, shipt_event("b")).status_code == 202
+    
+    response = post_signed(test_client, PlatformIntegration.SHIPT, shipt_event("c"))
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "5"
+    assert queue.metrics()["rejected"] == 1
+
+@pytest.mark.asyncio
+async def test_queue_writes_batches_and_isolates_bad_orders(session_factory):
+    queue = WebhookQueue(session_factory=session_factory)
+    queue.put(PlatformIntegration.SHIPT, shipt_event("a")["order"])
+    queue.put(PlatformIntegration.SHIPT, shipt_event("a")["order"])
+    queue.put(PlatformIntegration.SHIPT, {"order_id": "broken"})
+    queue.put(PlatformIntegration.UBER, {"order_id": "u1", "fare": {"total_amount": 9}, "completed_at": 1700000000})
+    
+    await queue.stop()
+    
+    metrics = queue.metrics()
+    assert metrics["processed"] == 4
+    assert metrics["created"] == 2
+    assert metrics["failed"] == 1
+    db = session_factory()
+    assert db.query(Entry).count() == 2
+    assert db.query(SyncedOrder).count() == 2
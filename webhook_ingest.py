@@ -0,0 +1,150 @@
+import asyncio
+import hashlib
+import hmac
+import logging
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+from backend.db import SessionLocal
+from backend.models import PlatformIntegration
+from backend.services.sync_service import UberSyncService, ShiptSyncService
+
+logger = logging.getLogger(__name__)
+
+# No fallback: a platform's webhooks stay disabled until its secret is set
+WEBHOOK_SECRETS: Dict[PlatformIntegration, Optional[str]] = {
+    PlatformIntegration.UBER: os.getenv("UBER_WEBHOOK_SECRET") or None,
+    PlatformIntegration.SHIPT: os.getenv("SHIPT_WEBHOOK_SECRET") or None,
+}
+SIGNATURE_HEADERS = {
+    PlatformIntegration.UBER: "X-Uber-Signature",
+    PlatformIntegration.SHIPT: "X-Shipt-Signature",
+}
+# Only these events carry a finished order worth recording
+ORDER_COMPLETED_EVENTS = {
+    PlatformIntegration.UBER: "orders.completed",
+    PlatformIntegration.SHIPT: "order.completed",
+}
+
+QUEUE_SIZE = 10000
+BATCH_SIZE = 500
+# How long the consumer waits to fill a batch once it has one event
+BATCH_WAIT_SECONDS = 0.05
+
+
+def verify_signature(platform: PlatformIntegration, body: bytes, signature: Optional[str]) -> bool:
+    """Check the hex HMAC-SHA256 of the raw body against the platform's secret"""
+    secret = WEBHOOK_SECRETS[platform]
+    if not secret or not signature:
+        return False
+    expected = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature.strip().lower())
+
+
+class WebhookQueue:
+    """Bounded in-process queue of webhook orders with a batching consumer.
+    
+    put() never blocks: when the queue is full it returns False so the
+    endpoint can answer 429 and the platform retries later.
+    """
+    
+    def __init__(self, maxsize: int = QUEUE_SIZE, session_factory=SessionLocal):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.session_factory = session_factory
+        self.services = {
+            # Only map_order()/sync_orders() are used, so no token is needed
+            PlatformIntegration.UBER: UberSyncService(""),
+            PlatformIntegration.SHIPT: ShiptSyncService(""),
+        }
+        self.accepted = 0
+        self.rejected = 0
+        self.processed = 0
+        self.created = 0
+        self.failed = 0
+        self.last_batch_size = 0
+        # Seconds from enqueue to commit for the oldest event in the last batch
+        self.last_lag_seconds: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+    
+    def put(self, platform: PlatformIntegration, order: dict) -> bool:
+        try:
+            self.queue.put_nowait((platform, order, time.monotonic()))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            return False
+        self.accepted += 1
+        return True
+    
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._consume())
+    
+    async def stop(self):
+        """Stop consuming after writing whatever is already queued"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        batch = []
+        while not self.queue.empty():
+            batch.append(self.queue.get_nowait())
+        if batch:
+            await self._write(batch)
+    
+    def metrics(self) -> dict:
+        return {
+            "depth": self.queue.qsize(),
+            "capacity": self.queue.maxsize,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "processed": self.processed,
+            "created": self.created,
+            "failed": self.failed,
+            "last_batch_size": self.last_batch_size,
+            "last_lag_seconds": self.last_lag_seconds
+        }
+    
+    async def _consume(self):
+        while True:
+            batch = [await self.queue.get()]
+            deadline = time.monotonic() + BATCH_WAIT_SECONDS
+            while len(batch) < BATCH_SIZE:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            await self._write(batch)
+    
+    async def _write(self, batch: List[Tuple[PlatformIntegration, dict, float]]):
+        by_platform: Dict[PlatformIntegration, list] = {}
+        for platform, order, _ in batch:
+            by_platform.setdefault(platform, []).append(order)
+        
+        db = self.session_factory()
+        try:
+            for platform, orders in by_platform.items():
+                service = self.services[platform]
+                try:
+                    self.created += len(await service.sync_orders(db, orders))
+                except Exception:
+                    db.rollback()
+                    # Retry one by one so a single malformed order doesn't sink the batch
+                    for order in orders:
+                        try:
+                            self.created += len(await service.sync_orders(db, [order]))
+                        except Exception:
+                            db.rollback()
+                            self.failed += 1
+                            logger.exception("Failed to write %s webhook order %s", platform.value, order.get("order_id"))
+        finally:
+            db.close()
+        
+        self.processed += len(batch)
+        self.last_batch_size = len(batch)
+        self.last_lag_seconds = time.monotonic() - min(enqueued for _, _, enqueued in batch)
+
+
+webhook_queue = WebhookQueue()
@@ -0,0 +1,49 @@
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import JSONResponse
+from backend.models import PlatformIntegration
+from backend.services.webhook_ingest import (
+    webhook_queue, verify_signature, SIGNATURE_HEADERS, ORDER_COMPLETED_EVENTS, WEBHOOK_SECRETS
+)
+import json
+
+router = APIRouter()
+
+@router.get("/webhooks/metrics")
+async def get_webhook_metrics():
+    """Get webhook queue depth, throughput and lag"""
+    return webhook_queue.metrics()
+
+@router.post("/webhooks/{platform}", status_code=202)
+async def receive_webhook(platform: str, request: Request):
+    """Verify and enqueue a platform order webhook"""
+    try:
+        platform_enum = PlatformIntegration[platform.upper()]
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Unknown platform")
+    
+    if not WEBHOOK_SECRETS[platform_enum]:
+        raise HTTPException(status_code=503, detail=f"{platform_enum.value} webhooks are not configured")
+    
+    body = await request.body()
+    if not verify_signature(platform_enum, body, request.headers.get(SIGNATURE_HEADERS[platform_enum])):
+        raise HTTPException(status_code=401, detail="Invalid signature")
+    
+    try:
+        event = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid JSON")
+    if not isinstance(event, dict):
+        raise HTTPException(status_code=400, detail="Webhook body must be a JSON object")
+    
+    order = event.get("order")
+    if event.get("event_type") != ORDER_COMPLETED_EVENTS[platform_enum] or not order:
+        return {"status": "ignored"}
+    
+    if not webhook_queue.put(platform_enum, order):
+        return JSONResponse(
+            status_code=429,
+            content={"detail": "Webhook queue is full"},
+            headers={"Retry-After": "5"}
+        )
+    
+    return {"status": "queued"}